@@ -1,28 +1,55 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.template.response import TemplateResponse
+from django.utils import timezone
 from .models import (
     Pet, 
     FotoPet, 
     Adotante, 
     Voluntario, 
     Adocao, 
-    DocumentoTransparencia
+    DocumentoTransparencia,
+    EmailPendente,
+    EstatisticaMensal,
 )
+from .servicos import alterar_status_em_lote, alterar_destaque_em_lote
+from .estatisticas import dados_do_painel
+from .planilhas import resposta_exportacao
+from .busca import busca_disponivel, filtrar_por_busca
+
+
+class ExportacaoMixin:
+    # Exporta a seleção (ou tudo, com "selecionar todos") em fluxo: as linhas
+    # vão saindo do banco em lotes, sem carregar a tabela inteira na memória
+    actions = ['exportar_csv', 'exportar_xlsx']
+
+    @admin.action(description="Exportar selecionados (CSV)")
+    def exportar_csv(self, request, queryset):
+        return resposta_exportacao(queryset, 'csv')
+
+    @admin.action(description="Exportar selecionados (Excel)")
+    def exportar_xlsx(self, request, queryset):
+        return resposta_exportacao(queryset, 'xlsx')
 
 
 class FotoPetInline(admin.TabularInline):
     model = FotoPet
+    fields = ('imagem', 'ordem', 'is_capa')
     extra = 1  
 
 
-class PetAdmin(admin.ModelAdmin):
+class PetAdmin(ExportacaoMixin, admin.ModelAdmin):
   
-    list_display = ('nome', 'categoria_pet', 'sexo', 'porte', 'status_adocao', 'is_destaque')
+    list_display = ('nome', 'categoria_pet', 'sexo', 'porte', 'status_adocao', 'is_destaque', 'data_entrada')
     
     # Filtros na barra lateral direita
     list_filter = ('status_adocao', 'is_destaque', 'categoria_pet', 'sexo')
     
-    # Barra de pesquisa (Busca por nome ou descrição)
-    search_fields = ('nome', 'descricao')
+    # Barra de pesquisa (Busca por nome, raça, cor ou descrição).
+    # No SQLite usa o índice FTS5 (get_search_results abaixo); search_fields só
+    # existe para o admin mostrar a caixa de busca e servir de fallback.
+    search_fields = ('nome', 'raca', 'coloracao', 'descricao')
     
     # editar o status de adoção direto na lista 
     list_editable = ('status_adocao', 'is_destaque')
@@ -32,8 +59,49 @@ class PetAdmin(admin.ModelAdmin):
     # Paginação (se tiver muitos animais)
     list_per_page = 20
 
-
-class AdotanteAdmin(admin.ModelAdmin):
+    def get_search_results(self, request, queryset, search_term):
+        if not busca_disponivel() or not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        resultado = filtrar_por_busca(queryset, search_term)
+        # O ChangeList ordena antes de buscar, então a ordem do filtrar_por_busca
+        # (relevância) é a que fica. Se o voluntário clicou numa coluna, vale a dele.
+        if request.GET.get(ORDER_VAR):
+            resultado = resultado.order_by(*queryset.query.order_by)
+        return resultado, False
+
+    # Ações em lote: validam a seleção inteira e gravam com um UPDATE só
+    actions = ['marcar_adotado', 'marcar_disponivel', 'destacar', 'remover_destaque', *ExportacaoMixin.actions]
+
+    def _mudar_status(self, request, queryset, status):
+        total = alterar_status_em_lote(queryset, status)
+        self.message_user(request, f"{total} pet(s) agora constam como {Pet.StatusAdocao(status).label}.")
+
+    def _mudar_destaque(self, request, queryset, destacar):
+        try:
+            total = alterar_destaque_em_lote(queryset, destacar)
+        except ValidationError as erro:
+            self.message_user(request, erro.messages[0], level=messages.ERROR)
+            return
+        self.message_user(request, f"{total} pet(s) {'destacados' if destacar else 'fora dos destaques'}.")
+
+    @admin.action(description="Marcar como adotado")
+    def marcar_adotado(self, request, queryset):
+        self._mudar_status(request, queryset, Pet.StatusAdocao.ADOTADO)
+
+    @admin.action(description="Marcar como disponível para adoção")
+    def marcar_disponivel(self, request, queryset):
+        self._mudar_status(request, queryset, Pet.StatusAdocao.DISPONIVEL)
+
+    @admin.action(description="Destacar na Home")
+    def destacar(self, request, queryset):
+        self._mudar_destaque(request, queryset, True)
+
+    @admin.action(description="Remover dos destaques da Home")
+    def remover_destaque(self, request, queryset):
+        self._mudar_destaque(request, queryset, False)
+
+
+class AdotanteAdmin(ExportacaoMixin, admin.ModelAdmin):
     list_display = ('nome', 'telefone', 'email', 'data_cadastro')
     search_fields = ('nome', 'cpf', 'email') #Campo de busca
     list_filter = ('data_cadastro',) #Filtro por data de cadastro
@@ -60,15 +128,39 @@ class VoluntarioAdmin(admin.ModelAdmin):
     search_fields = ('nome',)
 
 
-class AdocaoAdmin(admin.ModelAdmin):
+class AdocaoAdmin(ExportacaoMixin, admin.ModelAdmin):
     list_display = ('pet', 'adotante', 'voluntario', 'data')
     list_filter = ('data',)
     search_fields = ('pet__nome', 'adotante__nome', 'adotante__cpf')
     readonly_fields = ('data',)
 
 
+class PainelAdocoesAdmin(admin.ModelAdmin):
+    # Não é uma lista: a página do modelo vira o painel, que lê só as tabelas
+    # de resumo mantidas pelos sinais (ver estatisticas.py)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        return TemplateResponse(request, 'admin/painel_adocoes.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Painel de Adoções',
+            'opts': self.model._meta,
+            **dados_do_painel(),
+        })
+
+
 class DocumentoAdmin(admin.ModelAdmin):
-    list_display = ('titulo', 'categoria', 'data_publicacao')
+    list_display = ('titulo', 'categoria', 'data_publicacao', 'downloads', 'texto_extraido_em')
     list_filter = ('categoria', 'data_publicacao') # Cria filtro lateral por data e tipo
     search_fields = ('titulo',)
     
@@ -84,22 +176,47 @@ class DocumentoAdmin(admin.ModelAdmin):
     )
 
 from .models import ConfiguracaoGeral # <--- Importe o novo modelo
+from .configuracao import configuracao
 
 # Crie a classe de administração
 class ConfiguracaoAdmin(admin.ModelAdmin):
-    list_display = ('email_recebimento',)
+    list_display = ('email_recebimento', 'limite_destaques')
     
     # Remove o botão "Adicionar" se já existir 1 configuração
+    # (o registro em memória responde sem ir ao banco a cada página do admin)
     def has_add_permission(self, request):
-        if ConfiguracaoGeral.objects.exists():
+        if configuracao.existe():
             return False
         return True
 
 
 
+class EmailPendenteAdmin(admin.ModelAdmin):
+    list_display = ('assunto', 'status', 'tentativas', 'criado_em', 'enviado_em')
+    list_filter = ('status',)
+    readonly_fields = ('assunto', 'mensagem', 'remetente', 'destinatarios', 'status',
+                       'tentativas', 'proxima_tentativa', 'ultimo_erro', 'criado_em', 'enviado_em')
+    actions = ['reenviar']
+
+    # A fila é preenchida pelo site, não à mão
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Colocar de volta na fila de envio")
+    def reenviar(self, request, queryset):
+        total = queryset.exclude(status=EmailPendente.Status.ENVIADO).update(
+            status=EmailPendente.Status.PENDENTE,
+            tentativas=0,
+            proxima_tentativa=timezone.now(),
+        )
+        self.message_user(request, f"{total} e-mail(s) voltaram para a fila.")
+
+
 admin.site.register(ConfiguracaoGeral, ConfiguracaoAdmin)
+admin.site.register(EmailPendente, EmailPendenteAdmin)
 admin.site.register(Pet, PetAdmin)
 admin.site.register(Adotante, AdotanteAdmin)
 admin.site.register(Voluntario, VoluntarioAdmin)
 admin.site.register(Adocao, AdocaoAdmin)
 admin.site.register(DocumentoTransparencia, DocumentoAdmin)
+admin.site.register(EstatisticaMensal, PainelAdocoesAdmin)
@@ -0,0 +1,246 @@
+import posixpath
+from functools import wraps
+
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, set_response_etag
+
+from .cache import cache_por_geracao
+from .consultas import FILTROS_PET, ler_filtros, ler_periodo, paginar_por_cursor
+from .models import DocumentoTransparencia, FotoPet, Pet
+
+# ==============================================================================
+# API JSON (somente leitura)
+# ==============================================================================
+# Para parceiros, app e agendador de posts: os mesmos dados da galeria sem
+# renderizar template. Tudo sai de values() (nenhuma instância de modelo é
+# montada) e cada endpoint faz um número fixo de consultas, seja qual for o
+# tamanho da página:
+#   /api/pets/                 1 consulta (+1 se pedir as fotos)
+#   /api/pets/<id>/            idem
+#   /api/documentos/           1 consulta
+# ?campos=id,nome,fotos escolhe os campos; ?limite= o tamanho da página;
+# ?apos=<id>/?antes=<id> são os cursores (os links prontos vêm em "proximo"
+# e "anterior"). O ETag é o hash do corpo: 304 para quem já tem a resposta.
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+# Campo na API -> caminho do values()
+CAMPOS_PET = {
+    'id': 'id',
+    'nome': 'nome',
+    'raca': 'raca',
+    'coloracao': 'coloracao',
+    'descricao': 'descricao',
+    'sexo': 'sexo',
+    'categoria': 'categoria_pet',
+    'idade': 'idade',
+    'porte': 'porte',
+    'castrado': 'is_castrado',
+    'condicao_especial': 'is_condicao_especial',
+    'destaque': 'is_destaque',
+    'capa': 'foto_capa__imagem',
+    'atualizado_em': 'atualizado_em',
+}
+# Calculados em Python a partir de outros campos (ou de outra consulta)
+CAMPOS_PET_EXTRAS = ('url', 'fotos')
+
+# Todos os campos de escolha do Pet (menos o status: a API só mostra os disponíveis)
+FILTROS_API = {
+    **FILTROS_PET,
+    'castrado': ('is_castrado', Pet.IsCastrado, 'Castrado'),
+    'condicao_especial': ('is_condicao_especial', Pet.IsCondicaoEspecial, 'Condição especial'),
+}
+
+CAMPOS_DOCUMENTO = {
+    'id': 'id',
+    'titulo': 'titulo',
+    'categoria': 'categoria',
+    'data_publicacao': 'data_publicacao',
+    'atualizado_em': 'atualizado_em',
+}
+CAMPOS_DOCUMENTO_EXTRAS = ('url',)
+
+
+class ErroParametro(Exception):
+    pass
+
+
+def erro_json(mensagem, status=400):
+    return JsonResponse({'erro': mensagem}, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def api_json(view):
+    """
+    Trata erros de parâmetro como 400 e põe um ETag forte (hash do corpo) nas
+    respostas 200, respondendo 304 quando o cliente já tem a mesma versão.
+    Fica por fora do cache_por_geracao, então o 304 não consulta o banco.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            resposta = view(request, *args, **kwargs)
+        except ErroParametro as erro:
+            return erro_json(str(erro))
+        if resposta.status_code != 200:
+            return resposta
+        set_response_etag(resposta)
+        patch_cache_control(resposta, public=True, no_cache=True)
+        return get_conditional_response(request, etag=resposta['ETag'], response=resposta)
+    return wrapper
+
+
+def responder(dados):
+    return JsonResponse(dados, json_dumps_params={'ensure_ascii': False})
+
+
+# ==============================================================================
+# PARÂMETROS
+# ==============================================================================
+def ler_campos(params, disponiveis, extras):
+    pedidos = params.get('campos')
+    if not pedidos:
+        return [*disponiveis, *extras]
+    campos = [campo.strip() for campo in pedidos.split(',') if campo.strip()]
+    desconhecidos = [campo for campo in campos if campo not in disponiveis and campo not in extras]
+    if desconhecidos:
+        raise ErroParametro(f"Campos desconhecidos: {', '.join(desconhecidos)}")
+    return campos
+
+
+def ler_limite(params):
+    try:
+        limite = int(params.get('limite') or LIMITE_PADRAO)
+    except ValueError:
+        raise ErroParametro("limite precisa ser um número")
+    return min(max(limite, 1), LIMITE_MAXIMO)
+
+
+def colunas_do_values(campos, disponiveis, necessarias=()):
+    # Sempre traz o id (cursor e fotos) mesmo que não tenha sido pedido
+    return list(dict.fromkeys(['id', *necessarias, *(disponiveis[c] for c in campos if c in disponiveis)]))
+
+
+def montar_item(linha, campos, disponiveis, extras):
+    # Só as chaves pedidas, com os nomes da API, na ordem pedida
+    return {campo: extras[campo] if campo in extras else linha[disponiveis[campo]] for campo in campos}
+
+
+def links_da_pagina(request, pagina):
+    def link(cursor, valor):
+        if valor is None:
+            return None
+        params = request.GET.copy()
+        params.pop('apos', None)
+        params.pop('antes', None)
+        params[cursor] = valor
+        return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return link('apos', pagina['proximo']), link('antes', pagina['anterior'])
+
+
+# ==============================================================================
+# PETS
+# ==============================================================================
+def _url_imagem(nome):
+    return FotoPet._meta.get_field('imagem').storage.url(nome) if nome else None
+
+
+def fotos_por_pet(request, ids):
+    # Uma consulta para as fotos de todos os pets da página
+    fotos = {pet_id: [] for pet_id in ids}
+    linhas = (
+        FotoPet.objects.filter(pet_id__in=ids)
+        .order_by('-is_capa', 'ordem', 'id') # A ordem do FotoPet.Meta: capa primeiro
+        .values('pet_id', 'imagem', 'largura', 'altura', 'is_capa')
+    )
+    for linha in linhas:
+        fotos[linha['pet_id']].append({
+            'url': request.build_absolute_uri(_url_imagem(linha['imagem'])),
+            'largura': linha['largura'],
+            'altura': linha['altura'],
+            'capa': linha['is_capa'],
+        })
+    return fotos
+
+
+def serializar_pets(request, linhas, campos):
+    fotos = fotos_por_pet(request, [linha['id'] for linha in linhas]) if 'fotos' in campos else {}
+    itens = []
+    for linha in linhas:
+        if linha.get('foto_capa__imagem'):
+            linha['foto_capa__imagem'] = request.build_absolute_uri(_url_imagem(linha['foto_capa__imagem']))
+        extras = {
+            'url': request.build_absolute_uri(reverse('detalhes_pet', args=[linha['id']])),
+            'fotos': fotos.get(linha['id']),
+        }
+        itens.append(montar_item(linha, campos, CAMPOS_PET, extras))
+    return itens
+
+
+@api_json
+@cache_por_geracao(Pet, FotoPet)
+def api_pets(request):
+    campos = ler_campos(request.GET, CAMPOS_PET, CAMPOS_PET_EXTRAS)
+    filtros = ler_filtros(request.GET, FILTROS_API)
+    linhas = (
+        Pet.objects.filter(status_adocao='DISPONIVEL', **filtros)
+        .values(*colunas_do_values(campos, CAMPOS_PET))
+    )
+    pagina = paginar_por_cursor(linhas, request.GET, ler_limite(request.GET))
+    proximo, anterior = links_da_pagina(request, pagina)
+    return responder({
+        'resultados': serializar_pets(request, pagina['itens'], campos),
+        'proximo': proximo,
+        'anterior': anterior,
+    })
+
+
+@api_json
+@cache_por_geracao(Pet, FotoPet)
+def api_pet(request, pet_id):
+    campos = ler_campos(request.GET, CAMPOS_PET, CAMPOS_PET_EXTRAS)
+    linha = (
+        Pet.objects.filter(pk=pet_id, status_adocao='DISPONIVEL')
+        .values(*colunas_do_values(campos, CAMPOS_PET))
+        .first()
+    )
+    if linha is None:
+        return erro_json("Pet não encontrado", status=404)
+    return responder(serializar_pets(request, [linha], campos)[0])
+
+
+# ==============================================================================
+# DOCUMENTOS DA TRANSPARÊNCIA
+# ==============================================================================
+CATEGORIAS_DOCUMENTO = {valor for valor, _rotulo in DocumentoTransparencia.CATEGORIAS}
+
+
+@api_json
+@cache_por_geracao(DocumentoTransparencia)
+def api_documentos(request):
+    campos = ler_campos(request.GET, CAMPOS_DOCUMENTO, CAMPOS_DOCUMENTO_EXTRAS)
+    documentos = DocumentoTransparencia.objects.all()
+
+    categoria = request.GET.get('categoria')
+    if categoria in CATEGORIAS_DOCUMENTO:
+        documentos = documentos.filter(categoria=categoria)
+    _ano, _mes, inicio, fim = ler_periodo(request.GET)
+    if inicio:
+        documentos = documentos.filter(data_publicacao__gte=inicio, data_publicacao__lt=fim)
+
+    # 'arquivo' só para montar o link com ?v=<hash> (ver DocumentoTransparencia.versao_arquivo)
+    linhas = documentos.values(*colunas_do_values(campos, CAMPOS_DOCUMENTO, ['arquivo'] if 'url' in campos else []))
+    pagina = paginar_por_cursor(linhas, request.GET, ler_limite(request.GET))
+    itens = []
+    for linha in pagina['itens']:
+        extras = {}
+        if 'url' in campos:
+            versao = posixpath.splitext(posixpath.basename(linha['arquivo']))[0]
+            extras['url'] = request.build_absolute_uri(
+                reverse('baixar_documento', args=[linha['id']]) + f'?v={versao}'
+            )
+        itens.append(montar_item(linha, campos, CAMPOS_DOCUMENTO, extras))
+
+    proximo, anterior = links_da_pagina(request, pagina)
+    return responder({'resultados': itens, 'proximo': proximo, 'anterior': anterior})
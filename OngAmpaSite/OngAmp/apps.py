@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class OngampConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'OngAmp'
+
+    def ready(self):
+        from OngAmpaSite.banco import aplicar_pragmas
+
+        # Pragmas do SQLite em cada conexão nova (WAL, busy_timeout, cache...)
+        connection_created.connect(aplicar_pragmas, dispatch_uid='ongamp_pragmas_sqlite')
@@ -0,0 +1,177 @@
+import re
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# ==============================================================================
+# BUSCA DE PETS (SQLite FTS5)
+# ==============================================================================
+# A tabela virtual pet_busca (migration 0024) guarda nome, raça, coloração e
+# descrição de cada pet, com rowid = id do pet. O tokenizador unicode61 com
+# remove_diacritics ignora acentos e maiúsculas ("JOAO" acha "João"), e cada
+# palavra vira um prefixo ("lab" acha "Labrador"). Os sinais em models.py
+# mantêm a tabela em dia. Em outros bancos cai no icontains de sempre.
+
+TABELA_BUSCA = 'pet_busca'
+CAMPOS_BUSCA = ('nome', 'raca', 'coloracao', 'descricao')
+# Peso de cada coluna no bm25: achar no nome vale mais que achar na história
+PESOS_BUSCA = (10.0, 4.0, 2.0, 1.0)
+MAX_PALAVRAS = 8
+
+
+def busca_disponivel():
+    return connection.vendor == 'sqlite'
+
+
+def palavras_da_busca(termo):
+    return re.findall(r'\w+', termo or '')[:MAX_PALAVRAS]
+
+
+def _consulta_fts(palavras):
+    # Cada palavra entre aspas (nada de sintaxe do FTS vinda do visitante) e com *
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def filtrar_por_busca(queryset, termo):
+    """
+    Restringe `queryset` aos pets que casam com `termo`, ordenados por
+    relevância (no SQLite) ou pelos mais novos (fallback com icontains).
+    """
+    palavras = palavras_da_busca(termo)
+    if not palavras:
+        return queryset
+
+    if busca_disponivel():
+        # Junta a tabela FTS direto na consulta dos pets (uma consulta só, guiada
+        # pelo MATCH). extra() porque o ORM não sabe fazer JOIN com tabela virtual.
+        tabela_pet = connection.ops.quote_name(queryset.model._meta.db_table)
+        pesos = ', '.join(map(str, PESOS_BUSCA))
+        return queryset.extra(
+            tables=[TABELA_BUSCA],
+            where=[f'{TABELA_BUSCA}.rowid = {tabela_pet}."id"', f'{TABELA_BUSCA} MATCH %s'],
+            params=[_consulta_fts(palavras)],
+            select={'relevancia': f'bm25({TABELA_BUSCA}, {pesos})'},
+        ).order_by('relevancia', '-pk')
+
+    # Todas as palavras precisam aparecer em algum dos campos
+    condicao = reduce(and_, [
+        reduce(or_, [Q(**{f'{campo}__icontains': palavra}) for campo in CAMPOS_BUSCA])
+        for palavra in palavras
+    ])
+    return queryset.filter(condicao).order_by('-pk')
+
+
+def indexar_pet(pet):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA_BUSCA} WHERE rowid = %s", [pet.pk])
+        cursor.execute(
+            f"INSERT INTO {TABELA_BUSCA} (rowid, {', '.join(CAMPOS_BUSCA)}) VALUES (%s, %s, %s, %s, %s)",
+            [pet.pk, *(getattr(pet, campo) or '' for campo in CAMPOS_BUSCA)],
+        )
+
+
+def indexar_pets(pets):
+    # Pets novos (bulk_create da importação): um executemany só
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {TABELA_BUSCA} (rowid, {', '.join(CAMPOS_BUSCA)}) VALUES (%s, %s, %s, %s, %s)",
+            [[pet.pk, *(getattr(pet, campo) or '' for campo in CAMPOS_BUSCA)] for pet in pets],
+        )
+
+
+def remover_pet_do_indice(pet_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA_BUSCA} WHERE rowid = %s", [pet_id])
+
+
+# ==============================================================================
+# BUSCA NOS DOCUMENTOS DA TRANSPARÊNCIA
+# ==============================================================================
+# Mesma ideia, na tabela documento_busca (migration 0025): título e o texto
+# extraído do PDF (ver extracao.py). O trecho com as palavras destacadas sai
+# pronto do próprio índice (snippet), sem abrir PDF nenhum na hora da busca.
+
+TABELA_DOCUMENTOS = 'documento_busca'
+CAMPOS_DOCUMENTOS = ('titulo', 'texto')
+PESOS_DOCUMENTOS = (5.0, 1.0)
+# Marcadores que não aparecem em texto de PDF; viram <mark> depois do escape
+INICIO_DESTAQUE, FIM_DESTAQUE = '\x02', '\x03'
+TAMANHO_TRECHO = 24 # palavras
+
+
+def indexar_documento(documento):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA_DOCUMENTOS} WHERE rowid = %s", [documento.pk])
+        cursor.execute(
+            f"INSERT INTO {TABELA_DOCUMENTOS} (rowid, titulo, texto) VALUES (%s, %s, %s)",
+            [documento.pk, documento.titulo, documento.texto],
+        )
+
+
+def remover_documento_do_indice(documento_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA_DOCUMENTOS} WHERE rowid = %s", [documento_id])
+
+
+def trecho_html(trecho):
+    # Escapa o texto do PDF e só então troca os marcadores por <mark>
+    return mark_safe(
+        escape(trecho).replace(INICIO_DESTAQUE, '<mark>').replace(FIM_DESTAQUE, '</mark>')
+    )
+
+
+def _trecho_sem_indice(texto, palavras):
+    # Fallback (outros bancos): recorta em volta da primeira palavra encontrada
+    minusculo = texto.lower()
+    posicoes = [minusculo.find(p.lower()) for p in palavras if p.lower() in minusculo]
+    if not posicoes:
+        return texto[:160]
+    inicio = max(min(posicoes) - 80, 0)
+    trecho = texto[inicio:inicio + 160]
+    for palavra in palavras:
+        trecho = re.sub(
+            f'({re.escape(palavra)})', INICIO_DESTAQUE + r'\1' + FIM_DESTAQUE, trecho, flags=re.IGNORECASE,
+        )
+    return ('…' if inicio else '') + trecho + '…'
+
+
+def documentos_por_busca(termo, limite=20):
+    """
+    Documentos que casam com `termo`, do mais relevante para o menos, cada um
+    com .trecho (HTML seguro, palavras em <mark>).
+    """
+    from .models import DocumentoTransparencia
+
+    palavras = palavras_da_busca(termo)
+    if not palavras:
+        return []
+
+    if not busca_disponivel():
+        condicao = reduce(and_, [Q(titulo__icontains=p) | Q(texto__icontains=p) for p in palavras])
+        documentos = list(DocumentoTransparencia.objects.filter(condicao)[:limite])
+        for documento in documentos:
+            documento.trecho = trecho_html(_trecho_sem_indice(documento.texto or documento.titulo, palavras))
+        return documentos
+
+    pesos = ', '.join(map(str, PESOS_DOCUMENTOS))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, snippet({TABELA_DOCUMENTOS}, -1, %s, %s, '…', %s) "
+            f"FROM {TABELA_DOCUMENTOS} WHERE {TABELA_DOCUMENTOS} MATCH %s "
+            f"ORDER BY bm25({TABELA_DOCUMENTOS}, {pesos}) LIMIT %s",
+            [INICIO_DESTAQUE, FIM_DESTAQUE, TAMANHO_TRECHO, _consulta_fts(palavras), limite],
+        )
+        trechos = cursor.fetchall()
+
+    # O texto inteiro fica de fora: a página só mostra título, data e o trecho
+    por_id = DocumentoTransparencia.objects.defer('texto').in_bulk([pk for pk, _trecho in trechos])
+    documentos = []
+    for pk, trecho in trechos:
+        if pk in por_id:
+            por_id[pk].trecho = trecho_html(trecho)
+            documentos.append(por_id[pk])
+    return documentos
@@ -0,0 +1,117 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+# ==============================================================================
+# GERAÇÕES DE DADOS
+# ==============================================================================
+# Cada modelo tem uma "geração" guardada no cache. Os sinais em models.py trocam
+# a geração sempre que um registro é salvo ou apagado. As páginas em cache levam
+# as gerações dos modelos de que dependem na chave, então uma alteração no admin
+# faz a próxima visita cair numa chave nova (e a página antiga simplesmente
+# expira). Nada de adivinhar TTL.
+
+
+def _chave_geracao(modelo):
+    return f'geracao:{modelo._meta.label_lower}'
+
+
+def geracoes(*modelos):
+    chaves = [_chave_geracao(modelo) for modelo in modelos]
+    atuais = cache.get_many(chaves)
+
+    # Cache vazio (reinício, limpeza): começa de um valor que nunca foi usado
+    faltando = {chave: time.time_ns() for chave in chaves if chave not in atuais}
+    if faltando:
+        cache.set_many(faltando, None)
+        atuais.update(faltando)
+
+    return [atuais[chave] for chave in chaves]
+
+
+def avancar_geracao(modelo):
+    # Grava um valor novo em vez de cache.incr(): o FileBasedCache não tem incr
+    # atômico, e dois workers incrementando juntos poderiam perder uma troca.
+    cache.set(_chave_geracao(modelo), time.time_ns(), None)
+
+
+# ==============================================================================
+# CACHE DE PÁGINA INTEIRA
+# ==============================================================================
+def cache_por_geracao(*modelos):
+    """
+    Guarda o HTML da view no cache, com as gerações de `modelos` na chave.
+    Só vale para visitantes anônimos em GET/HEAD (o menu muda para a equipe).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            # Esquema e host entram na chave: a API (e qualquer link absoluto)
+            # não pode servir a um pedido https os links http de outro domínio.
+            # Host lido cru (sem get_host): montar a chave não valida o ALLOWED_HOSTS
+            endereco = f"{request.scheme}://{request.META.get('HTTP_HOST', '')}{request.get_full_path()}"
+            endereco = hashlib.md5(endereco.encode()).hexdigest()
+            versao = '.'.join(str(g) for g in geracoes(*modelos))
+            chave = f'pagina:{view.__name__}:{versao}:{endereco}'
+
+            guardada = cache.get(chave)
+            if guardada is not None:
+                conteudo, cabecalhos = guardada
+                return HttpResponse(conteudo, headers=cabecalhos)
+
+            resposta = view(request, *args, **kwargs)
+            # Erros, redirecionamentos e respostas que mexem em cookie não entram
+            if resposta.status_code == 200 and not resposta.streaming and not resposta.cookies:
+                cache.set(chave, (resposta.content, dict(resposta.items())), settings.CACHE_PAGINAS_TIMEOUT)
+            return resposta
+        return wrapper
+    return decorator
+
+
+# ==============================================================================
+# GET CONDICIONAL (ETag / Last-Modified)
+# ==============================================================================
+def resposta_condicional(validadores):
+    """
+    Responde 304 Not Modified quando o navegador (ou um proxy) já tem a versão
+    atual da página. `validadores(request, *args, **kwargs)` deve devolver
+    (última alteração, assinatura) a partir dos dados que a view usa, numa
+    consulta barata. A assinatura entra no ETag junto com a URL.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            ultima_alteracao, assinatura = validadores(request, *args, **kwargs)
+            # A equipe vê o menu do admin: ETag diferente do visitante comum
+            base = f'{assinatura}|{request.get_full_path()}|{request.user.is_staff}'
+            etag = quote_etag(hashlib.md5(base.encode()).hexdigest())
+            last_modified = int(ultima_alteracao.timestamp()) if ultima_alteracao else None
+
+            resposta = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if resposta is None:
+                resposta = view(request, *args, **kwargs)
+
+            if resposta.status_code in (200, 304):
+                resposta.headers.setdefault('ETag', etag)
+                if last_modified:
+                    resposta.headers.setdefault('Last-Modified', http_date(last_modified))
+                # Pode guardar, mas sempre confirma com o servidor (que responde 304)
+                if request.user.is_authenticated:
+                    patch_cache_control(resposta, private=True, no_cache=True)
+                else:
+                    patch_cache_control(resposta, public=True, no_cache=True)
+            return resposta
+        return wrapper
+    return decorator
@@ -0,0 +1,78 @@
+import threading
+import time
+from dataclasses import dataclass, field, fields
+
+from django.apps import apps
+from django.conf import settings
+
+from .cache import geracoes
+
+
+# ==============================================================================
+# CONFIGURAÇÕES DO SITE (em memória)
+# ==============================================================================
+# A linha única de ConfiguracaoGeral é lida do banco uma vez por processo e
+# servida da memória. Para saber se outro worker alterou a configuração, cada
+# leitura compara a "geração" do modelo no cache (ver cache.py), que os sinais
+# trocam a cada save/delete: uma leitura de cache, nenhuma consulta ao banco.
+# Mesmo sem troca de geração (cache apagado, update() sem sinais) o valor é
+# relido a cada CONFIGURACAO_MAX_IDADE segundos: nenhum worker fica preso nele.
+#
+# Para criar uma configuração nova: um campo em ConfiguracaoGeral (com a
+# migration) e um campo com o mesmo nome e um padrão aqui em Configuracao.
+
+
+@dataclass(frozen=True)
+class Configuracao:
+    # Padrões usados enquanto ninguém salvou a configuração no admin
+    email_recebimento: str = field(default_factory=lambda: settings.EMAIL_ONG_RECEBIMENTO)
+    limite_destaques: int = 4
+
+
+class RegistroConfiguracao:
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._valor = None
+        self._existe = False
+        self._geracao = None
+        self._lido_em = 0
+
+    def _em_dia(self, geracao):
+        return (
+            self._valor is not None
+            and geracao == self._geracao
+            and time.monotonic() - self._lido_em < settings.CONFIGURACAO_MAX_IDADE
+        )
+
+    def _carregar(self):
+        geracao = geracoes(apps.get_model('OngAmp', 'ConfiguracaoGeral'))[0]
+        if self._em_dia(geracao):
+            return
+
+        with self._trava:
+            if self._em_dia(geracao):
+                return # Outra thread já recarregou
+            lido_em = time.monotonic()
+            linha = apps.get_model('OngAmp', 'ConfiguracaoGeral').objects.first()
+            if linha is None:
+                self._valor = Configuracao()
+            else:
+                self._valor = Configuracao(**{f.name: getattr(linha, f.name) for f in fields(Configuracao)})
+            self._existe = linha is not None
+            # A geração lida ANTES da consulta: se mudou no meio, a próxima leitura recarrega
+            self._geracao = geracao
+            self._lido_em = lido_em
+
+    def atual(self):
+        self._carregar()
+        return self._valor
+
+    def existe(self):
+        """Já existe a linha no banco? (o admin esconde o botão "Adicionar")"""
+        self._carregar()
+        return self._existe
+
+
+# Um registro por processo, compartilhado por todas as requisições do worker
+configuracao = RegistroConfiguracao()
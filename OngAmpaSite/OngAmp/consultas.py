@@ -0,0 +1,147 @@
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .cache import geracoes
+from .models import DocumentoTransparencia, Pet
+
+# Filtros da galeria: parâmetro da URL -> (campo do Pet, escolhas, rótulo no HTML)
+FILTROS_PET = {
+    'categoria': ('categoria_pet', Pet.CategoriaPet, 'Espécie'),
+    'porte': ('porte', Pet.Porte, 'Porte'),
+    'idade': ('idade', Pet.Idade, 'Idade'),
+    'sexo': ('sexo', Pet.Sexo, 'Sexo'),
+}
+
+
+def ler_filtros(params, disponiveis=FILTROS_PET):
+    # Só aceita valores que existem nas choices; lixo na URL é ignorado
+    filtros = {}
+    for param, (campo, escolhas, _rotulo) in disponiveis.items():
+        valor = params.get(param)
+        if valor in escolhas.values:
+            filtros[campo] = valor
+    return filtros
+
+
+def contar_facetas(queryset, filtros):
+    """
+    Conta quantos pets existem para cada opção dos filtros numa única consulta
+    (um COUNT(...) FILTER por opção). Cada contagem respeita os outros filtros
+    ativos, mas não o do próprio campo, para o visitante ver as alternativas.
+    """
+    agregados = {'total': Count('pk', filter=Q(**filtros))}
+    for campo, escolhas, _rotulo in FILTROS_PET.values():
+        outros = Q(**{c: v for c, v in filtros.items() if c != campo})
+        for valor in escolhas.values:
+            agregados[f'{campo}_{valor}'] = Count('pk', filter=outros & Q(**{campo: valor}))
+
+    contagens = queryset.aggregate(**agregados)
+
+    grupos = []
+    for param, (campo, escolhas, rotulo) in FILTROS_PET.items():
+        grupos.append({
+            'param': param,
+            'rotulo': rotulo,
+            'opcoes': [
+                {
+                    'valor': valor,
+                    'rotulo': nome,
+                    'total': contagens[f'{campo}_{valor}'],
+                    'ativo': filtros.get(campo) == valor,
+                }
+                for valor, nome in escolhas.choices
+            ],
+        })
+    return contagens['total'], grupos
+
+
+def _ler_cursor(valor):
+    try:
+        return int(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def _id(item):
+    # Instância do modelo ou dicionário de um values() (que precisa trazer o 'id')
+    return item['id'] if isinstance(item, dict) else item.pk
+
+
+def paginar_por_cursor(queryset, params, por_pagina):
+    """
+    Paginação por chave (keyset) em ordem de id decrescente (mais novos primeiro).
+    Usa "WHERE id < cursor LIMIT n+1" em vez de OFFSET, então a página 50 custa
+    o mesmo que a primeira. ?apos=<id> avança e ?antes=<id> volta uma página.
+    Funciona também com querysets de values() (os itens são dicionários).
+    """
+    apos = _ler_cursor(params.get('apos'))
+    antes = _ler_cursor(params.get('antes'))
+
+    if antes is not None:
+        itens = list(queryset.filter(pk__gt=antes).order_by('pk')[:por_pagina + 1])
+        tem_anterior = len(itens) > por_pagina
+        itens = itens[:por_pagina][::-1]
+        tem_proxima = True
+    else:
+        if apos is not None:
+            queryset = queryset.filter(pk__lt=apos)
+        itens = list(queryset.order_by('-pk')[:por_pagina + 1])
+        tem_proxima = len(itens) > por_pagina
+        itens = itens[:por_pagina]
+        tem_anterior = apos is not None
+
+    return {
+        'itens': itens,
+        'proximo': _id(itens[-1]) if itens and tem_proxima else None,
+        'anterior': _id(itens[0]) if itens and tem_anterior else None,
+    }
+
+
+# ==============================================================================
+# PRESTAÇÃO DE CONTAS (filtro por período)
+# ==============================================================================
+def _ler_inteiro(params, nome):
+    # Cada parâmetro por si: um mês inválido não derruba um ano válido
+    try:
+        return int(params.get(nome) or 0)
+    except ValueError:
+        return 0
+
+
+def ler_periodo(params):
+    """
+    Lê ?ano= e ?mes= e devolve (ano, mes, inicio, fim), com o intervalo
+    [inicio, fim) pronto para filtrar data_publicacao por faixa (usa o índice
+    (categoria, data_publicacao), ao contrário de __year/__month).
+    Valores inválidos são ignorados; o mês só vale junto com o ano.
+    """
+    ano, mes = _ler_inteiro(params, 'ano'), _ler_inteiro(params, 'mes')
+    if not datetime.MINYEAR < ano < datetime.MAXYEAR:
+        return None, None, None, None
+    if not 1 <= mes <= 12:
+        return ano, None, datetime.date(ano, 1, 1), datetime.date(ano + 1, 1, 1)
+
+    inicio = datetime.date(ano, mes, 1)
+    fim = datetime.date(ano + (mes == 12), mes % 12 + 1, 1)
+    return ano, mes, inicio, fim
+
+
+def meses_com_documentos():
+    """
+    {ano: [meses]} dos documentos mensais, do mais recente para o mais antigo.
+    Calculado uma vez e guardado no cache com a geração de DocumentoTransparencia
+    na chave: um documento novo no admin gera um mapa novo na próxima visita.
+    """
+    chave = f'meses_documentos:{geracoes(DocumentoTransparencia)[0]}'
+    mapa = cache.get(chave)
+    if mapa is None:
+        mapa = {}
+        datas = DocumentoTransparencia.objects.filter(categoria='MENSAL').dates('data_publicacao', 'month', order='DESC')
+        for data in datas:
+            mapa.setdefault(data.year, []).append(data.month)
+        for meses in mapa.values():
+            meses.sort()
+        cache.set(chave, mapa, None)
+    return mapa
@@ -0,0 +1,174 @@
+import atexit
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import F
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+from .models import DocumentoTransparencia
+
+BLOCO = 64 * 1024
+UM_ANO = 60 * 60 * 24 * 365
+
+
+# ==============================================================================
+# CONTAGEM DE DOWNLOADS (em lote)
+# ==============================================================================
+# Um UPDATE por download faria cada visita ao PDF disputar a trava de escrita
+# do banco. As contagens ficam somando na memória do processo e vão para o
+# banco de tempos em tempos, um UPDATE por documento. Se o processo morrer
+# antes, perde-se no máximo um intervalo de contagens.
+class ContadorDownloads:
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._pendentes = Counter()
+        self._ultimo_envio = time.monotonic()
+
+    def registrar(self, documento_id):
+        with self._trava:
+            self._pendentes[documento_id] += 1
+            vencido = time.monotonic() - self._ultimo_envio >= settings.DOCUMENTOS_CONTAGEM_INTERVALO
+        if vencido:
+            self.gravar()
+
+    def gravar(self):
+        with self._trava:
+            pendentes, self._pendentes = self._pendentes, Counter()
+            self._ultimo_envio = time.monotonic()
+        # update() não mexe em atualizado_em nem dispara sinais: contar
+        # downloads não invalida o cache das páginas nem o ETag do documento
+        for documento_id, total in pendentes.items():
+            DocumentoTransparencia.objects.filter(pk=documento_id).update(downloads=F('downloads') + total)
+        return sum(pendentes.values())
+
+
+contador = ContadorDownloads()
+atexit.register(contador.gravar)
+
+
+# ==============================================================================
+# ENVIO DO ARQUIVO
+# ==============================================================================
+class _Trecho:
+    # Lê só `tamanho` bytes a partir da posição atual (resposta 206)
+    def __init__(self, arquivo, tamanho):
+        self.arquivo = arquivo
+        self.restante = tamanho
+
+    def read(self, n=-1):
+        if self.restante <= 0:
+            return b''
+        if n < 0 or n > self.restante:
+            n = self.restante
+        dados = self.arquivo.read(n)
+        self.restante -= len(dados)
+        return dados
+
+    def close(self):
+        self.arquivo.close()
+
+
+def ler_intervalo(cabecalho, tamanho):
+    """
+    Interpreta "Range: bytes=inicio-fim" e devolve (inicio, fim) inclusivo,
+    None se não há intervalo utilizável (responde o arquivo todo) ou False se
+    o intervalo está fora do arquivo (416). Vários intervalos numa requisição
+    são raros em leitores de PDF; nesse caso manda o arquivo inteiro.
+    """
+    encontrado = re.fullmatch(r'bytes=(\d*)-(\d*)', (cabecalho or '').strip())
+    if not encontrado or encontrado.groups() == ('', ''):
+        return None
+    inicio, fim = encontrado.groups()
+    if inicio == '':
+        # "bytes=-500": os últimos 500 bytes
+        inicio, fim = max(tamanho - int(fim), 0), tamanho - 1
+    else:
+        inicio, fim = int(inicio), min(int(fim) if fim else tamanho - 1, tamanho - 1)
+    if inicio >= tamanho or inicio > fim:
+        return False
+    return inicio, fim
+
+
+def responder_documento(request, documento):
+    """
+    Resposta de download do PDF com ETag (o nome já é o hash do conteúdo),
+    Last-Modified, cache longo e suporte a Range. Com DOCUMENTOS_ENVIO
+    'x-accel' ou 'x-sendfile', só valida e deixa o nginx/Apache mandar os bytes.
+    """
+    etag = quote_etag(documento.versao_arquivo)
+    ultima_alteracao = int(documento.atualizado_em.timestamp())
+
+    resposta = get_conditional_response(request, etag=etag, last_modified=ultima_alteracao)
+    if resposta is None:
+        resposta = _enviar(request, documento, etag)
+
+    resposta.headers.setdefault('ETag', etag)
+    resposta.headers.setdefault('Last-Modified', http_date(ultima_alteracao))
+    if request.GET.get('v') == documento.versao_arquivo:
+        # Link com ?v=<hash>: esta URL sempre terá este conteúdo
+        patch_cache_control(resposta, public=True, max_age=UM_ANO, immutable=True)
+    else:
+        patch_cache_control(resposta, public=True, max_age=60 * 60)
+    return resposta
+
+
+def _enviar(request, documento, etag):
+    arquivo = documento.arquivo
+    envio = settings.DOCUMENTOS_ENVIO
+    intervalo_pedido = request.headers.get('Range', '')
+
+    if envio in ('x-accel', 'x-sendfile'):
+        # Os bytes (e os Range) ficam com o servidor web; o Django só responde
+        # os cabeçalhos, que ele repassa junto com o arquivo
+        resposta = HttpResponse(content_type='application/pdf')
+        resposta['Content-Disposition'] = content_disposition_header(False, documento.nome_download)
+        if envio == 'x-accel':
+            # nginx: location /_documentos/ { internal; alias /caminho/do/media/; }
+            resposta['X-Accel-Redirect'] = settings.DOCUMENTOS_X_ACCEL_LOCAL + arquivo.name
+        else:
+            resposta['X-Sendfile'] = arquivo.path
+        # O tamanho (um stat) só faz falta para saber se o Range pede o arquivo todo
+        tamanho = arquivo.size if intervalo_pedido else 0
+        intervalo = ler_intervalo(intervalo_pedido, tamanho) if intervalo_pedido else None
+        _contar_download(request, documento, intervalo, tamanho)
+        return resposta
+
+    tamanho = arquivo.size
+    # If-Range: só manda o trecho se o navegador tem a mesma versão
+    if_range = request.headers.get('If-Range')
+    intervalo = ler_intervalo(intervalo_pedido, tamanho) if if_range in (None, etag) else None
+    _contar_download(request, documento, intervalo, tamanho)
+
+    if intervalo is False:
+        resposta = HttpResponse(status=416)
+        resposta['Content-Range'] = f'bytes */{tamanho}'
+        return resposta
+
+    aberto = arquivo.storage.open(arquivo.name, 'rb')
+    if intervalo is None:
+        resposta = FileResponse(aberto, content_type='application/pdf', filename=documento.nome_download)
+    else:
+        inicio, fim = intervalo
+        aberto.seek(inicio)
+        resposta = FileResponse(
+            _Trecho(aberto, fim - inicio + 1), status=206,
+            content_type='application/pdf', filename=documento.nome_download,
+        )
+        resposta['Content-Range'] = f'bytes {inicio}-{fim}/{tamanho}'
+        resposta['Content-Length'] = fim - inicio + 1
+    resposta.block_size = BLOCO
+    resposta['Accept-Ranges'] = 'bytes'
+    return resposta
+
+
+def _contar_download(request, documento, intervalo, tamanho):
+    # Só o GET do arquivo inteiro é um download: HEAD, as sondagens de Range
+    # ("bytes=0-0") e os trechos que o leitor de PDF pede depois não contam
+    if request.method == 'GET' and intervalo in (None, (0, tamanho - 1)):
+        contador.registrar(documento.pk)
@@ -0,0 +1,124 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .medicao import medir
+from .models import EmailPendente
+
+logger = logging.getLogger(__name__)
+
+# Enquanto um worker está enviando, o e-mail fica "reservado" por este tempo.
+# Se o processo morrer no meio, outro worker pega de novo depois do prazo.
+RESERVA = timedelta(minutes=5)
+
+
+def enfileirar_email(assunto, mensagem, destinatarios, remetente=None):
+    # Só grava na tabela; quem envia é o comando "enviar_emails".
+    # Chame dentro do mesmo transaction.atomic() que salva os dados do e-mail.
+    return EmailPendente.objects.create(
+        assunto=assunto,
+        mensagem=mensagem,
+        remetente=remetente or settings.DEFAULT_FROM_EMAIL or '',
+        destinatarios='\n'.join(destinatarios),
+    )
+
+
+def _espera_apos_falha(tentativas):
+    # Backoff exponencial: 1min, 2min, 4min... limitado a 1 hora
+    base = getattr(settings, 'EMAIL_FILA_BACKOFF_SEGUNDOS', 60)
+    return timedelta(seconds=min(base * 2 ** (tentativas - 1), 3600))
+
+
+def _registrar_falha(email, erro):
+    max_tentativas = getattr(settings, 'EMAIL_FILA_MAX_TENTATIVAS', 5)
+    email.tentativas += 1
+    email.ultimo_erro = repr(erro)
+    if email.tentativas >= max_tentativas:
+        # Vai para a "caixa morta": fica visível no admin para reenviar manualmente
+        email.status = EmailPendente.Status.FALHOU
+        logger.error("E-mail %s descartado após %s tentativas: %r", email.pk, email.tentativas, erro)
+    else:
+        email.proxima_tentativa = timezone.now() + _espera_apos_falha(email.tentativas)
+        logger.warning("Falha ao enviar e-mail %s (tentativa %s): %r", email.pk, email.tentativas, erro)
+    email.save(update_fields=['tentativas', 'ultimo_erro', 'status', 'proxima_tentativa'])
+
+
+def _reservar(lote):
+    # Marca cada e-mail com um UPDATE condicional; se outro worker já pegou, pula
+    agora = timezone.now()
+    candidatos = list(
+        EmailPendente.objects.filter(
+            status=EmailPendente.Status.PENDENTE,
+            proxima_tentativa__lte=agora,
+        ).order_by('proxima_tentativa', 'id')[:lote]
+    )
+    reservados = []
+    for email in candidatos:
+        reservado = EmailPendente.objects.filter(
+            pk=email.pk,
+            proxima_tentativa=email.proxima_tentativa,
+        ).update(proxima_tentativa=agora + RESERVA)
+        if reservado:
+            reservados.append(email)
+    return reservados
+
+
+def processar_fila(lote=50):
+    """
+    Envia um lote de e-mails pendentes usando UMA conexão SMTP para todos.
+    Devolve (enviados, falhas).
+    """
+    emails = _reservar(lote)
+    if not emails:
+        return 0, 0
+
+    conexao = get_connection(fail_silently=False)
+    try:
+        with medir('smtp'):
+            conexao.open()
+    except Exception as erro:
+        # Servidor fora do ar: nenhum e-mail do lote sai, todos voltam para a fila
+        for email in emails:
+            _registrar_falha(email, erro)
+        return 0, len(emails)
+
+    enviados = falhas = 0
+    try:
+        for posicao, email in enumerate(emails):
+            mensagem = EmailMessage(
+                subject=email.assunto,
+                body=email.mensagem,
+                from_email=email.remetente or None,
+                to=email.destinatarios.split('\n'),
+                connection=conexao,
+            )
+            try:
+                with medir('smtp'):
+                    mensagem.send()
+            except Exception as erro:
+                _registrar_falha(email, erro)
+                falhas += 1
+                # A conexão pode ter caído: reconecta uma vez e segue com ela
+                conexao.close()
+                try:
+                    with medir('smtp'):
+                        conexao.open()
+                except Exception as erro:
+                    restantes = emails[posicao + 1:]
+                    for restante in restantes:
+                        _registrar_falha(restante, erro)
+                    falhas += len(restantes)
+                    break
+            else:
+                email.status = EmailPendente.Status.ENVIADO
+                email.enviado_em = timezone.now()
+                email.tentativas += 1
+                email.save(update_fields=['status', 'enviado_em', 'tentativas'])
+                enviados += 1
+    finally:
+        conexao.close()
+
+    return enviados, falhas
@@ -0,0 +1,169 @@
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Adocao, EstatisticaMensal, EstatisticaVoluntario, Pet
+
+# ==============================================================================
+# ESTATÍSTICAS DE ADOÇÃO
+# ==============================================================================
+# Cada adoção "contribui" com +1 na linha (mês, espécie) e na linha do
+# voluntário, e com os dias entre a entrada do pet na ONG e a adoção. Os
+# sinais da Adocao (models.py) somam ao criar e descontam ao excluir ou editar,
+# com UPDATE ... SET x = x + n (dois voluntários registrando ao mesmo tempo
+# não perdem contagem). O painel do admin só lê as tabelas de resumo.
+#
+# Mudanças feitas por fora das adoções (trocar a espécie ou a data de entrada
+# de um pet já adotado) não são acompanhadas: rode recalcular_estatisticas.
+
+CAMPOS_CONTRIBUICAO = ('data', 'voluntario_id', 'pet__categoria_pet', 'pet__data_entrada')
+MESES_NO_PAINEL = 12
+
+
+def _contribuicao(data, voluntario_id, categoria_pet, data_entrada):
+    dias = None
+    if data_entrada is not None:
+        dias = max((data - data_entrada).days, 0)
+    return {
+        'mes': timezone.localtime(data).date().replace(day=1),
+        'categoria_pet': categoria_pet,
+        'voluntario_id': voluntario_id,
+        'dias': dias,
+    }
+
+
+def contribuicao(adocao):
+    pet = adocao.pet
+    return _contribuicao(adocao.data, adocao.voluntario_id, pet.categoria_pet, pet.data_entrada)
+
+
+def contribuicao_salva(adocao_id):
+    # Como a adoção está no banco agora (antes de uma edição ser gravada)
+    linha = Adocao.objects.filter(pk=adocao_id).values(*CAMPOS_CONTRIBUICAO).first()
+    return _contribuicao(*(linha[campo] for campo in CAMPOS_CONTRIBUICAO)) if linha else None
+
+
+def _somar(modelo, chave, incrementos):
+    if all(valor >= 0 for valor in incrementos.values()):
+        atualizacao = {campo: F(campo) + valor for campo, valor in incrementos.items()}
+    else:
+        # Nunca abaixo de zero, mesmo se o resumo estiver defasado
+        atualizacao = {campo: Greatest(F(campo) + valor, 0) for campo, valor in incrementos.items()}
+    if modelo.objects.filter(**chave).update(**atualizacao) or incrementos['adocoes'] < 0:
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**chave, **incrementos)
+    except IntegrityError:
+        # Outra requisição criou a linha entre o UPDATE e o INSERT
+        modelo.objects.filter(**chave).update(**atualizacao)
+
+
+def aplicar(contribuicao, sinal):
+    """Soma (sinal=+1) ou desconta (sinal=-1) uma adoção dos resumos."""
+    dias = contribuicao['dias']
+    with transaction.atomic():
+        _somar(
+            EstatisticaMensal,
+            {'mes': contribuicao['mes'], 'categoria_pet': contribuicao['categoria_pet']},
+            {
+                'adocoes': sinal,
+                'soma_dias': sinal * (dias or 0),
+                'com_data_entrada': sinal * (dias is not None),
+            },
+        )
+        if contribuicao['voluntario_id']:
+            _somar(EstatisticaVoluntario, {'voluntario_id': contribuicao['voluntario_id']}, {'adocoes': sinal})
+
+
+def somar_contribuicoes(linhas):
+    """
+    Totais a partir de linhas com CAMPOS_CONTRIBUICAO (values() das adoções):
+    ({(mes, categoria): {adocoes, soma_dias, com_data_entrada}}, {voluntario_id: adocoes}).
+    Usado pelo recálculo completo (a migration 0026 tem a própria cópia da conta).
+    """
+    mensais = defaultdict(Counter)
+    voluntarios = Counter()
+    for linha in linhas:
+        item = _contribuicao(*(linha[campo] for campo in CAMPOS_CONTRIBUICAO))
+        totais = mensais[item['mes'], item['categoria_pet']]
+        totais['adocoes'] += 1
+        if item['dias'] is not None:
+            totais['soma_dias'] += item['dias']
+            totais['com_data_entrada'] += 1
+        if item['voluntario_id']:
+            voluntarios[item['voluntario_id']] += 1
+    return mensais, voluntarios
+
+
+def recalcular():
+    """Apaga e refaz os resumos a partir de todas as adoções. Devolve quantas leu."""
+    linhas = Adocao.objects.values(*CAMPOS_CONTRIBUICAO)
+    with transaction.atomic():
+        mensais, voluntarios = somar_contribuicoes(linhas.iterator())
+        EstatisticaMensal.objects.all().delete()
+        EstatisticaVoluntario.objects.all().delete()
+        EstatisticaMensal.objects.bulk_create([
+            EstatisticaMensal(mes=mes, categoria_pet=categoria, **totais)
+            for (mes, categoria), totais in mensais.items()
+        ])
+        EstatisticaVoluntario.objects.bulk_create([
+            EstatisticaVoluntario(voluntario_id=voluntario_id, adocoes=total)
+            for voluntario_id, total in voluntarios.items()
+        ])
+    return sum(totais['adocoes'] for totais in mensais.values())
+
+
+# ==============================================================================
+# PAINEL
+# ==============================================================================
+def _media(soma_dias, com_data_entrada):
+    return round(soma_dias / com_data_entrada, 1) if com_data_entrada else None
+
+
+def dados_do_painel():
+    """Tudo o que o painel mostra, em duas consultas às tabelas de resumo."""
+    por_mes = defaultdict(Counter)
+    por_especie = defaultdict(Counter)
+    for linha in EstatisticaMensal.objects.order_by('mes'):
+        por_mes[linha.mes][linha.categoria_pet] += linha.adocoes
+        totais = por_especie[linha.categoria_pet]
+        totais['adocoes'] += linha.adocoes
+        totais['soma_dias'] += linha.soma_dias
+        totais['com_data_entrada'] += linha.com_data_entrada
+
+    ultimos = sorted(por_mes)[-MESES_NO_PAINEL:]
+    maior_mes = max((sum(por_mes[mes].values()) for mes in ultimos), default=0)
+    meses = [
+        {
+            'mes': mes,
+            'cachorros': por_mes[mes][Pet.CategoriaPet.CACHORRO],
+            'gatos': por_mes[mes][Pet.CategoriaPet.GATO],
+            'total': sum(por_mes[mes].values()),
+            'largura': round(100 * sum(por_mes[mes].values()) / maior_mes) if maior_mes else 0,
+        }
+        for mes in reversed(ultimos)
+    ]
+
+    especies = [
+        {
+            'rotulo': rotulo,
+            'adocoes': por_especie[valor]['adocoes'],
+            'media_dias': _media(por_especie[valor]['soma_dias'], por_especie[valor]['com_data_entrada']),
+        }
+        for valor, rotulo in Pet.CategoriaPet.choices
+    ]
+
+    geral = sum(por_especie.values(), Counter())
+    voluntarios = EstatisticaVoluntario.objects.select_related('voluntario').filter(adocoes__gt=0).order_by('-adocoes')
+
+    return {
+        'total_adocoes': geral['adocoes'],
+        'media_dias': _media(geral['soma_dias'], geral['com_data_entrada']),
+        'meses': meses,
+        'especies': especies,
+        'voluntarios': [(linha.voluntario.nome, linha.adocoes) for linha in voluntarios],
+    }
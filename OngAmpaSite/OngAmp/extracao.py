@@ -0,0 +1,64 @@
+import logging
+import re
+
+from django.db import transaction
+from django.utils import timezone
+
+from .busca import busca_disponivel, indexar_documento
+from .cache import avancar_geracao
+from .models import DocumentoTransparencia
+
+try:
+    from pypdf import PdfReader
+except ImportError: # Está no requirements.txt; sem ele a extração fica desligada
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+# Balancetes longos: o que passar disso não ajuda a busca e só pesa no banco
+MAX_CARACTERES = 500_000
+
+
+def extrair_texto_pdf(arquivo):
+    """Texto de todas as páginas do PDF (pypdf, Python puro), com espaços normalizados."""
+    if PdfReader is None:
+        raise RuntimeError("pypdf não está instalado (pip install pypdf)")
+    with arquivo.open('rb') as aberto:
+        leitor = PdfReader(aberto)
+        paginas = [pagina.extract_text() or '' for pagina in leitor.pages]
+    return re.sub(r'\s+', ' ', ' '.join(paginas)).strip()[:MAX_CARACTERES]
+
+
+def processar_pendentes(lote=10):
+    """
+    Extrai o texto dos documentos na fila (texto_extraido_em vazio).
+    Chamado pelo comando "extrair_textos", fora das requisições, para o save
+    no admin não esperar a leitura do PDF. Devolve (extraidos, falhas).
+    """
+    if PdfReader is None:
+        logger.warning("Extração de texto desligada: pypdf não está instalado.")
+        return 0, 0
+
+    pendentes = DocumentoTransparencia.objects.filter(texto_extraido_em__isnull=True).order_by('id')[:lote]
+    extraidos = falhas = 0
+    for documento in pendentes:
+        try:
+            texto, erro = extrair_texto_pdf(documento.arquivo), ''
+            extraidos += 1
+        except Exception as excecao: # PDF corrompido, protegido por senha...
+            texto, erro = '', repr(excecao)[:255]
+            falhas += 1
+            logger.warning("Não foi possível ler o PDF do documento %s: %r", documento.pk, excecao)
+
+        with transaction.atomic():
+            # Só grava se o arquivo ainda é o mesmo (pode ter sido trocado no meio)
+            gravado = DocumentoTransparencia.objects.filter(
+                pk=documento.pk, arquivo=documento.arquivo.name, texto_extraido_em__isnull=True,
+            ).update(texto=texto, texto_erro=erro, texto_extraido_em=timezone.now())
+            if gravado:
+                documento.texto = texto
+                if busca_disponivel():
+                    indexar_documento(documento)
+                # update() não dispara sinais: a página de busca em cache precisa saber
+                transaction.on_commit(lambda: avancar_geracao(DocumentoTransparencia))
+    return extraidos, falhas
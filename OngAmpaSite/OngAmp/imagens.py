@@ -0,0 +1,100 @@
+import base64
+import hashlib
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Lado maior da miniatura borrada (LQIP). Pequeno de propósito: o data URI
+# fica com poucas centenas de bytes e vai direto no HTML.
+PLACEHOLDER_LADO = 16
+
+
+def extrair_metadados(arquivo):
+    """
+    Lê a imagem enviada uma única vez e devolve (largura, altura, placeholder).
+    O placeholder é um data URI JPEG minúsculo usado como fundo enquanto a foto
+    real carrega. Se o arquivo não puder ser lido, devolve (None, None, '').
+    """
+    try:
+        arquivo.seek(0)
+        with Image.open(arquivo) as img:
+            # Fotos de celular vêm "deitadas" com a rotação só no EXIF
+            img = ImageOps.exif_transpose(img)
+            largura, altura = img.size
+
+            mini = img.convert('RGB')
+            mini.thumbnail((PLACEHOLDER_LADO, PLACEHOLDER_LADO))
+            buffer = BytesIO()
+            mini.save(buffer, format='JPEG', quality=40)
+    except (OSError, ValueError):
+        return None, None, ''
+    finally:
+        arquivo.seek(0)
+
+    placeholder = 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+    return largura, altura, placeholder
+
+
+# ==============================================================================
+# VERSÕES REDIMENSIONADAS (srcset)
+# ==============================================================================
+# Larguras geradas para cada foto. Se mudar aqui, rode:
+#   python manage.py gerar_derivadas
+LARGURAS_DERIVADAS = (320, 640, 1024, 1600)
+
+# extensão -> (formato do Pillow, opções de compressão)
+FORMATOS_DERIVADOS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _versao_derivadas():
+    # Muda junto com tudo que altera os bytes gerados (opções de compressão e
+    # versão do Pillow): a URL de uma derivada nunca passa a servir outra imagem
+    assinatura = repr((Image.__version__, sorted(FORMATOS_DERIVADOS.items())))
+    return hashlib.sha256(assinatura.encode()).hexdigest()[:8]
+
+
+VERSAO_DERIVADAS = _versao_derivadas()
+
+
+def caminho_derivada(nome_original, largura, extensao, versao=VERSAO_DERIVADAS):
+    # img_pets/lilica.png -> img_pets/derivadas/lilica-640-3f2a9c1b.webp
+    # (versao='' é o nome antigo, sem versão, das fotos geradas antes dela existir)
+    pasta, arquivo = posixpath.split(nome_original)
+    base = posixpath.splitext(arquivo)[0]
+    sufixo = f'-{versao}' if versao else ''
+    return posixpath.join(pasta, 'derivadas', f'{base}-{largura}{sufixo}.{extensao}')
+
+
+def gerar_derivadas(nome_original, storage=None):
+    """
+    Cria as versões WebP + JPEG da foto em cada largura de LARGURAS_DERIVADAS
+    (nunca amplia: fotos pequenas ganham só a própria largura).
+    Devolve a lista de larguras geradas, que vai para FotoPet.larguras_derivadas
+    (os arquivos ficam com o nome da VERSAO_DERIVADAS atual).
+    """
+    storage = storage or default_storage
+
+    with storage.open(nome_original, 'rb') as arquivo, Image.open(arquivo) as img:
+        img = ImageOps.exif_transpose(img).convert('RGB')
+        larguras = sorted({min(largura, img.width) for largura in LARGURAS_DERIVADAS})
+
+        for largura in larguras:
+            altura = max(1, round(img.height * largura / img.width))
+            reduzida = img if largura == img.width else img.resize((largura, altura), Image.Resampling.LANCZOS)
+
+            for extensao, (formato, opcoes) in FORMATOS_DERIVADOS.items():
+                buffer = BytesIO()
+                reduzida.save(buffer, format=formato, **opcoes)
+                caminho = caminho_derivada(nome_original, largura, extensao)
+                # Mesmo original + mesma versão = mesmos bytes: um arquivo já
+                # publicado nunca é reescrito (a URL fica em cache para sempre)
+                if not storage.exists(caminho):
+                    storage.save(caminho, ContentFile(buffer.getvalue()))
+
+    return larguras
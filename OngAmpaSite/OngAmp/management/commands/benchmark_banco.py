@@ -0,0 +1,111 @@
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+TABELA = 'benchmark_ongampa'
+LINHAS = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede leituras e escritas simultâneas no banco: vários leitores (como as "
+        "páginas públicas) enquanto escritores gravam (como o admin). Com SQLite, "
+        "compara o modo padrão com o perfil ajustado de OngAmpaSite/banco.py numa "
+        "cópia temporária; com BANCO=postgres, mede o PostgreSQL configurado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leitores', type=int, default=8)
+        parser.add_argument('--escritores', type=int, default=2)
+        parser.add_argument('--segundos', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        # Nunca mexe no db.sqlite3 do site: cada perfil SQLite roda num arquivo
+        # descartável, apagado com a pasta no fim
+        with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as pasta:
+            self.comparar(pasta, options)
+
+    def comparar(self, pasta, options):
+        padrao = connections.databases['default']
+
+        if padrao['ENGINE'].endswith('sqlite3'):
+            perfis = {
+                'sqlite padrão': {**padrao, 'NAME': Path(pasta) / 'padrao.sqlite3',
+                                  'PRAGMAS': {}, 'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+                'sqlite ajustado': {**padrao, 'NAME': Path(pasta) / 'ajustado.sqlite3'},
+            }
+        else:
+            # No PostgreSQL usa o próprio banco, numa tabela à parte (apagada no fim)
+            perfis = {padrao['ENGINE'].rsplit('.', 1)[-1]: padrao}
+
+        for numero, (nome, configuracao) in enumerate(perfis.items()):
+            alias = f'benchmark_{numero}'
+            connections.databases[alias] = configuracao
+            try:
+                self.medir(nome, alias, options)
+            finally:
+                self.executar(alias, f'DROP TABLE IF EXISTS {TABELA}')
+                connections[alias].close()
+                del connections[alias]
+                del connections.databases[alias]
+
+    def executar(self, alias, sql, parametros=None):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql, parametros)
+            return cursor.fetchall() if cursor.description else None
+
+    def medir(self, nome, alias, options):
+        self.executar(alias, f'DROP TABLE IF EXISTS {TABELA}')
+        self.executar(alias, f'CREATE TABLE {TABELA} (id INTEGER PRIMARY KEY, valor INTEGER NOT NULL)')
+        with connections[alias].cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {TABELA} (id, valor) VALUES (%s, %s)',
+                               [(i, 0) for i in range(LINHAS)])
+
+        fim = time.monotonic() + options['segundos']
+        resultados = {'leitura': [], 'escrita': []}
+        erros = {'leitura': 0, 'escrita': 0}
+        trava = threading.Lock()
+
+        def trabalhador(tipo, numero):
+            latencias = []
+            falhas = 0
+            i = numero
+            try:
+                while time.monotonic() < fim:
+                    inicio = time.perf_counter()
+                    try:
+                        if tipo == 'leitura':
+                            self.executar(alias, f'SELECT SUM(valor) FROM {TABELA} WHERE id < %s', [LINHAS // 2])
+                        else:
+                            with connections[alias].cursor() as cursor:
+                                cursor.execute(f'UPDATE {TABELA} SET valor = valor + 1 WHERE id = %s', [i % LINHAS])
+                    except DatabaseError:
+                        falhas += 1 # "database is locked" e afins
+                        continue
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+                    i += 7
+            finally:
+                connections[alias].close()
+                with trava:
+                    resultados[tipo].extend(latencias)
+                    erros[tipo] += falhas
+
+        threads = [threading.Thread(target=trabalhador, args=('leitura', n)) for n in range(options['leitores'])]
+        threads += [threading.Thread(target=trabalhador, args=('escrita', n)) for n in range(options['escritores'])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(nome))
+        for tipo, latencias in resultados.items():
+            por_segundo = len(latencias) / options['segundos']
+            p95 = statistics.quantiles(latencias, n=20)[-1] if len(latencias) > 1 else 0.0
+            self.stdout.write(
+                f"  {tipo:8} {por_segundo:9.0f}/s   p95 {p95:7.2f} ms   erros {erros[tipo]}"
+            )
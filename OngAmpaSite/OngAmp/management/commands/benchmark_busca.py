@@ -0,0 +1,95 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from OngAmp.busca import busca_disponivel, filtrar_por_busca, indexar_pet
+from OngAmp.models import Pet
+
+# Como uma página de resultados: conta o total e traz os primeiros
+LIMITE = 48
+
+NOMES = ['Rex', 'Mia', 'Thor', 'Luna', 'Bolinha', 'Pipoca', 'Amora', 'Zeus', 'Nina', 'Fumaça']
+RACAS = ['SRD', 'Labrador', 'Poodle', 'Siamês', 'Pinscher', 'Persa', 'Beagle']
+CORES = ['Caramelo', 'Preto', 'Branco', 'Tricolor', 'Rajado', 'Cinza']
+FRASES = [
+    'Resgatado na praça perto da rodoviária.', 'Muito dócil com crianças.',
+    'Chegou magrinho e hoje está saudável.', 'Adora brincar de bolinha.',
+    'Foi encontrado na chuva, com medo de trovão.', 'Convive bem com gatos.',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a busca de pets pelo índice FTS5 com o icontains antigo do admin. "
+        "Com --gerar N cria N pets de mentira dentro de uma transação desfeita no fim "
+        "(o banco não muda)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('termos', nargs='*', default=['caramelo', 'praca', 'crianças dócil', 'thor 1234'])
+        parser.add_argument('--gerar', type=int, default=0)
+        parser.add_argument('--repeticoes', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if not busca_disponivel():
+            raise CommandError("O índice FTS5 só existe no SQLite.")
+
+        with transaction.atomic():
+            if options['gerar']:
+                self.gerar(options['gerar'])
+            self.stdout.write(f"{Pet.objects.count()} pets na tabela")
+            for termo in options['termos']:
+                self.comparar(termo, options['repeticoes'])
+            transaction.set_rollback(True)
+
+    def gerar(self, quantidade):
+        sorteio = random.Random(42)
+        pets = Pet.objects.bulk_create([
+            Pet(
+                nome=f'{sorteio.choice(NOMES)} {i}',
+                raca=sorteio.choice(RACAS),
+                coloracao=sorteio.choice(CORES),
+                descricao=' '.join(sorteio.sample(FRASES, 3)) * 4,
+            )
+            for i in range(quantidade)
+        ], batch_size=500)
+        # bulk_create não dispara sinais: indexa à mão
+        for pet in pets:
+            indexar_pet(pet)
+
+    def medir(self, funcao, repeticoes):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tempos), resultado
+
+    def comparar(self, termo, repeticoes):
+        palavras = termo.split()
+        campos = ('nome', 'raca', 'coloracao', 'descricao')
+
+        def icontains():
+            # O mesmo que o admin fazia com search_fields
+            qs = Pet.objects.all()
+            for palavra in palavras:
+                condicao = None
+                for campo in campos:
+                    q = Pet.objects.filter(**{f'{campo}__icontains': palavra})
+                    condicao = q if condicao is None else condicao | q
+                qs = qs & condicao
+            return qs.count(), list(qs.order_by('-pk').values_list('pk', flat=True)[:LIMITE])
+
+        def fts():
+            qs = filtrar_por_busca(Pet.objects.all(), termo)
+            return qs.count(), list(qs.values_list('pk', flat=True)[:LIMITE])
+
+        tempo_like, (achados_like, _) = self.medir(icontains, repeticoes)
+        tempo_fts, (achados_fts, _) = self.medir(fts, repeticoes)
+        self.stdout.write(
+            f"  {termo!r:22} icontains {tempo_like:8.2f} ms ({achados_like} achados)   "
+            f"fts5 {tempo_fts:8.2f} ms ({achados_fts} achados)"
+        )
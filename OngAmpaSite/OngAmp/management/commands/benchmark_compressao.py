@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management.base import BaseCommand, CommandError
+from django.middleware.csrf import CsrfViewMiddleware
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from OngAmp.middleware import brotli, comprimir_conteudo, tem_token_csrf
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede quanto o middleware Comprimir economiza em cada página pública e "
+        "quanto custa de CPU por requisição, comparando gzip, gzip com o "
+        "embaralhamento anti-BREACH e brotli (se instalado)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*')
+        parser.add_argument('--repeticoes', type=int, default=50)
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or [
+            reverse('index'), reverse('lista_pets'), reverse('prestacao_contas'),
+            reverse('transparencia'), reverse('cadastro_adotante'),
+        ]
+        opcoes = [('gzip', False), ('gzip', True)]
+        if brotli is not None:
+            opcoes.append(('br', False))
+        else:
+            self.stdout.write(self.style.WARNING("brotli não instalado: medindo só gzip (pip install brotli)"))
+
+        fabrica = RequestFactory()
+        total_original = 0
+        totais = dict.fromkeys(opcoes, 0)
+        for url in urls:
+            conteudo, protegida = self.renderizar(fabrica, url)
+            total_original += len(conteudo)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{url}  {len(conteudo) / 1024:.1f} KiB" + ("  (token CSRF)" if protegida else "")
+            ))
+            for codificacao, embaralhar in opcoes:
+                tempo, tamanho = self.medir(conteudo, codificacao, embaralhar, options['repeticoes'])
+                totais[codificacao, embaralhar] += tamanho
+                rotulo = codificacao + (' anti-BREACH' if embaralhar else '')
+                self.stdout.write(
+                    f"  {rotulo:17} {tamanho / 1024:8.1f} KiB  "
+                    f"({100 - 100 * tamanho / len(conteudo):4.1f}% a menos)  {tempo:6.3f} ms"
+                )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Total"))
+        for (codificacao, embaralhar), tamanho in totais.items():
+            rotulo = codificacao + (' anti-BREACH' if embaralhar else '')
+            self.stdout.write(f"  {rotulo:17} {total_original / 1024:.1f} KiB -> {tamanho / 1024:.1f} KiB")
+
+    def renderizar(self, fabrica, url):
+        # Como no exportar_site: chama a view direto, sem o middleware de
+        # compressão no caminho, para ter o HTML original
+        request = fabrica.get(url)
+        request.user = AnonymousUser()
+        request.session = SessionBase()
+        CsrfViewMiddleware(lambda r: None).process_request(request)
+        encontrada = resolve(request.path_info)
+        resposta = encontrada.func(request, *encontrada.args, **encontrada.kwargs)
+        if resposta.status_code != 200:
+            raise CommandError(f"{url} respondeu {resposta.status_code}")
+        return resposta.content, tem_token_csrf(request, resposta)
+
+    def medir(self, conteudo, codificacao, embaralhar, repeticoes):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.process_time()
+            comprimido = comprimir_conteudo(conteudo, codificacao, embaralhar)
+            tempos.append((time.process_time() - inicio) * 1000)
+        return statistics.median(tempos), len(comprimido)
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from OngAmp.emails import processar_fila
+
+
+class Command(BaseCommand):
+    help = "Envia os e-mails da fila (EmailPendente). Use --continuo para rodar como worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50, help="Quantos e-mails por conexão SMTP.")
+        parser.add_argument('--continuo', action='store_true', help="Fica rodando e verificando a fila.")
+        parser.add_argument('--intervalo', type=float, default=10, help="Segundos entre verificações (com --continuo).")
+
+    def handle(self, *args, **options):
+        while True:
+            enviados, falhas = processar_fila(lote=options['lote'])
+            if enviados or falhas:
+                self.stdout.write(f"{enviados} enviado(s), {falhas} falha(s).")
+
+            if not options['continuo']:
+                break
+            # Lote cheio: provavelmente tem mais na fila, não espera
+            if enviados + falhas < options['lote']:
+                time.sleep(options['intervalo'])
@@ -0,0 +1,141 @@
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Max
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils.http import urlencode
+
+from OngAmp.consultas import meses_com_documentos
+from OngAmp.models import DocumentoTransparencia, FotoPet, Pet
+
+MANIFESTO = '.exportacao.json'
+PASTA_TEMPLATES = Path(__file__).resolve().parents[2] / 'templates'
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera o HTML estático das páginas públicas numa pasta para o nginx servir direto. "
+        "Nas próximas execuções só refaz as páginas cujos dados mudaram."
+    )
+    # Exemplo de nginx (o resto, como o formulário e o admin, vai para o Django):
+    #
+    #   root /srv/ongampa/html;
+    #   location = /transparencia/prestacao-de-contas/ {
+    #       try_files /transparencia/prestacao-de-contas/index_ano-${arg_ano}_mes-${arg_mes}.html @django;
+    #   }
+    #   location / {
+    #       if ($args) { proxy_pass http://django; }   # filtros/paginação da galeria
+    #       try_files $uri/index.html @django;
+    #   }
+
+    def add_arguments(self, parser):
+        parser.add_argument('destino', help="Pasta onde o HTML será gravado.")
+        parser.add_argument('--tudo', action='store_true', help="Refaz todas as páginas, mesmo sem mudanças.")
+
+    def handle(self, *args, **options):
+        destino = Path(options['destino'])
+        destino.mkdir(parents=True, exist_ok=True)
+        caminho_manifesto = destino / MANIFESTO
+
+        anterior = {}
+        if caminho_manifesto.exists() and not options['tudo']:
+            anterior = json.loads(caminho_manifesto.read_text())
+
+        paginas = self.listar_paginas()
+        # Host de verdade: o 'testserver' padrão não passa pelo ALLOWED_HOSTS
+        fabrica = RequestFactory(HTTP_HOST=settings.EXPORTAR_HOST)
+        geradas = 0
+
+        for url, (arquivo, assinatura) in paginas.items():
+            registro = anterior.get(url)
+            if registro and registro['assinatura'] == assinatura and (destino / arquivo).exists():
+                continue
+            self.gravar(destino / arquivo, self.renderizar(fabrica, url))
+            geradas += 1
+
+        # Páginas que deixaram de existir (ex: pet excluído)
+        removidas = 0
+        for url, registro in anterior.items():
+            if url not in paginas:
+                (destino / registro['arquivo']).unlink(missing_ok=True)
+                removidas += 1
+
+        manifesto = {url: {'arquivo': arquivo, 'assinatura': assinatura}
+                     for url, (arquivo, assinatura) in paginas.items()}
+        self.gravar(caminho_manifesto, json.dumps(manifesto, indent=1).encode())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{geradas} página(s) gerada(s), {len(paginas) - geradas} sem mudança, {removidas} removida(s)."
+        ))
+
+    # --- Quais páginas existem e de que dados cada uma depende ---
+    def listar_paginas(self):
+        """Devolve {url: (arquivo relativo, assinatura dos dados)}."""
+        # Mudou um template? Tudo precisa ser refeito
+        templates = max((p.stat().st_mtime_ns for p in PASTA_TEMPLATES.glob('*.html')), default=0)
+
+        def assinatura(*partes):
+            return '|'.join(str(p) for p in (templates, *partes))
+
+        pets = Pet.objects.aggregate(ultima=Max('atualizado_em'), total=Count('pk'))
+        fotos = FotoPet.objects.aggregate(ultima=Max('atualizado_em'), total=Count('pk'))
+        docs = DocumentoTransparencia.objects.aggregate(ultima=Max('atualizado_em'), total=Count('pk'))
+        galeria = assinatura(pets['ultima'], pets['total'], fotos['ultima'], fotos['total'])
+        acervo = assinatura(docs['ultima'], docs['total'])
+
+        paginas = {}
+
+        def adicionar(url, assinatura_da_pagina, **params):
+            caminho = url.strip('/')
+            if params:
+                nome = 'index_' + '_'.join(f'{chave}-{valor}' for chave, valor in params.items()) + '.html'
+                url = f'{url}?{urlencode(params)}'
+            else:
+                nome = 'index.html'
+            paginas[url] = (str(Path(caminho) / nome), assinatura_da_pagina)
+
+        adicionar(reverse('index'), galeria)
+        adicionar(reverse('lista_pets'), galeria)
+        adicionar(reverse('sobre'), assinatura())
+        adicionar(reverse('contato'), assinatura())
+        adicionar(reverse('transparencia'), assinatura())
+
+        # Cada pet numa consulta só: data do pet, das fotos e quantas fotos
+        por_pet = Pet.objects.annotate(
+            ultima_foto=Max('fotos__atualizado_em'),
+            total_fotos=Count('fotos'),
+        ).values_list('pk', 'atualizado_em', 'ultima_foto', 'total_fotos')
+        for pk, atualizado_em, ultima_foto, total_fotos in por_pet:
+            adicionar(reverse('detalhes_pet', args=[pk]), assinatura(atualizado_em, ultima_foto, total_fotos))
+
+        # Prestação de contas: sem filtro, cada ano e cada ano/mês com documento
+        url_contas = reverse('prestacao_contas')
+        adicionar(url_contas, acervo)
+        for ano, meses in meses_com_documentos().items():
+            adicionar(url_contas, acervo, ano=ano, mes='')
+            for mes in meses:
+                adicionar(url_contas, acervo, ano=ano, mes=mes)
+
+        return paginas
+
+    # --- Renderização e gravação ---
+    def renderizar(self, fabrica, url):
+        request = fabrica.get(url)
+        request.user = AnonymousUser()
+        encontrada = resolve(request.path_info)
+        resposta = encontrada.func(request, *encontrada.args, **encontrada.kwargs)
+        if resposta.status_code != 200:
+            raise CommandError(f"{url} respondeu {resposta.status_code}")
+        return resposta.content
+
+    def gravar(self, arquivo, conteudo):
+        # Grava num temporário e troca: o nginx nunca serve um arquivo pela metade
+        arquivo.parent.mkdir(parents=True, exist_ok=True)
+        temporario = arquivo.with_name(arquivo.name + '.tmp')
+        temporario.write_bytes(conteudo)
+        os.replace(temporario, arquivo)
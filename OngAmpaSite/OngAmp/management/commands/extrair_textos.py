@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from OngAmp.extracao import processar_pendentes
+
+
+class Command(BaseCommand):
+    help = (
+        "Extrai o texto dos PDFs da transparência que estão na fila e atualiza o "
+        "índice de busca. Use --continuo para rodar como worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=10, help="Quantos PDFs por rodada.")
+        parser.add_argument('--continuo', action='store_true', help="Fica rodando e verificando a fila.")
+        parser.add_argument('--intervalo', type=float, default=30, help="Segundos entre verificações (com --continuo).")
+
+    def handle(self, *args, **options):
+        while True:
+            extraidos, falhas = processar_pendentes(lote=options['lote'])
+            if extraidos or falhas:
+                self.stdout.write(f"{extraidos} extraído(s), {falhas} falha(s).")
+
+            if not options['continuo']:
+                break
+            # Lote cheio: provavelmente tem mais na fila, não espera
+            if extraidos + falhas < options['lote']:
+                time.sleep(options['intervalo'])
@@ -0,0 +1,92 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from OngAmp.cache import avancar_geracao
+from OngAmp.imagens import VERSAO_DERIVADAS, gerar_derivadas
+
+# Storage de cada processo do pool (montado por _iniciar)
+_storage = None
+
+
+def _iniciar(raiz_media):
+    # Com forkserver/spawn (padrão fora do Linux e no Python 3.14) o filho relê
+    # o settings do zero: a pasta de mídia vem pronta do processo pai
+    global _storage
+    django.setup()
+    _storage = FileSystemStorage(location=raiz_media)
+
+
+def _processar(item):
+    # Roda dentro de um processo do pool (precisa ser função de módulo)
+    pk, nome = item
+    try:
+        return pk, gerar_derivadas(nome, _storage), None
+    except (OSError, ValueError) as erro:
+        return pk, None, repr(erro)
+
+
+class Command(BaseCommand):
+    help = "Regera as versões redimensionadas (WebP/JPEG) de todas as fotos dos pets."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=os.cpu_count(),
+                            help="Quantos processos em paralelo (padrão: nº de CPUs).")
+        parser.add_argument('--faltando', action='store_true',
+                            help="Só fotos que ainda não têm derivadas.")
+
+    def handle(self, *args, **options):
+        # Importado aqui: com spawn/forkserver os filhos importam este módulo
+        # antes do django.setup() de _iniciar
+        from OngAmp.models import FotoPet, Pet
+
+        fotos = FotoPet.objects.order_by('pk')
+        if options['faltando']:
+            fotos = fotos.filter(larguras_derivadas=[])
+        fotos = list(fotos.only('pk', 'imagem', 'pet_id', 'larguras_derivadas', 'versao_derivadas'))
+        por_pk = {foto.pk: foto for foto in fotos}
+        itens = [(foto.pk, foto.imagem.name) for foto in fotos]
+
+        atualizadas, erros = [], 0
+        # Redimensionar é CPU pura: processos (e não threads) usam todos os núcleos
+        with ProcessPoolExecutor(
+            max_workers=options['processos'], initializer=_iniciar, initargs=(str(default_storage.location),),
+        ) as pool:
+            for pk, larguras, erro in pool.map(_processar, itens, chunksize=8):
+                if erro:
+                    erros += 1
+                    self.stderr.write(f"Foto {pk}: {erro}")
+                else:
+                    atualizadas.append(FotoPet(pk=pk, larguras_derivadas=larguras, versao_derivadas=VERSAO_DERIVADAS))
+
+        with transaction.atomic():
+            FotoPet.objects.bulk_update(atualizadas, ['larguras_derivadas', 'versao_derivadas'], batch_size=500)
+            # bulk_update não dispara sinais: o srcset mudou, então os cards
+            # (chave = versao do pet) e as páginas em cache precisam sair
+            Pet.objects.filter(pk__in={por_pk[foto.pk].pet_id for foto in atualizadas}).update(
+                versao=F('versao') + 1, atualizado_em=timezone.now(),
+            )
+        if atualizadas:
+            avancar_geracao(Pet)
+            avancar_geracao(FotoPet)
+            self.remover_versoes_antigas([por_pk[foto.pk] for foto in atualizadas], FotoPet)
+        self.stdout.write(self.style.SUCCESS(f"{len(atualizadas)} foto(s) processada(s), {erros} erro(s)."))
+
+    def remover_versoes_antigas(self, anteriores, FotoPet):
+        # Derivadas de outra versão que nenhuma foto usa mais. Só depois de
+        # avançar a geração: as páginas novas já apontam para os nomes novos
+        for foto in anteriores:
+            if foto.versao_derivadas == VERSAO_DERIVADAS:
+                continue
+            ainda_usada = FotoPet.objects.filter(
+                imagem=foto.imagem.name, versao_derivadas=foto.versao_derivadas,
+            ).exclude(larguras_derivadas=[]).exists()
+            if not ainda_usada:
+                for caminho in foto.caminhos_derivadas():
+                    default_storage.delete(caminho)
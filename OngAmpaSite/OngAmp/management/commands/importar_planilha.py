@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from OngAmp.planilhas import IMPORTADORES, importar
+
+MAX_ERROS_NA_TELA = 50
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa adotantes, pets ou adoções de um CSV (o mesmo formato da "
+        "exportação do admin). Valida em lotes, grava com bulk_create numa "
+        "transação e lista as linhas recusadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(IMPORTADORES))
+        parser.add_argument('arquivo')
+        parser.add_argument('--lote', type=int, default=1000, help="Linhas validadas e gravadas por vez.")
+        parser.add_argument('--simular', action='store_true', help="Valida e mostra os erros, mas não grava nada.")
+        parser.add_argument('--tudo-ou-nada', action='store_true', help="Não grava nada se alguma linha tiver erro.")
+
+    def handle(self, *args, **options):
+        importador = IMPORTADORES[options['tipo']]()
+        inicio = time.perf_counter()
+        try:
+            with open(options['arquivo'], encoding='utf-8-sig', newline='') as arquivo:
+                importar(
+                    arquivo, importador, lote=options['lote'],
+                    simular=options['simular'], tudo_ou_nada=options['tudo_ou_nada'],
+                )
+        except (OSError, UnicodeDecodeError, ValueError) as erro:
+            raise CommandError(str(erro))
+        duracao = time.perf_counter() - inicio
+
+        for mensagem in importador.erros[:MAX_ERROS_NA_TELA]:
+            self.stderr.write(mensagem)
+        if len(importador.erros) > MAX_ERROS_NA_TELA:
+            self.stderr.write(f"... e mais {len(importador.erros) - MAX_ERROS_NA_TELA} erro(s).")
+
+        lidas = importador.importados + len(importador.erros)
+        desfeito = options['simular'] or (options['tudo_ou_nada'] and importador.erros)
+        resumo = (
+            f"{importador.importados} linha(s) válida(s), {len(importador.erros)} com erro, "
+            f"em {duracao:.1f} s ({lidas / duracao if duracao else 0:.0f} linhas/s)."
+        )
+        if desfeito:
+            self.stdout.write(self.style.WARNING(resumo + " Nada foi gravado."))
+        else:
+            self.stdout.write(self.style.SUCCESS(resumo))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from OngAmp.estatisticas import recalcular
+
+
+class Command(BaseCommand):
+    help = (
+        "Refaz as tabelas de resumo do Painel de Adoções a partir de todas as "
+        "adoções. Os sinais mantêm os resumos em dia; use depois de importar "
+        "dados ou de corrigir a espécie/data de entrada de pets já adotados."
+    )
+
+    def handle(self, *args, **options):
+        total = recalcular()
+        self.stdout.write(self.style.SUCCESS(f"Estatísticas recalculadas a partir de {total} adoção(ões)."))
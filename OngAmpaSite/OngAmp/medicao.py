@@ -0,0 +1,137 @@
+import heapq
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+# ==============================================================================
+# MEDIÇÃO DE DESEMPENHO POR REQUISIÇÃO
+# ==============================================================================
+# O middleware MedirRequisicao (middleware.py) abre uma Medicao para uma fração
+# das requisições (MEDICAO_AMOSTRAGEM) e, enquanto a view roda, cada parte
+# soma o próprio tempo nela:
+#   sql       todas as consultas, via connection.execute_wrapper
+#   template  o render dos templates (backend TemplatesMedidos, em settings)
+#   http      chamadas para fora (reCAPTCHA)
+#   smtp      conversa com o servidor de e-mail
+# O tempo do template inclui o SQL disparado de dentro dele (os N+1 das
+# páginas aparecem nos dois). Fora de uma requisição medida medir() não faz nada.
+
+TAMANHO_MAXIMO_SQL = 500 # caracteres de cada consulta guardados para o log
+
+medicao_atual = ContextVar('medicao_atual', default=None)
+
+
+class Medicao:
+    def __init__(self, piores=5):
+        self.inicio = time.perf_counter()
+        self.tempos = Counter() # categoria -> segundos
+        self.abertas = set()
+        self.consultas = 0
+        self.piores = [] # heap com as `piores` consultas mais lentas
+        self.limite_piores = piores
+        self.repeticoes = Counter() # texto da consulta -> vezes
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+    def somar(self, categoria, segundos):
+        self.tempos[categoria] += segundos
+
+    def registrar_consulta(self, sql, segundos):
+        self.consultas += 1
+        self.tempos['sql'] += segundos
+        sql = sql[:TAMANHO_MAXIMO_SQL]
+        self.repeticoes[sql] += 1
+        # O contador desempata consultas com o mesmo tempo (o texto não entra na comparação)
+        item = (segundos, self.consultas, sql)
+        if len(self.piores) < self.limite_piores:
+            heapq.heappush(self.piores, item)
+        elif item > self.piores[0]:
+            heapq.heapreplace(self.piores, item)
+
+    def resumo(self):
+        """Tudo em milissegundos, pronto para o log."""
+        return {
+            'total_ms': _ms(self.total),
+            'consultas': self.consultas,
+            **{f'{categoria}_ms': _ms(segundos) for categoria, segundos in sorted(self.tempos.items())},
+            'piores_consultas': [
+                {'ms': _ms(segundos), 'sql': sql} for segundos, _ordem, sql in sorted(self.piores, reverse=True)
+            ],
+            'repetidas': [
+                {'vezes': vezes, 'sql': sql} for sql, vezes in self.repeticoes.most_common(3) if vezes > 1
+            ],
+        }
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 1)
+
+
+@contextmanager
+def medir(categoria):
+    """Soma o tempo do bloco em `categoria` na medição da requisição atual."""
+    medicao = medicao_atual.get()
+    # Sem medição ou já dentro da mesma categoria (render dentro de render): não conta de novo
+    if medicao is None or categoria in medicao.abertas:
+        yield
+        return
+    medicao.abertas.add(categoria)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicao.somar(categoria, time.perf_counter() - inicio)
+        medicao.abertas.discard(categoria)
+
+
+@contextmanager
+def medindo(medicao):
+    """Ativa `medicao` e o contador de SQL em todas as conexões durante o bloco."""
+    token = medicao_atual.set(medicao)
+
+    def contar_sql(execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            medicao.registrar_consulta(sql, time.perf_counter() - inicio)
+
+    try:
+        with ExitStack() as pilha:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(contar_sql))
+            yield medicao
+    finally:
+        medicao_atual.reset(token)
+
+
+# ==============================================================================
+# TEMPLATES
+# ==============================================================================
+class TemplateMedido:
+    def __init__(self, template):
+        self._original = template
+
+    def __getattr__(self, nome):
+        # origin, template... iguais aos do template original
+        return getattr(self._original, nome)
+
+    def render(self, context=None, request=None):
+        with medir('template'):
+            return self._original.render(context, request)
+
+
+class TemplatesMedidos(DjangoTemplates):
+    """DjangoTemplates que mede o render de cada template pedido pelas views."""
+
+    def from_string(self, template_code):
+        return TemplateMedido(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TemplateMedido(super().get_template(template_name))
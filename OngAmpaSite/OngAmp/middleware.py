@@ -0,0 +1,252 @@
+import json
+import logging
+import mimetypes
+import os
+import random
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.utils.text import compress_sequence, compress_string
+
+from .medicao import Medicao, medindo
+
+logger = logging.getLogger('OngAmp.medicao')
+
+try:
+    import brotli
+except ImportError: # Dependência opcional: pip install brotli
+    brotli = None
+
+UM_ANO = 60 * 60 * 24 * 365
+# style-base.3f2a9c1b7e4d.css: nome com o hash do ManifestStaticFilesStorage
+NOME_COM_HASH = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+# Preferência quando o navegador aceita os dois
+CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+# Respostas dinâmicas que valem a pena comprimir
+TIPOS_COMPRIMIVEIS = (
+    'text/', 'application/json', 'application/javascript', 'application/xml',
+    'application/xhtml+xml', 'image/svg+xml',
+)
+# Até quantos bytes aleatórios vão no cabeçalho do gzip das páginas com token
+# CSRF (o mesmo "Heal the BREACH" do GZipMiddleware do Django)
+MAX_BYTES_ALEATORIOS = 100
+
+
+# ==============================================================================
+# MEDIÇÃO DE DESEMPENHO
+# ==============================================================================
+class MedirRequisicao:
+    """
+    Mede uma fração das requisições (MEDICAO_AMOSTRAGEM) com medicao.Medicao:
+    número e tempo das consultas, render dos templates, chamadas HTTP e SMTP.
+      - Server-Timing na resposta (aparece na aba Rede do navegador) quando
+        MEDICAO_SERVER_TIMING estiver ligado ou para a equipe logada;
+      - requisições acima de MEDICAO_LENTA_MS ou com mais de
+        MEDICAO_MAX_CONSULTAS consultas vão para o log "OngAmp.medicao" em
+        JSON, com as piores consultas e as que se repetiram (N+1).
+    Em respostas em fluxo (exportações) só conta até a view devolver o fluxo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.MEDICAO_AMOSTRAGEM:
+            return self.get_response(request)
+
+        with medindo(Medicao(piores=settings.MEDICAO_PIORES_CONSULTAS)) as medicao:
+            resposta = self.get_response(request)
+
+        resumo = medicao.resumo()
+        if self.expor(request):
+            resposta['Server-Timing'] = server_timing(resumo)
+        if resumo['total_ms'] >= settings.MEDICAO_LENTA_MS or resumo['consultas'] > settings.MEDICAO_MAX_CONSULTAS:
+            registro = {'metodo': request.method, 'caminho': request.path, 'status': resposta.status_code, **resumo}
+            logger.warning(
+                "Requisição lenta: %s", json.dumps(registro, ensure_ascii=False), extra={'medicao': registro},
+            )
+        return resposta
+
+    def expor(self, request):
+        if settings.MEDICAO_SERVER_TIMING:
+            return True
+        usuario = getattr(request, 'user', None)
+        return bool(usuario and usuario.is_staff)
+
+
+def server_timing(resumo):
+    metricas = [f'sql;dur={resumo.get("sql_ms", 0)};desc="{resumo["consultas"]} consultas"']
+    for categoria in ('template', 'http', 'smtp'):
+        if f'{categoria}_ms' in resumo:
+            metricas.append(f'{categoria};dur={resumo[f"{categoria}_ms"]}')
+    metricas.append(f'total;dur={resumo["total_ms"]}')
+    return ', '.join(metricas)
+
+
+# ==============================================================================
+# ARQUIVOS ESTÁTICOS
+# ==============================================================================
+class ServirEstaticos:
+    """
+    Serve o STATIC_ROOT direto do processo, antes de sessão/autenticação, para
+    o site funcionar com DEBUG=False sem nginx na frente:
+      - manda o .br ou .gz gravado pelo collectstatic se o navegador aceitar
+        (Vary: Accept-Encoding), sem comprimir nada na hora;
+      - nomes com hash ganham cache de um ano com immutable, os demais
+        ESTATICOS_MAX_AGE;
+      - ETag/Last-Modified respondem 304 às revalidações.
+    Pedidos que não são de arquivo existente seguem para o Django normalmente.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        prefixo = settings.STATIC_URL
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(prefixo) and settings.STATIC_ROOT:
+            resposta = self.servir(request, request.path_info[len(prefixo):])
+            if resposta is not None:
+                return resposta
+        return self.get_response(request)
+
+    def servir(self, request, nome):
+        try:
+            caminho = safe_join(settings.STATIC_ROOT, nome)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(caminho):
+            return None
+
+        original = os.stat(caminho)
+        tipo, _codificacao = mimetypes.guess_type(caminho)
+        aceitas = aceita_codificacoes(request.headers.get('Accept-Encoding', ''))
+        variantes = [(cod, caminho + ext) for cod, ext in CODIFICACOES if os.path.isfile(caminho + ext)]
+        codificacao, enviado = next(((cod, c) for cod, c in variantes if cod in aceitas), (None, caminho))
+
+        etag = quote_etag(f'{int(original.st_mtime):x}-{original.st_size:x}' + (f'-{codificacao}' if codificacao else ''))
+        resposta = get_conditional_response(request, etag=etag, last_modified=int(original.st_mtime))
+        if resposta is None:
+            resposta = FileResponse(open(enviado, 'rb'), content_type=tipo or 'application/octet-stream')
+            del resposta['Content-Disposition']
+            if codificacao:
+                resposta['Content-Encoding'] = codificacao
+
+        resposta['ETag'] = etag
+        resposta['Last-Modified'] = http_date(original.st_mtime)
+        if variantes:
+            patch_vary_headers(resposta, ['Accept-Encoding'])
+        if NOME_COM_HASH.search(nome):
+            patch_cache_control(resposta, public=True, max_age=UM_ANO, immutable=True)
+        else:
+            patch_cache_control(resposta, public=True, max_age=settings.ESTATICOS_MAX_AGE)
+        return resposta
+
+
+# ==============================================================================
+# COMPRESSÃO DAS PÁGINAS
+# ==============================================================================
+class Comprimir:
+    """
+    Comprime as respostas dinâmicas com brotli (se instalado) ou gzip,
+    conforme o Accept-Encoding, inclusive as StreamingHttpResponse. Pula
+    corpos pequenos (COMPRESSAO_TAMANHO_MINIMO), tipos que já vêm comprimidos
+    (imagens, PDF) e respostas com Content-Encoding ou no-transform.
+
+    BREACH: páginas que mandaram um token CSRF (formulário de cadastro, por
+    exemplo) nunca vão em brotli; vão em gzip com um nome de tamanho aleatório
+    no cabeçalho, o que embaralha o tamanho da resposta. O token em si já é
+    mascarado a cada requisição pelo Django.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        resposta = self.get_response(request)
+
+        tipo = resposta.get('Content-Type', '').split(';')[0].strip().lower()
+        if (
+            not tipo.startswith(TIPOS_COMPRIMIVEIS)
+            or resposta.has_header('Content-Encoding')
+            or getattr(resposta, 'is_async', False) # o site roda em WSGI; fluxo assíncrono passa direto
+            or 'no-transform' in resposta.get('Cache-Control', '')
+            or (not resposta.streaming and len(resposta.content) < settings.COMPRESSAO_TAMANHO_MINIMO)
+        ):
+            return resposta
+
+        patch_vary_headers(resposta, ['Accept-Encoding'])
+        protegida = tem_token_csrf(request, resposta)
+        codificacao = escolher_codificacao(request.headers.get('Accept-Encoding', ''), protegida)
+        if codificacao is None:
+            return resposta
+
+        if resposta.streaming:
+            resposta.streaming_content = comprimir_fluxo(resposta.streaming_content, codificacao, protegida)
+            del resposta['Content-Length']
+        else:
+            comprimido = comprimir_conteudo(resposta.content, codificacao, protegida)
+            if len(comprimido) >= len(resposta.content):
+                return resposta
+            resposta.content = comprimido
+            resposta['Content-Length'] = str(len(comprimido))
+
+        # ETag forte vira fraco: o corpo mudou, mas o conteúdo é o mesmo
+        etag = resposta.get('ETag')
+        if etag and etag.startswith('"'):
+            resposta['ETag'] = 'W/' + etag
+        resposta['Content-Encoding'] = codificacao
+        return resposta
+
+
+def tem_token_csrf(request, resposta):
+    # get_token() (o {% csrf_token %} do template) faz o CsrfViewMiddleware
+    # mandar o cookie de novo; se ele já passou, o flag foi zerado, mas o cookie ficou
+    return (
+        bool(request.META.get('CSRF_COOKIE_NEEDS_UPDATE'))
+        or settings.CSRF_COOKIE_NAME in resposta.cookies
+    )
+
+
+def escolher_codificacao(cabecalho, protegida=False):
+    aceitas = aceita_codificacoes(cabecalho)
+    if 'br' in aceitas and brotli is not None and not protegida:
+        return 'br'
+    if 'gzip' in aceitas:
+        return 'gzip'
+    return None
+
+
+def comprimir_conteudo(conteudo, codificacao, protegida=False):
+    if codificacao == 'br':
+        return brotli.compress(conteudo, quality=settings.COMPRESSAO_BROTLI_QUALIDADE)
+    return compress_string(conteudo, max_random_bytes=MAX_BYTES_ALEATORIOS if protegida else None)
+
+
+def comprimir_fluxo(partes, codificacao, protegida=False):
+    if codificacao == 'gzip':
+        return compress_sequence(partes, max_random_bytes=MAX_BYTES_ALEATORIOS if protegida else None)
+    return _fluxo_brotli(partes)
+
+
+def _fluxo_brotli(partes):
+    compressor = brotli.Compressor(quality=settings.COMPRESSAO_BROTLI_QUALIDADE)
+    for parte in partes:
+        dados = compressor.process(parte)
+        if dados:
+            yield dados
+    yield compressor.finish()
+
+
+def aceita_codificacoes(cabecalho):
+    """Codificações do Accept-Encoding que não vieram com q=0."""
+    aceitas = set()
+    for item in cabecalho.lower().split(','):
+        nome, _, parametros = item.strip().partition(';')
+        if nome and not re.fullmatch(r'\s*q\s*=\s*0(\.0*)?\s*', parametros):
+            aceitas.add(nome.strip())
+    return aceitas
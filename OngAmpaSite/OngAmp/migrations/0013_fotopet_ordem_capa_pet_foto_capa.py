@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def preencher_foto_capa(apps, schema_editor):
+    Pet = apps.get_model('OngAmp', 'Pet')
+    FotoPet = apps.get_model('OngAmp', 'FotoPet')
+    for pet in Pet.objects.all():
+        capa = FotoPet.objects.filter(pet=pet).order_by('id').first()
+        if capa:
+            Pet.objects.filter(pk=pet.pk).update(foto_capa=capa)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0012_configuracaogeral'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='fotopet',
+            options={'ordering': ['-is_capa', 'ordem', 'id'], 'verbose_name': 'Foto do Pet', 'verbose_name_plural': 'Fotos dos Pets'},
+        ),
+        migrations.AddField(
+            model_name='fotopet',
+            name='is_capa',
+            field=models.BooleanField(default=False, help_text='Foto usada no card do pet. Se nenhuma for marcada, usa a primeira da ordem.', verbose_name='Foto de capa?'),
+        ),
+        migrations.AddField(
+            model_name='fotopet',
+            name='ordem',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Fotos com número menor aparecem primeiro na galeria.', verbose_name='Ordem'),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='foto_capa',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='OngAmp.fotopet', verbose_name='Foto de Capa'),
+        ),
+        migrations.RunPython(preencher_foto_capa, migrations.RunPython.noop),
+    ]
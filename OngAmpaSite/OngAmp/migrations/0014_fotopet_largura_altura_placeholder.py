@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+from OngAmp.imagens import extrair_metadados
+
+
+def preencher_metadados(apps, schema_editor):
+    FotoPet = apps.get_model('OngAmp', 'FotoPet')
+    for foto in FotoPet.objects.filter(largura__isnull=True):
+        try:
+            with foto.imagem.open('rb') as arquivo:
+                foto.largura, foto.altura, foto.placeholder = extrair_metadados(arquivo)
+        except OSError:
+            continue # Arquivo sumiu do media/, deixa sem metadados
+        foto.save(update_fields=['largura', 'altura', 'placeholder'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0013_fotopet_ordem_capa_pet_foto_capa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fotopet',
+            name='altura',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='fotopet',
+            name='largura',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='fotopet',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(preencher_metadados, migrations.RunPython.noop),
+    ]
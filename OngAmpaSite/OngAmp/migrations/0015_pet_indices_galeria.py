@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0014_fotopet_largura_altura_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(condition=models.Q(('status_adocao', 'DISPONIVEL')), fields=['-id'], name='pet_disponivel_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(condition=models.Q(('status_adocao', 'DISPONIVEL')), fields=['categoria_pet', '-id'], name='pet_disp_categoria_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(condition=models.Q(('status_adocao', 'DISPONIVEL')), fields=['is_destaque', '-id'], name='pet_disp_destaque_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0016_emailpendente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fotopet',
+            name='larguras_derivadas',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
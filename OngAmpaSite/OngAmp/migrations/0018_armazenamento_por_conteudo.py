@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:50
+
+import OngAmp.storage
+import OngAmp.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0017_fotopet_larguras_derivadas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentotransparencia',
+            name='arquivo',
+            field=models.FileField(help_text='Apenas arquivos .pdf são permitidos', storage=OngAmp.storage.armazenamento_por_conteudo, upload_to='transparencia_pdfs/', validators=[OngAmp.validators.validar_pdf], verbose_name='Arquivo PDF'),
+        ),
+        migrations.AlterField(
+            model_name='fotopet',
+            name='imagem',
+            field=models.ImageField(storage=OngAmp.storage.armazenamento_por_conteudo, upload_to='img_pets/', validators=[OngAmp.validators.validar_imagem], verbose_name='Imagem'),
+        ),
+    ]
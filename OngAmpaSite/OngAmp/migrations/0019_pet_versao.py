@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0018_armazenamento_por_conteudo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
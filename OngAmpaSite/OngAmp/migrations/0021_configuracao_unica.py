@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0020_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='configuracaogeral',
+            name='limite_destaques',
+            field=models.PositiveSmallIntegerField(default=4, help_text='Quantos pets podem ficar marcados como destaque ao mesmo tempo.', verbose_name='Limite de destaques na Home'),
+        ),
+        migrations.AddField(
+            model_name='configuracaogeral',
+            name='unica',
+            field=models.BooleanField(default=True, editable=False, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='configuracaogeral',
+            constraint=models.CheckConstraint(condition=models.Q(('unica', True)), name='configuracao_geral_unica'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0021_configuracao_unica'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentotransparencia',
+            name='categoria',
+            field=models.CharField(choices=[('MENSAL', 'Prestação de Contas Mensal'), ('ANUAL', 'Prestação de Contas Anual'), ('ESTATUTO', 'Estatuto e Atas'), ('ATIVIDADES', 'Relatórios de Atividades'), ('CERTIDOES', 'Certidões Negativas'), ('OUTROS', 'Outros Documentos')], default='MENSAL', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='documentotransparencia',
+            index=models.Index(fields=['categoria', 'data_publicacao'], name='doc_categoria_data_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0022_documento_categoria_data_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentotransparencia',
+            name='downloads',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# Tudo escrito aqui (e não importado de OngAmp.busca): a migration precisa
+# criar sempre a mesma tabela, mesmo que o código da busca mude depois
+
+
+def criar_indice(apps, schema_editor):
+    # Só no SQLite: nos outros bancos a busca usa icontains (ver busca.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Pet = apps.get_model('OngAmp', 'Pet')
+    tabela_pet = schema_editor.quote_name(Pet._meta.db_table)
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS pet_busca USING fts5("
+        "nome, raca, coloracao, descricao, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO pet_busca (rowid, nome, raca, coloracao, descricao) "
+        "SELECT id, COALESCE(nome, ''), COALESCE(raca, ''), COALESCE(coloracao, ''), COALESCE(descricao, '') "
+        f"FROM {tabela_pet}"
+    )
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS pet_busca")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0023_documentotransparencia_downloads'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:15
+
+from django.db import migrations, models
+
+# Tabela e tokenizador escritos aqui (e não importados de OngAmp.busca): a
+# migration precisa criar sempre o mesmo índice, mesmo que a busca mude depois
+
+
+def criar_indice(apps, schema_editor):
+    # Só no SQLite: nos outros bancos a busca usa icontains (ver busca.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    DocumentoTransparencia = apps.get_model('OngAmp', 'DocumentoTransparencia')
+    tabela_documentos = schema_editor.quote_name(DocumentoTransparencia._meta.db_table)
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS documento_busca USING fts5("
+        "titulo, texto, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    # Os textos ainda não existem (vêm do comando extrair_textos); indexa os títulos
+    schema_editor.execute(
+        f"INSERT INTO documento_busca (rowid, titulo, texto) SELECT id, titulo, '' FROM {tabela_documentos}"
+    )
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS documento_busca")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0024_pet_busca_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentotransparencia',
+            name='texto',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='documentotransparencia',
+            name='texto_erro',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='documentotransparencia',
+            name='texto_extraido_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='documentotransparencia',
+            index=models.Index(condition=models.Q(('texto_extraido_em__isnull', True)), fields=['id'], name='doc_texto_pendente_idx'),
+        ),
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:24
+
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def preencher_estatisticas(apps, schema_editor):
+    # Resumos a partir das adoções que já existem (a mesma conta do
+    # recalcular_estatisticas, escrita aqui para não depender do código atual)
+    Adocao = apps.get_model('OngAmp', 'Adocao')
+    EstatisticaMensal = apps.get_model('OngAmp', 'EstatisticaMensal')
+    EstatisticaVoluntario = apps.get_model('OngAmp', 'EstatisticaVoluntario')
+
+    mensais = defaultdict(Counter)
+    voluntarios = Counter()
+    linhas = Adocao.objects.values_list('data', 'voluntario_id', 'pet__categoria_pet', 'pet__data_entrada')
+    for data, voluntario_id, categoria_pet, data_entrada in linhas.iterator():
+        totais = mensais[timezone.localtime(data).date().replace(day=1), categoria_pet]
+        totais['adocoes'] += 1
+        if data_entrada is not None:
+            totais['soma_dias'] += max((data - data_entrada).days, 0)
+            totais['com_data_entrada'] += 1
+        if voluntario_id:
+            voluntarios[voluntario_id] += 1
+
+    EstatisticaMensal.objects.bulk_create([
+        EstatisticaMensal(mes=mes, categoria_pet=categoria, **totais)
+        for (mes, categoria), totais in mensais.items()
+    ])
+    EstatisticaVoluntario.objects.bulk_create([
+        EstatisticaVoluntario(voluntario_id=voluntario_id, adocoes=total)
+        for voluntario_id, total in voluntarios.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0025_documento_texto'),
+    ]
+
+    operations = [
+        # Pets que já existiam ficam sem data (desconhecida), em vez de "hoje",
+        # para não entrarem na média de dias até a adoção
+        migrations.AddField(
+            model_name='pet',
+            name='data_entrada',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Data de entrada na ONG'),
+        ),
+        migrations.AlterField(
+            model_name='pet',
+            name='data_entrada',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True, verbose_name='Data de entrada na ONG'),
+        ),
+        migrations.CreateModel(
+            name='EstatisticaMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês')),
+                ('categoria_pet', models.CharField(choices=[('C', 'Cachorro'), ('G', 'Gato')], max_length=1)),
+                ('adocoes', models.PositiveIntegerField(default=0)),
+                ('soma_dias', models.PositiveIntegerField(default=0)),
+                ('com_data_entrada', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Painel de Adoções',
+                'verbose_name_plural': 'Painel de Adoções',
+                'constraints': [models.UniqueConstraint(fields=('mes', 'categoria_pet'), name='estatistica_mes_categoria_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EstatisticaVoluntario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('adocoes', models.PositiveIntegerField(default=0)),
+                ('voluntario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='estatistica', to='OngAmp.voluntario')),
+            ],
+            options={
+                'verbose_name': 'Adoções por Voluntário',
+                'verbose_name_plural': 'Adoções por Voluntário',
+            },
+        ),
+        migrations.RunPython(preencher_estatisticas, migrations.RunPython.noop),
+    ]
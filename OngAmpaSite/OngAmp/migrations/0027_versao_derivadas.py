@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('OngAmp', '0026_estatisticas_adocao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fotopet',
+            name='versao_derivadas',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+    ]
@@ -1,14 +1,32 @@
+import posixpath
+
 from django.db import models
 from django.core.validators import RegexValidator
 from django.utils import timezone  # Importação correta para datas no Django
+from django.utils.text import slugify
 from .validators import validar_imagem, validar_pdf
+from .imagens import (
+    FORMATOS_DERIVADOS, VERSAO_DERIVADAS, caminho_derivada, extrair_metadados, gerar_derivadas,
+)
+from .storage import armazenamento_por_conteudo
+from .cache import avancar_geracao
+from .configuracao import configuracao
+from .busca import (
+    busca_disponivel, indexar_pet, remover_pet_do_indice,
+    indexar_documento, remover_documento_do_indice,
+)
 from django.core.exceptions import ValidationError
-from django.db.models.signals import post_delete
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
 # ==============================================================================
 # MODELO: PET
 # ==============================================================================
+# Chave do pg_advisory_xact_lock de quem mexe nos destaques (ver Pet.travar_destaques)
+TRAVA_DESTAQUES = 0x414D5041 # "AMPA"
+
 class Pet(models.Model):
 
     class Sexo(models.TextChoices):
@@ -123,12 +141,57 @@ class Pet(models.Model):
         db_index=True # Ajuda a filtrar rápido no banco
     )
 
+    # Cópia da foto de capa (mantida pelos sinais do FotoPet).
+    # As galerias usam select_related('foto_capa') e não fazem 1 consulta por card.
+    foto_capa = models.ForeignKey(
+        'FotoPet',
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        verbose_name="Foto de Capa"
+    )
+
+    # Quando o animal chegou à ONG: base do "tempo até a adoção" das estatísticas.
+    # Vazio nos pets cadastrados antes deste campo existir (data desconhecida).
+    data_entrada = models.DateTimeField(
+        null=True,
+        blank=True,
+        default=timezone.now,
+        verbose_name="Data de entrada na ONG"
+    )
+
+    # Sobe a cada alteração do pet ou das fotos; faz parte da chave do card em cache
+    versao = models.PositiveIntegerField(default=1, editable=False)
+    # Também atualizado quando as fotos mudam (ver atualizar_capa_do_pet)
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
     def __str__(self):
         return f"{self.nome} ({self.get_categoria_pet_display()})"
 
     class Meta:
         verbose_name = "Pet"
         verbose_name_plural = "Pets (Animais)"
+        # Índices parciais: só cobrem os pets DISPONÍVEIS, que é o que o site mostra.
+        # A ordem (-id) é a mesma da paginação por cursor da galeria.
+        indexes = [
+            models.Index(
+                fields=['-id'],
+                condition=models.Q(status_adocao='DISPONIVEL'),
+                name='pet_disponivel_idx'
+            ),
+            models.Index(
+                fields=['categoria_pet', '-id'],
+                condition=models.Q(status_adocao='DISPONIVEL'),
+                name='pet_disp_categoria_idx'
+            ),
+            models.Index(
+                fields=['is_destaque', '-id'],
+                condition=models.Q(status_adocao='DISPONIVEL'),
+                name='pet_disp_destaque_idx'
+            ),
+        ]
 
     def clean(self):
         # Se o voluntário está tentando marcar este pet como destaque
@@ -136,16 +199,37 @@ class Pet(models.Model):
             # Conta quantos JÁ existem como destaque (excluindo este próprio, se for uma edição)
             qtd_destaques = Pet.objects.filter(is_destaque=True).exclude(id=self.id).count()
             
-            # Se já tiver 4 ou mais, BLOQUEIA
-            if qtd_destaques >= 4:
+            # Se já chegou no limite (4, a menos que a configuração diga outro), BLOQUEIA
+            limite = configuracao.atual().limite_destaques
+            if qtd_destaques >= limite:
                 raise ValidationError({
-                    'is_destaque': 'O limite é de 4 destaques na Home. Desmarque outro animal antes de marcar este.'
+                    'is_destaque': f'O limite é de {limite} destaques na Home. Desmarque outro animal antes de marcar este.'
                 })
 
+    @staticmethod
+    def travar_destaques():
+        """
+        Até o fim da transação atual, quem mais chamar isto espera: quem conta
+        os destaques depois de travar não corre contra outro admin. No
+        PostgreSQL é um advisory lock (nenhuma linha é criada ou travada); no
+        SQLite a transação já começa com a trava de escrita do banco inteiro
+        (transaction_mode IMMEDIATE, ver banco.py).
+        """
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [TRAVA_DESTAQUES])
+
     # Garante que a validação rode também no Admin
     def save(self, *args, **kwargs):
-        self.full_clean() # Chama o clean() antes de salvar
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if self.is_destaque:
+                # Dois admins destacando ao mesmo tempo: um espera o outro terminar
+                # antes de contar os destaques
+                Pet.travar_destaques()
+            self.full_clean() # Chama o clean() antes de salvar
+            if self.pk:
+                self.versao += 1
+            super().save(*args, **kwargs)
 
 
 # ==============================================================================
@@ -160,16 +244,95 @@ class FotoPet(models.Model):
     )
     imagem = models.ImageField(
         upload_to="img_pets/", 
+        storage=armazenamento_por_conteudo, # Nome = hash do conteúdo (sem duplicados)
         validators=[validar_imagem],
         verbose_name="Imagem"
     )
+    ordem = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Ordem",
+        help_text="Fotos com número menor aparecem primeiro na galeria."
+    )
+    is_capa = models.BooleanField(
+        default=False,
+        verbose_name="Foto de capa?",
+        help_text="Foto usada no card do pet. Se nenhuma for marcada, usa a primeira da ordem."
+    )
+
+    # Calculados uma vez no upload (ver save). Assim o template reserva o espaço
+    # da foto e mostra o borrão sem abrir o arquivo a cada requisição.
+    largura = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    altura = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    placeholder = models.TextField(blank=True, editable=False)
+    # Larguras das versões redimensionadas já geradas (WebP + JPEG de cada uma)
+    larguras_derivadas = models.JSONField(default=list, blank=True, editable=False)
+    # VERSAO_DERIVADAS com que foram geradas (vazio: nomes antigos, sem versão)
+    versao_derivadas = models.CharField(max_length=16, blank=True, editable=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"Foto de {self.pet.nome}"
 
+    def save(self, *args, **kwargs):
+        # Arquivo novo (ainda não gravado no storage): lê dimensões e gera o borrão
+        self._arquivo_novo = bool(self.imagem) and not self.imagem._committed
+        if self._arquivo_novo:
+            self.largura, self.altura, self.placeholder = extrair_metadados(self.imagem)
+            # Grava o original já (o campo faria isso dentro do super().save()) para
+            # as derivadas entrarem no MESMO save: os sinais que trocam a versão do
+            # pet e a geração das páginas rodam uma vez só, já com o srcset
+            self.imagem.save(self.imagem.name, self.imagem.file, save=False)
+            # Foto repetida (mesmo hash): as derivadas já existem, só copia a lista
+            ja_gerada = FotoPet.objects.filter(imagem=self.imagem.name).exclude(pk=self.pk) \
+                .exclude(larguras_derivadas=[]).values_list('larguras_derivadas', 'versao_derivadas').first()
+            if ja_gerada:
+                self.larguras_derivadas, self.versao_derivadas = ja_gerada
+            else:
+                try:
+                    self.larguras_derivadas = gerar_derivadas(self.imagem.name)
+                    self.versao_derivadas = VERSAO_DERIVADAS
+                except (OSError, ValueError):
+                    self.larguras_derivadas = [] # Template cai no arquivo original
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            self._arquivo_novo = False
+
+    def derivada(self, largura, extensao):
+        return caminho_derivada(self.imagem.name, largura, extensao, self.versao_derivadas)
+
+    def caminhos_derivadas(self):
+        return [
+            self.derivada(largura, extensao)
+            for largura in self.larguras_derivadas for extensao in FORMATOS_DERIVADOS
+        ]
+
+    def srcset(self, extensao):
+        storage = self.imagem.storage
+        return ', '.join(
+            f'{storage.url(self.derivada(largura, extensao))} {largura}w'
+            for largura in self.larguras_derivadas
+        )
+
+    @property
+    def srcset_webp(self):
+        return self.srcset('webp')
+
+    @property
+    def srcset_jpg(self):
+        return self.srcset('jpg')
+
+    @property
+    def url_miniatura(self):
+        # Menor JPEG gerado (ou o original, se ainda não tiver derivadas)
+        if self.larguras_derivadas:
+            return self.imagem.storage.url(self.derivada(self.larguras_derivadas[0], 'jpg'))
+        return self.imagem.url
+
     class Meta:
         verbose_name = "Foto do Pet"
         verbose_name_plural = "Fotos dos Pets"
+        ordering = ['-is_capa', 'ordem', 'id'] # Capa sempre primeiro
 
 
 # ==============================================================================
@@ -254,16 +417,21 @@ class Adocao(models.Model):
             raise ValidationError(f"Erro: O animal '{self.pet.nome}' já consta como ADOTADO no sistema.")
         
     def save(self, *args, **kwargs):
+        from .servicos import marcar_pet_adotado
+
         # Primeiro, executa a validação acima
         self.full_clean()
-        
-        # Salva o registro de adoção
-        super().save(*args, **kwargs)
-        
-        # atualiza o Pet para ADOTADO
-        if self.pet.status_adocao != Pet.StatusAdocao.ADOTADO:
+
+        # Marca o Pet como ADOTADO e salva a adoção na MESMA transação.
+        # O UPDATE condicional é quem garante: se dois voluntários registram o
+        # mesmo pet ao mesmo tempo, só um deles encontra o pet ainda disponível.
+        with transaction.atomic():
+            if not marcar_pet_adotado(self.pet_id) and self._state.adding:
+                raise ValidationError(f"Erro: O animal '{self.pet.nome}' já consta como ADOTADO no sistema.")
+            super().save(*args, **kwargs)
+
+        if Adocao.pet.is_cached(self):
             self.pet.status_adocao = Pet.StatusAdocao.ADOTADO
-            self.pet.save()
 
     adotante = models.ForeignKey(
         Adotante,
@@ -294,11 +462,20 @@ class Adocao(models.Model):
 
 
 class ConfiguracaoGeral(models.Model):
+    # Lida pelo site através de configuracao.py (em memória), não direto do banco
     email_recebimento = models.EmailField(
         verbose_name="E-mail que recebe as adoções",
         help_text="Para onde devem ir os alertas de novos interessados?",
         default="ampa.mirassol@hotmail.com"
     )
+    limite_destaques = models.PositiveSmallIntegerField(
+        default=4,
+        verbose_name="Limite de destaques na Home",
+        help_text="Quantos pets podem ficar marcados como destaque ao mesmo tempo."
+    )
+
+    # Sempre True e único: o próprio banco recusa uma segunda linha
+    unica = models.BooleanField(default=True, editable=False, unique=True)
 
     def __str__(self):
         return "Configuração de E-mail"
@@ -306,8 +483,12 @@ class ConfiguracaoGeral(models.Model):
     class Meta:
         verbose_name = "Configuração do Site"
         verbose_name_plural = "Configurações do Site"
+        constraints = [
+            models.CheckConstraint(condition=models.Q(unica=True), name='configuracao_geral_unica'),
+        ]
 
     # Truque para garantir que só exista 1 configuração no banco
+    # (mensagem amigável; a garantia de verdade é a constraint acima)
     def save(self, *args, **kwargs):
         if not self.pk and ConfiguracaoGeral.objects.exists():
             # Se tentar criar uma segunda, a gente bloqueia ou atualiza a primeira
@@ -331,6 +512,7 @@ class DocumentoTransparencia(models.Model):
     titulo = models.CharField(max_length=200, verbose_name="Título do Documento")
     arquivo = models.FileField(
         upload_to='transparencia_pdfs/', 
+        storage=armazenamento_por_conteudo, # Nome = hash do conteúdo (sem duplicados)
         verbose_name="Arquivo PDF",
         validators=[validar_pdf],
         help_text="Apenas arquivos .pdf são permitidos"
@@ -340,7 +522,7 @@ class DocumentoTransparencia(models.Model):
         max_length=20, 
         choices=CATEGORIAS, 
         default='MENSAL',
-        db_index=True # Indexado para filtrar rápido nas views
+        # Sem db_index: o índice (categoria, data_publicacao) abaixo já cobre
     )
     
     data_publicacao = models.DateField(
@@ -348,21 +530,300 @@ class DocumentoTransparencia(models.Model):
         verbose_name="Data de Referência"
     )
 
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    # Somado em lote pela view de download (ver downloads.py)
+    downloads = models.PositiveIntegerField(default=0, editable=False)
+
+    # Texto do PDF para a busca, extraído em segundo plano (ver extracao.py).
+    # texto_extraido_em vazio = ainda na fila do comando "extrair_textos"
+    texto = models.TextField(blank=True, editable=False)
+    texto_extraido_em = models.DateTimeField(null=True, blank=True, editable=False)
+    texto_erro = models.CharField(max_length=255, blank=True, editable=False)
+
     def __str__(self):
         return f"{self.titulo} ({self.get_categoria_display()})"
 
+    @property
+    def versao_arquivo(self):
+        # O nome do arquivo é o hash do conteúdo (storage.py): serve de ETag e de ?v= no link
+        return posixpath.splitext(posixpath.basename(self.arquivo.name))[0]
+
+    @property
+    def nome_download(self):
+        return f"{slugify(self.titulo) or 'documento'}.pdf"
+
     class Meta:
         verbose_name = "Documento de Transparência"
         verbose_name_plural = "Transparência"
         ordering = ['-data_publicacao']
+        indexes = [
+            # Filtro da prestação de contas: categoria + faixa de datas
+            models.Index(fields=['categoria', 'data_publicacao'], name='doc_categoria_data_idx'),
+            # Fila da extração de texto: só os que ainda não foram processados
+            models.Index(
+                fields=['id'],
+                condition=models.Q(texto_extraido_em__isnull=True),
+                name='doc_texto_pendente_idx'
+            ),
+        ]
+
+# ==============================================================================
+# MODELO: FILA DE E-MAILS (OUTBOX)
+# ==============================================================================
+class EmailPendente(models.Model):
+
+    class Status(models.TextChoices):
+        PENDENTE = 'PENDENTE', 'Aguardando envio'
+        ENVIADO = 'ENVIADO', 'Enviado'
+        FALHOU = 'FALHOU', 'Falhou (desistimos)'
+
+    assunto = models.CharField(max_length=255)
+    mensagem = models.TextField()
+    remetente = models.CharField(max_length=255, blank=True)
+    destinatarios = models.TextField(help_text="Um e-mail por linha.")
+
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDENTE
+    )
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.TextField(blank=True)
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.assunto} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "E-mail da Fila"
+        verbose_name_plural = "Fila de E-mails"
+        ordering = ['-criado_em']
+        # O worker só procura "pendentes cujo horário já chegou"
+        indexes = [
+            models.Index(fields=['status', 'proxima_tentativa'], name='email_fila_idx'),
+        ]
+
+
+# ==============================================================================
+# ESTATÍSTICAS DE ADOÇÃO (tabelas de resumo)
+# ==============================================================================
+# Mantidas pelos sinais da Adocao (ver estatisticas.py): o painel do admin lê
+# só estas tabelas, que têm uma linha por mês/espécie e uma por voluntário,
+# em vez de varrer as adoções. "recalcular_estatisticas" refaz do zero.
+class EstatisticaMensal(models.Model):
+    mes = models.DateField(help_text="Primeiro dia do mês")
+    categoria_pet = models.CharField(max_length=1, choices=Pet.CategoriaPet.choices)
+    adocoes = models.PositiveIntegerField(default=0)
+    # Média de dias até a adoção = soma_dias / com_data_entrada
+    soma_dias = models.PositiveIntegerField(default=0)
+    com_data_entrada = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} - {self.get_categoria_pet_display()}: {self.adocoes}"
+
+    class Meta:
+        verbose_name = "Painel de Adoções"
+        verbose_name_plural = "Painel de Adoções"
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'categoria_pet'], name='estatistica_mes_categoria_unica'),
+        ]
+
+
+class EstatisticaVoluntario(models.Model):
+    # Voluntário excluído leva a linha junto (as adoções dele ficam sem voluntário)
+    voluntario = models.OneToOneField(Voluntario, on_delete=models.CASCADE, related_name='estatistica')
+    adocoes = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.voluntario}: {self.adocoes}"
+
+    class Meta:
+        verbose_name = "Adoções por Voluntário"
+        verbose_name_plural = "Adoções por Voluntário"
+
 
 # ==============================================================================
 # SINAIS (GATILHOS AUTOMÁTICOS)
 # ==============================================================================
+def atualizar_capa_do_pet(pet_id):
+    # Escolhe a capa pela mesma ordem da galeria e grava direto com update()
+    # (sem passar pelo Pet.save(), que roda full_clean e a contagem de destaques)
+    capa = FotoPet.objects.filter(pet_id=pet_id).first()
+    Pet.objects.filter(pk=pet_id).update(
+        foto_capa=capa,
+        versao=models.F('versao') + 1,
+        atualizado_em=timezone.now(), # update() não aplica o auto_now
+    )
+
+
+@receiver(post_save, sender=FotoPet)
+def sincronizar_capa_ao_salvar_foto(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Só pode existir uma capa por pet
+    if instance.is_capa:
+        FotoPet.objects.filter(pet_id=instance.pet_id, is_capa=True).exclude(pk=instance.pk).update(is_capa=False)
+    atualizar_capa_do_pet(instance.pet_id)
+
+
+@receiver(post_delete, sender=FotoPet)
+def sincronizar_capa_ao_excluir_foto(sender, instance, **kwargs):
+    atualizar_capa_do_pet(instance.pet_id)
+
+
+# --- Cache das páginas públicas (ver cache.py) ---
+@receiver(post_save, sender=Pet)
+@receiver(post_save, sender=FotoPet)
+@receiver(post_save, sender=Adocao)
+@receiver(post_save, sender=DocumentoTransparencia)
+@receiver(post_save, sender=ConfiguracaoGeral)
+@receiver(post_delete, sender=Pet)
+@receiver(post_delete, sender=FotoPet)
+@receiver(post_delete, sender=Adocao)
+@receiver(post_delete, sender=DocumentoTransparencia)
+@receiver(post_delete, sender=ConfiguracaoGeral)
+def invalidar_paginas_em_cache(sender, **kwargs):
+    avancar_geracao(sender)
+    # De novo depois do commit: uma visita durante a transação ainda leu os
+    # dados antigos e pode ter guardado a página com a geração nova
+    transaction.on_commit(lambda: avancar_geracao(sender))
+
+
+# --- Busca de pets (tabela FTS5, ver busca.py) ---
+@receiver(post_save, sender=Pet)
+def indexar_pet_na_busca(sender, instance, raw=False, **kwargs):
+    if busca_disponivel() and not raw:
+        indexar_pet(instance)
+
+
+@receiver(post_delete, sender=Pet)
+def remover_pet_da_busca(sender, instance, **kwargs):
+    if busca_disponivel():
+        remover_pet_do_indice(instance.pk)
+
+
+@receiver(pre_save, sender=DocumentoTransparencia)
+def marcar_texto_para_extrair(sender, instance, raw=False, **kwargs):
+    # PDF novo (ou trocado): o texto antigo não vale mais, volta para a fila
+    if not raw and instance.arquivo and not instance.arquivo._committed:
+        instance.texto = ''
+        instance.texto_extraido_em = None
+        instance.texto_erro = ''
+
+
+@receiver(post_save, sender=DocumentoTransparencia)
+def indexar_documento_na_busca(sender, instance, raw=False, **kwargs):
+    if busca_disponivel() and not raw:
+        indexar_documento(instance)
+
+
+@receiver(post_delete, sender=DocumentoTransparencia)
+def remover_documento_da_busca(sender, instance, **kwargs):
+    if busca_disponivel():
+        remover_documento_do_indice(instance.pk)
+
+
+# --- Arquivos compartilhados (storage por conteúdo) ---
+# Vários registros podem apontar para o mesmo arquivo. A contagem de referências
+# é feita na hora de apagar: o arquivo só sai do disco quando ninguém mais usa.
+def contar_referencias(nome):
+    return (
+        FotoPet.objects.filter(imagem=nome).count()
+        + DocumentoTransparencia.objects.filter(arquivo=nome).count()
+    )
+
+
+def remover_arquivo_orfao(storage, nome, derivadas=()):
+    marca = storage.marca_de_uso(nome) if nome else None
+
+    def remover():
+        # Conta de novo na hora de apagar e respeita o upload repetido que
+        # reaproveitou o arquivo (ArmazenamentoPorConteudo._save avança a marca)
+        # depois do agendamento, mas ainda não gravou o registro no banco
+        if contar_referencias(nome) or storage.marca_de_uso(nome) != marca:
+            return
+        storage.delete(nome)
+        for caminho in derivadas:
+            default_storage.delete(caminho)
+
+    # Só depois do commit: se a transação voltar atrás, o arquivo ainda é necessário
+    if nome:
+        transaction.on_commit(remover)
+
+
+def _arquivo_do_registro(instance):
+    # (FieldFile, caminhos das derivadas) de uma foto ou documento
+    if isinstance(instance, FotoPet):
+        return instance.imagem, instance.caminhos_derivadas()
+    return instance.arquivo, ()
+
+
+@receiver(pre_save, sender=FotoPet)
+@receiver(pre_save, sender=DocumentoTransparencia)
+def guardar_arquivo_anterior(sender, instance, raw=False, **kwargs):
+    instance._arquivo_anterior = None
+    arquivo, _derivadas = _arquivo_do_registro(instance)
+    # Edição trocando o arquivo: lembra o antigo para liberar depois do save
+    # (FotoPet.save já gravou o novo no storage, mas marca _arquivo_novo)
+    novo = arquivo and (not arquivo._committed or getattr(instance, '_arquivo_novo', False))
+    if instance.pk and not raw and novo:
+        instance._arquivo_anterior = _arquivo_do_registro(sender.objects.get(pk=instance.pk))
+
+
+@receiver(post_save, sender=FotoPet)
+@receiver(post_save, sender=DocumentoTransparencia)
+def liberar_arquivo_substituido(sender, instance, **kwargs):
+    anterior = getattr(instance, '_arquivo_anterior', None)
+    if anterior:
+        arquivo, derivadas = anterior
+        remover_arquivo_orfao(arquivo.storage, arquivo.name, derivadas)
+
+
+@receiver(post_delete, sender=FotoPet)
+@receiver(post_delete, sender=DocumentoTransparencia)
+def liberar_arquivo_excluido(sender, instance, **kwargs):
+    arquivo, derivadas = _arquivo_do_registro(instance)
+    remover_arquivo_orfao(arquivo.storage, arquivo.name, derivadas)
+
+
 @receiver(post_delete, sender=Adocao)
 def reverter_status_pet_ao_excluir_adocao(sender, instance, **kwargs):
-    pet = instance.pet
+    from .servicos import reverter_pet_para_disponivel
+
     # Se o pet estava ADOTADO e a adoção foi excluída, volta pra DISPONIVEL
-    if pet.status_adocao == Pet.StatusAdocao.ADOTADO:
-        pet.status_adocao = Pet.StatusAdocao.DISPONIVEL
-        pet.save()
\ No newline at end of file
+    # (um UPDATE condicional, sem carregar o pet nem rodar o full_clean)
+    reverter_pet_para_disponivel(instance.pet_id)
+
+
+@receiver(pre_save, sender=Adocao)
+def guardar_adocao_anterior(sender, instance, raw=False, **kwargs):
+    from .estatisticas import contribuicao_salva
+
+    # Edição no admin (outra data, outro voluntário): o que foi somado antes
+    # precisa sair das estatísticas antes de somar o novo
+    instance._contribuicao_anterior = None
+    if not raw and not instance._state.adding:
+        instance._contribuicao_anterior = contribuicao_salva(instance.pk)
+
+
+@receiver(post_save, sender=Adocao)
+def somar_adocao_nas_estatisticas(sender, instance, raw=False, **kwargs):
+    from .estatisticas import aplicar, contribuicao
+
+    if raw:
+        return
+    anterior = getattr(instance, '_contribuicao_anterior', None)
+    if anterior:
+        aplicar(anterior, -1)
+    aplicar(contribuicao(instance), +1)
+
+
+@receiver(post_delete, sender=Adocao)
+def descontar_adocao_das_estatisticas(sender, instance, **kwargs):
+    from .estatisticas import aplicar, contribuicao
+
+    aplicar(contribuicao(instance), -1)
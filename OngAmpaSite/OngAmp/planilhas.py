@@ -0,0 +1,409 @@
+import csv
+import datetime
+import re
+import zipfile
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .busca import busca_disponivel, indexar_pets
+from .cache import avancar_geracao
+from .estatisticas import recalcular
+from .models import Adocao, Adotante, Pet, Voluntario
+from .servicos import alterar_status_em_lote
+
+# Linhas lidas do banco por vez na exportação (memória constante)
+LOTE_EXPORTACAO = 2000
+
+
+# ==============================================================================
+# EXPORTAÇÃO (ações do admin)
+# ==============================================================================
+# As colunas são nomes do values_list(): os JOINs (pet__nome, adotante__cpf)
+# vêm na mesma consulta. O cabeçalho de cada coluna é o que o importar_planilha
+# espera, então uma exportação pode ser importada de volta.
+COLUNAS_EXPORTACAO = {
+    Adotante: [
+        ('nome', 'nome'), ('cpf', 'cpf'), ('telefone', 'telefone'), ('email', 'email'),
+        ('endereco', 'endereco'), ('data_cadastro', 'data_cadastro'),
+    ],
+    Pet: [
+        ('id', 'id'), ('nome', 'nome'), ('raca', 'raca'), ('coloracao', 'coloracao'),
+        ('descricao', 'descricao'), ('sexo', 'sexo'), ('categoria_pet', 'categoria_pet'),
+        ('idade', 'idade'), ('porte', 'porte'), ('is_castrado', 'is_castrado'),
+        ('is_condicao_especial', 'is_condicao_especial'), ('status_adocao', 'status_adocao'),
+        ('is_destaque', 'is_destaque'), ('data_entrada', 'data_entrada'),
+    ],
+    Adocao: [
+        ('id', 'id'), ('pet', 'pet_id'), ('pet_nome', 'pet__nome'), ('adotante_cpf', 'adotante__cpf'),
+        ('adotante_nome', 'adotante__nome'), ('voluntario', 'voluntario__nome'), ('data', 'data'),
+    ],
+}
+
+# Planilha aberta no Excel executa célula que começa com estes (CSV injection).
+# Os nomes e endereços vêm do formulário público do site.
+INICIO_DE_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+# Caracteres de controle não são XML válido
+CONTROLE_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'sim' if valor else 'não'
+    if isinstance(valor, datetime.datetime):
+        return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M:%S')
+    return str(valor)
+
+
+def linhas_exportadas(queryset):
+    colunas = COLUNAS_EXPORTACAO[queryset.model]
+    consulta = queryset.order_by('pk').values_list(*(campo for _cabecalho, campo in colunas))
+    return [cabecalho for cabecalho, _campo in colunas], consulta.iterator(chunk_size=LOTE_EXPORTACAO)
+
+
+class _Eco:
+    # "Arquivo" que devolve o que recebe: o csv.writer formata, o gerador repassa
+    def write(self, valor):
+        return valor
+
+
+def gerar_csv(cabecalhos, linhas):
+    escritor = csv.writer(_Eco())
+    yield '\ufeff' + escritor.writerow(cabecalhos) # BOM: o Excel abre os acentos certos
+    for linha in linhas:
+        textos = (_texto(valor) for valor in linha)
+        yield escritor.writerow([f"'{t}" if t.startswith(INICIO_DE_FORMULA) else t for t in textos])
+
+
+class _Saida:
+    # Destino do ZipFile que só acumula; o gerador esvazia a cada bloco
+    def __init__(self):
+        self.partes = []
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def esvaziar(self):
+        dados = b''.join(self.partes)
+        self.partes.clear()
+        return dados
+
+
+XLSX_FIXOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Dados" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _celula_xlsx(valor):
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f'<c><v>{valor}</v></c>'
+    # Texto sempre como inlineStr: nunca vira fórmula e dispensa a tabela de strings
+    texto = escape(CONTROLE_XML.sub('', _texto(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def gerar_xlsx(cabecalhos, linhas):
+    """
+    .xlsx gerado aos poucos (só biblioteca padrão): o zip vai saindo enquanto
+    as linhas são lidas do banco, sem montar a planilha inteira na memória.
+    """
+    saida = _Saida()
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as pacote:
+        for nome, conteudo in XLSX_FIXOS.items():
+            pacote.writestr(nome, conteudo)
+        with pacote.open('xl/worksheets/sheet1.xml', 'w') as planilha:
+            planilha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            for numero, linha in enumerate(_com_cabecalho(cabecalhos, linhas)):
+                planilha.write(('<row>' + ''.join(map(_celula_xlsx, linha)) + '</row>').encode('utf-8'))
+                if numero % LOTE_EXPORTACAO == 0:
+                    yield saida.esvaziar()
+            planilha.write(b'</sheetData></worksheet>')
+    yield saida.esvaziar()
+
+
+def _com_cabecalho(cabecalhos, linhas):
+    yield cabecalhos
+    yield from linhas
+
+
+def resposta_exportacao(queryset, formato):
+    cabecalhos, linhas = linhas_exportadas(queryset)
+    nome = f"{queryset.model._meta.model_name}-{timezone.localdate():%Y-%m-%d}"
+    if formato == 'xlsx':
+        resposta = StreamingHttpResponse(
+            gerar_xlsx(cabecalhos, linhas),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    else:
+        resposta = StreamingHttpResponse(gerar_csv(cabecalhos, linhas), content_type='text/csv; charset=utf-8')
+    resposta['Content-Disposition'] = f'attachment; filename="{nome}.{formato}"'
+    return resposta
+
+
+# ==============================================================================
+# IMPORTAÇÃO (comando importar_planilha)
+# ==============================================================================
+# Cada lote de linhas é validado de uma vez (campo a campo em Python, sem
+# consulta; unicidade e chaves estrangeiras com uma consulta por lote) e
+# gravado com bulk_create. Linhas com erro ficam de fora e são relatadas
+# com o número da linha no arquivo.
+
+class Importador:
+    modelo = None
+    colunas = ()          # lidas do arquivo (as demais são ignoradas)
+    obrigatorias = ()     # precisam existir no cabeçalho
+
+    def __init__(self):
+        self.erros = []
+        self.importados = 0
+        self.campos = {campo.name: campo for campo in self.modelo._meta.concrete_fields if campo.name in self.colunas}
+        # Aceita o código ("G") ou o rótulo ("Gato") nas colunas de escolha
+        self.escolhas = {
+            campo.name: {
+                **{str(valor).lower(): valor for valor, _rotulo in campo.choices},
+                **{str(rotulo).lower(): valor for valor, rotulo in campo.choices},
+            }
+            for campo in self.campos.values() if campo.choices
+        }
+
+    def erro(self, numero, mensagem):
+        self.erros.append(f"linha {numero}: {mensagem}")
+
+    def erro_de_validacao(self, numero, erro):
+        self.erro(numero, '; '.join(f"{campo}: {' '.join(mensagens)}" for campo, mensagens in erro.message_dict.items()))
+
+    def converter(self, linha):
+        """Valores da linha para os campos do modelo (vazio = valor padrão)."""
+        valores = {}
+        for coluna in self.colunas:
+            texto = (linha.get(coluna) or '').strip()
+            if texto.startswith("'") and texto[1:2] in INICIO_DE_FORMULA:
+                texto = texto[1:] # Proteção da exportação em CSV
+            if not texto or coluna not in self.campos:
+                continue
+            if coluna in self.escolhas:
+                texto = self.escolhas[coluna].get(texto.lower(), texto)
+            try:
+                valor = self.campos[coluna].to_python(texto)
+            except ValidationError as erro:
+                raise ValidationError({coluna: erro.messages})
+            if isinstance(valor, datetime.datetime) and timezone.is_naive(valor):
+                valor = timezone.make_aware(valor)
+            valores[coluna] = valor
+        return valores
+
+    def validar(self, bloco):
+        """[(número da linha, instância)] das linhas válidas do bloco."""
+        validos = []
+        for numero, linha in bloco:
+            try:
+                instancia = self.modelo(**self.converter(linha))
+                instancia.clean_fields()
+            except ValidationError as erro:
+                self.erro_de_validacao(numero, erro)
+                continue
+            validos.append((numero, instancia))
+        return self.validar_lote(validos)
+
+    def validar_lote(self, validos):
+        return validos
+
+    def gravar(self, instancias):
+        self.modelo.objects.bulk_create(instancias)
+
+    def finalizar(self):
+        pass
+
+
+class ImportadorAdotantes(Importador):
+    modelo = Adotante
+    colunas = ('nome', 'cpf', 'telefone', 'email', 'endereco')
+    obrigatorias = ('nome', 'cpf', 'telefone', 'email')
+    unicos = ('cpf', 'email')
+
+    def __init__(self):
+        super().__init__()
+        self.vistos = {campo: set() for campo in self.unicos}
+
+    def validar_lote(self, validos):
+        # Uma consulta por campo único para o lote inteiro, mais os repetidos no próprio arquivo
+        existentes = {
+            campo: set(Adotante.objects.filter(**{f'{campo}__in': [getattr(i, campo) for _n, i in validos]})
+                       .values_list(campo, flat=True))
+            for campo in self.unicos
+        }
+        aceitos = []
+        for numero, adotante in validos:
+            repetidos = [
+                campo for campo in self.unicos
+                if getattr(adotante, campo) in existentes[campo] or getattr(adotante, campo) in self.vistos[campo]
+            ]
+            if repetidos:
+                self.erro(numero, f"{', '.join(repetidos)} já cadastrado")
+                continue
+            for campo in self.unicos:
+                self.vistos[campo].add(getattr(adotante, campo))
+            aceitos.append((numero, adotante))
+        return aceitos
+
+
+class ImportadorPets(Importador):
+    modelo = Pet
+    # is_destaque fica de fora: destaque da Home tem limite e é decidido no admin
+    colunas = (
+        'nome', 'raca', 'coloracao', 'descricao', 'sexo', 'categoria_pet', 'idade', 'porte',
+        'is_castrado', 'is_condicao_especial', 'status_adocao', 'data_entrada',
+    )
+    obrigatorias = ('nome', 'coloracao', 'descricao')
+
+    def gravar(self, instancias):
+        pets = Pet.objects.bulk_create(instancias)
+        # bulk_create não dispara os sinais: índice da busca à mão
+        if busca_disponivel():
+            indexar_pets(pets)
+
+    def finalizar(self):
+        avancar_geracao(Pet)
+        transaction.on_commit(lambda: avancar_geracao(Pet))
+
+
+class ImportadorAdocoes(Importador):
+    modelo = Adocao
+    colunas = ('pet', 'adotante_cpf', 'voluntario', 'data')
+    obrigatorias = ('pet', 'adotante_cpf')
+
+    def __init__(self):
+        super().__init__()
+        self.pets_adotados = set()
+
+    def converter(self, linha):
+        valores = super().converter({'data': linha.get('data')})
+        try:
+            valores['pet_id'] = int(linha.get('pet') or '')
+        except ValueError:
+            raise ValidationError({'pet': ["informe o id do pet"]})
+        valores['_cpf'] = (linha.get('adotante_cpf') or '').strip()
+        valores['_voluntario'] = (linha.get('voluntario') or '').strip()
+        return valores
+
+    def validar(self, bloco):
+        # As chaves estrangeiras são resolvidas para o bloco todo: 3 consultas
+        linhas = []
+        for numero, linha in bloco:
+            try:
+                linhas.append((numero, self.converter(linha)))
+            except ValidationError as erro:
+                self.erro_de_validacao(numero, erro)
+        status = dict(Pet.objects.filter(pk__in=[v['pet_id'] for _n, v in linhas]).values_list('pk', 'status_adocao'))
+        adotantes = dict(Adotante.objects.filter(cpf__in=[v['_cpf'] for _n, v in linhas]).values_list('cpf', 'pk'))
+        voluntarios = dict(Voluntario.objects.filter(nome__in=[v['_voluntario'] for _n, v in linhas]).values_list('nome', 'pk'))
+
+        validos = []
+        for numero, valores in linhas:
+            cpf, voluntario = valores.pop('_cpf'), valores.pop('_voluntario')
+            pet_id = valores['pet_id']
+            if pet_id not in status:
+                self.erro(numero, f"pet {pet_id} não existe")
+            elif status[pet_id] == Pet.StatusAdocao.ADOTADO or pet_id in self.pets_adotados:
+                self.erro(numero, f"pet {pet_id} já consta como adotado")
+            elif cpf not in adotantes:
+                self.erro(numero, f"nenhum adotante com CPF {cpf}")
+            elif voluntario and voluntario not in voluntarios:
+                self.erro(numero, f"voluntário '{voluntario}' não existe")
+            else:
+                self.pets_adotados.add(pet_id)
+                validos.append((numero, Adocao(
+                    adotante_id=adotantes[cpf], voluntario_id=voluntarios.get(voluntario), **valores,
+                )))
+        return validos
+
+    def gravar(self, instancias):
+        # Sem Adocao.save(): o status dos pets vai num UPDATE só (com versão e cache)
+        Adocao.objects.bulk_create(instancias)
+        alterar_status_em_lote(Pet.objects.filter(pk__in=[a.pet_id for a in instancias]), Pet.StatusAdocao.ADOTADO)
+
+    def finalizar(self):
+        recalcular() # Os sinais das estatísticas também não rodaram
+        avancar_geracao(Adocao)
+        transaction.on_commit(lambda: avancar_geracao(Adocao))
+
+
+IMPORTADORES = {
+    'adotantes': ImportadorAdotantes,
+    'pets': ImportadorPets,
+    'adocoes': ImportadorAdocoes,
+}
+
+
+def importar(arquivo, importador, lote=1000, simular=False, tudo_ou_nada=False):
+    """
+    Importa as linhas do CSV `arquivo` (texto) numa transação. Com `simular`,
+    ou com `tudo_ou_nada` e algum erro, desfaz tudo no fim (os erros continuam
+    relatados). Devolve o importador, com .importados e .erros.
+    """
+    amostra = arquivo.read(4096)
+    arquivo.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;')
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.DictReader(arquivo, dialect=dialeto)
+
+    faltando = [coluna for coluna in importador.obrigatorias if coluna not in (leitor.fieldnames or [])]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes no cabeçalho: {', '.join(faltando)}")
+
+    linhas = enumerate(leitor, start=2) # a linha 1 é o cabeçalho
+    with transaction.atomic():
+        while bloco := list(islice(linhas, lote)):
+            validos = importador.validar(bloco)
+            if validos:
+                importador.gravar([instancia for _numero, instancia in validos])
+                importador.importados += len(validos)
+        importador.finalizar()
+        if simular or (tudo_ou_nada and importador.erros):
+            transaction.set_rollback(True)
+    return importador
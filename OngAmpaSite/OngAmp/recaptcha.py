@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from .medicao import medir
+
+logger = logging.getLogger(__name__)
+
+
+class RecaptchaIndisponivel(Exception):
+    """Não foi possível falar com o Google (timeout, erro de rede ou circuito aberto)."""
+
+
+class ClienteRecaptcha:
+    """
+    Cliente do siteverify do Google com:
+      - sessão HTTP reaproveitada (pool de conexões keep-alive por processo);
+      - timeouts de conexão e leitura (RECAPTCHA_TIMEOUT);
+      - circuit breaker: depois de RECAPTCHA_FALHAS_PARA_ABRIR falhas seguidas,
+        para de chamar o Google por RECAPTCHA_PAUSA_CIRCUITO segundos;
+      - métricas simples de latência, consultáveis em .resumo().
+
+    Quando o Google não responde, RECAPTCHA_FALHA_ABERTA decide: True deixa o
+    cadastro passar, False (padrão) levanta RecaptchaIndisponivel.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._sessao = None
+        self.reiniciar()
+
+    def reiniciar(self):
+        # Zera circuito e métricas (útil em testes e depois de um incidente)
+        self._falhas_seguidas = 0
+        self._aberto_ate = 0.0
+        self.metricas = {
+            'chamadas': 0,
+            'falhas': 0,
+            'bloqueadas_pelo_circuito': 0,
+            'latencia_total_ms': 0.0,
+            'latencia_max_ms': 0.0,
+        }
+
+    @property
+    def sessao(self):
+        if self._sessao is None:
+            sessao = requests.Session()
+            sessao.mount('https://', HTTPAdapter(pool_maxsize=10))
+            sessao.mount('http://', HTTPAdapter(pool_maxsize=10))
+            self._sessao = sessao
+        return self._sessao
+
+    def circuito_aberto(self):
+        return time.monotonic() < self._aberto_ate
+
+    def verificar(self, token, ip=None):
+        """Devolve True se o Google confirmou que é humano, False se recusou."""
+        if not token:
+            return False
+
+        if self.circuito_aberto():
+            with self._trava:
+                self.metricas['bloqueadas_pelo_circuito'] += 1
+            return self._indisponivel(RecaptchaIndisponivel("Circuito aberto"))
+
+        dados = {'secret': settings.RECAPTCHA_PRIVATE_KEY, 'response': token}
+        if ip:
+            dados['remoteip'] = ip
+
+        inicio = time.perf_counter()
+        try:
+            with medir('http'):
+                resposta = self.sessao.post(
+                    settings.RECAPTCHA_VERIFY_URL,
+                    data=dados,
+                    timeout=settings.RECAPTCHA_TIMEOUT,
+                )
+            resposta.raise_for_status()
+            sucesso = bool(resposta.json().get('success'))
+        except (requests.RequestException, ValueError) as erro:
+            self._registrar(inicio, falhou=True)
+            return self._indisponivel(erro)
+
+        self._registrar(inicio, falhou=False)
+        return sucesso
+
+    def _registrar(self, inicio, falhou):
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        with self._trava:
+            m = self.metricas
+            m['chamadas'] += 1
+            m['latencia_total_ms'] += latencia_ms
+            m['latencia_max_ms'] = max(m['latencia_max_ms'], latencia_ms)
+            if falhou:
+                m['falhas'] += 1
+                self._falhas_seguidas += 1
+                if self._falhas_seguidas >= settings.RECAPTCHA_FALHAS_PARA_ABRIR:
+                    self._aberto_ate = time.monotonic() + settings.RECAPTCHA_PAUSA_CIRCUITO
+                    logger.error("reCAPTCHA: circuito aberto após %s falhas seguidas", self._falhas_seguidas)
+            else:
+                self._falhas_seguidas = 0
+        logger.debug("reCAPTCHA: resposta em %.1f ms", latencia_ms)
+
+    def _indisponivel(self, erro):
+        logger.warning("reCAPTCHA indisponível: %r", erro)
+        if settings.RECAPTCHA_FALHA_ABERTA:
+            return True
+        raise RecaptchaIndisponivel(str(erro)) from erro
+
+    def resumo(self):
+        with self._trava:
+            m = dict(self.metricas)
+        m['latencia_media_ms'] = m['latencia_total_ms'] / m['chamadas'] if m['chamadas'] else 0.0
+        m['circuito_aberto'] = self.circuito_aberto()
+        return m
+
+
+# Um cliente por processo: a sessão e o estado do circuito são compartilhados
+# por todas as requisições atendidas por este worker.
+cliente = ClienteRecaptcha()
@@ -0,0 +1,83 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import avancar_geracao
+from .configuracao import configuracao
+from .models import Adocao, Pet
+
+
+# ==============================================================================
+# ALTERAÇÕES EM LOTE (ações do admin)
+# ==============================================================================
+# Pet.save() roda full_clean() e a contagem de destaques a cada linha. Aqui o
+# lote inteiro é validado de uma vez e gravado com um único UPDATE. Como
+# update() não dispara sinais, a versão dos pets e o cache das páginas são
+# atualizados à mão, uma vez por lote.
+
+
+def _gravar_em_lote(queryset, **campos):
+    total = queryset.update(**campos, versao=F('versao') + 1, atualizado_em=timezone.now())
+    if total:
+        avancar_geracao(Pet)
+        transaction.on_commit(lambda: avancar_geracao(Pet))
+    return total
+
+
+def alterar_status_em_lote(queryset, status):
+    """Muda o status de adoção dos pets do queryset. Devolve quantos mudaram."""
+    if status not in Pet.StatusAdocao.values:
+        raise ValidationError(f"Status de adoção inválido: {status}")
+    return _gravar_em_lote(queryset.exclude(status_adocao=status), status_adocao=status)
+
+
+def alterar_destaque_em_lote(queryset, destacar):
+    """
+    Marca (ou desmarca) os pets do queryset como destaque da Home.
+    Se o lote passaria do limite de destaques, nada é gravado.
+    """
+    with transaction.atomic():
+        pendentes = queryset.exclude(is_destaque=destacar)
+        if destacar:
+            Pet.travar_destaques()
+            limite = configuracao.atual().limite_destaques
+            novos = pendentes.count()
+            atuais = Pet.objects.filter(is_destaque=True).count()
+            if atuais + novos > limite:
+                raise ValidationError(
+                    f"O limite é de {limite} destaques na Home e já existem {atuais}. "
+                    f"Não dá para destacar mais {novos}."
+                )
+        return _gravar_em_lote(pendentes, is_destaque=destacar)
+
+
+# ==============================================================================
+# ADOÇÃO
+# ==============================================================================
+# O status do pet muda com um UPDATE condicional (WHERE status_adocao ...).
+# O próprio UPDATE trava a linha até o fim da transação (no PostgreSQL, o
+# segundo voluntário espera e, quando o primeiro confirma, o WHERE já não casa),
+# o mesmo efeito de um SELECT ... FOR UPDATE antes, sem a consulta extra.
+
+
+def marcar_pet_adotado(pet_id):
+    """Marca o pet como ADOTADO se ainda não estiver. Devolve True se marcou."""
+    pendente = Pet.objects.filter(pk=pet_id).exclude(status_adocao=Pet.StatusAdocao.ADOTADO)
+    return bool(_gravar_em_lote(pendente, status_adocao=Pet.StatusAdocao.ADOTADO))
+
+
+def reverter_pet_para_disponivel(pet_id):
+    """Volta um pet ADOTADO para DISPONIVEL (adoção excluída). Devolve True se mudou."""
+    adotado = Pet.objects.filter(pk=pet_id, status_adocao=Pet.StatusAdocao.ADOTADO)
+    return bool(_gravar_em_lote(adotado, status_adocao=Pet.StatusAdocao.DISPONIVEL))
+
+
+def registrar_adocao(pet, adotante, voluntario=None):
+    """
+    Registra a adoção de `pet` por `adotante`. Levanta ValidationError se o
+    pet já foi adotado (inclusive por outro voluntário no mesmo instante).
+    """
+    adocao = Adocao(pet=pet, adotante=adotante, voluntario=voluntario)
+    adocao.save()
+    return adocao
@@ -4,9 +4,18 @@ let indiceAtual = 0;
 // Pega todas as miniaturas assim que a página carrega
 const miniaturas = document.querySelectorAll(".miniatura");
 const destaque = document.getElementById("imgDestaque");
+const fonteWebp = document.getElementById("fonteDestaqueWebp");
+
+// A miniatura é uma versão pequena; a foto grande vem dos data-* dela
+function mostrarNoDestaque(miniatura) {
+  if (fonteWebp) fonteWebp.srcset = miniatura.dataset.srcsetWebp;
+  destaque.srcset = miniatura.dataset.srcsetJpg;
+  destaque.src = miniatura.dataset.original;
+  destaque.style.backgroundImage = miniatura.style.backgroundImage;
+}
 
 function trocarFoto(elemento, novoIndice) {
-  destaque.src = elemento.src;
+  mostrarNoDestaque(elemento);
 
   indiceAtual = novoIndice;
 
@@ -22,7 +31,7 @@ function mudarSlide(direcao) {
     indiceAtual = miniaturas.length - 1;
   }
   const novaMiniatura = miniaturas[indiceAtual];
-  destaque.src = novaMiniatura.src;
+  mostrarNoDestaque(novaMiniatura);
   atualizarClasseAtiva();
 }
 
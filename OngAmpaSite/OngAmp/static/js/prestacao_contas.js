@@ -0,0 +1,15 @@
+// Mapa {ano: [meses]} dos meses que têm documento, gerado pelo Django
+const mesesPorAno = JSON.parse(document.getElementById("mesesPorAno").textContent);
+const NOMES_MESES = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+  "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"];
+
+const selectAno = document.getElementById("filtroAno");
+const selectMes = document.getElementById("filtroMes");
+
+// Ao trocar o ano, o select de mês passa a mostrar só os meses daquele ano
+selectAno.addEventListener("change", () => {
+  const meses = mesesPorAno[selectAno.value] || [];
+  selectMes.length = 1; // mantém só "Todos os meses"
+  meses.forEach((mes) => selectMes.add(new Option(NOMES_MESES[mes - 1], mes)));
+  selectMes.disabled = !selectAno.value;
+});
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import os
+import posixpath
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError: # Dependência opcional: pip install brotli
+    brotli = None
+
+
+class ArmazenamentoPorConteudo(FileSystemStorage):
+    """
+    Storage que dá a cada arquivo o nome do hash (SHA-256) do seu conteúdo:
+        img_pets/foto do rex.jpg -> img_pets/9f86d081...b0f00a08.jpg
+
+    - A mesma foto/PDF enviada duas vezes vira UM arquivo só no disco
+      (o segundo upload encontra o nome pronto e não grava nada).
+    - Se o conteúdo muda, o nome (e a URL) muda junto, então a URL de um
+      arquivo nunca aponta para outro conteúdo e pode ficar em cache para sempre.
+
+    Como vários registros podem apontar para o mesmo arquivo, ele só é apagado
+    quando ninguém mais o referencia (ver remover_arquivo_orfao em models.py).
+    """
+
+    def _save(self, name, content):
+        pasta = posixpath.dirname(name)
+        extensao = posixpath.splitext(name)[1].lower()
+
+        digest = hashlib.sha256()
+        content.seek(0)
+        for pedaco in content.chunks():
+            digest.update(pedaco)
+        content.seek(0)
+
+        nome = posixpath.join(pasta, digest.hexdigest() + extensao)
+        try:
+            # Duplicado: reaproveita o arquivo que já existe. Avançar a marca de
+            # uso avisa a remoção de órfão já agendada (remover_arquivo_orfao) de
+            # que um upload que ainda não foi gravado no banco vai usar o arquivo
+            anterior = self.marca_de_uso(nome)
+            if anterior is not None:
+                agora = max(time.time_ns(), anterior + 1) # Sempre anda, mesmo no mesmo tique do relógio
+                os.utime(self.path(nome), ns=(agora, agora))
+                return nome
+        except FileNotFoundError:
+            pass # Apagado entre as duas chamadas: grava de novo
+        return super()._save(nome, content)
+
+    def marca_de_uso(self, nome):
+        # Data de modificação em nanossegundos (None se o arquivo não existe)
+        try:
+            return os.stat(self.path(nome)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+
+def armazenamento_por_conteudo():
+    # Usado como storage= nos campos de upload (callable para a migration
+    # não congelar o MEDIA_ROOT do momento em que foi gerada)
+    return ArmazenamentoPorConteudo()
+
+
+# ==============================================================================
+# ARQUIVOS ESTÁTICOS (collectstatic)
+# ==============================================================================
+# Extensões que valem a pena comprimir (imagens e fontes já vêm comprimidas)
+EXTENSOES_COMPRIMIVEIS = ('.css', '.js', '.svg', '.html', '.txt', '.json', '.map', '.xml', '.ico')
+# Só guarda a versão comprimida se economizar pelo menos isso
+ECONOMIA_MINIMA = 0.05
+
+
+class ArmazenamentoEstatico(ManifestStaticFilesStorage):
+    """
+    Storage do collectstatic que:
+      - junta os CSS de cada página num arquivo só (settings.PACOTES_CSS);
+      - põe o hash do conteúdo no nome (style-base.css -> style-base.3f2a9c1b7e4d.css),
+        então a URL pode ficar em cache para sempre;
+      - grava ao lado de cada arquivo de texto uma versão .gz e, se o pacote
+        brotli estiver instalado, uma .br, prontas para o ServirEstaticos
+        (OngAmp/middleware.py) escolher conforme o Accept-Encoding.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Arquivo fora do manifest (collectstatic ainda não rodou ou o
+            # template aponta para uma imagem que não existe): URL sem hash em
+            # vez de derrubar a página inteira
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for pacote in self.juntar_pacotes_css():
+                paths[pacote] = (self, pacote)
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        if not dry_run:
+            # Depois de todas as passadas: só os nomes finais (com e sem hash)
+            for nome in {*paths, *self.hashed_files.values()}:
+                self.comprimir(nome)
+
+    def juntar_pacotes_css(self):
+        # Os pacotes ficam em css/ junto dos originais, então os url(...)
+        # relativos continuam valendo depois de juntar
+        for nome, arquivos in settings.PACOTES_CSS.items():
+            partes = []
+            for arquivo in arquivos:
+                with self.open(arquivo) as aberto:
+                    partes.append(f'/* {arquivo} */\n' + aberto.read().decode('utf-8'))
+            pacote = nome_pacote_css(nome)
+            if self.exists(pacote):
+                self.delete(pacote)
+            self._save(pacote, ContentFile('\n'.join(partes).encode('utf-8')))
+            yield pacote
+
+    def comprimir(self, nome):
+        if not nome.endswith(EXTENSOES_COMPRIMIVEIS):
+            return
+        with self.open(nome) as aberto:
+            conteudo = aberto.read()
+        versoes = {'.gz': gzip.compress(conteudo, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            versoes['.br'] = brotli.compress(conteudo, quality=11)
+        for extensao, comprimido in versoes.items():
+            if self.exists(nome + extensao):
+                self.delete(nome + extensao)
+            if len(comprimido) <= len(conteudo) * (1 - ECONOMIA_MINIMA):
+                self._save(nome + extensao, ContentFile(comprimido))
+
+
+def nome_pacote_css(nome):
+    return f'css/pacote-{nome}.css'
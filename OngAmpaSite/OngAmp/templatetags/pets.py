@@ -0,0 +1,34 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from ..storage import nome_pacote_css
+
+register = template.Library()
+
+
+@register.inclusion_tag('card_pet.html')
+def card_pet(pet, mostrar_idade=True):
+    # Card usado na Home e na galeria. O HTML de cada card fica em cache com
+    # a chave (id, versao): editar um pet só re-renderiza o card dele.
+    # O pet precisa vir com select_related('foto_capa').
+    return {
+        'pet': pet,
+        'mostrar_idade': mostrar_idade,
+        'timeout': settings.CACHE_PAGINAS_TIMEOUT,
+    }
+
+
+@register.simple_tag
+def css_pagina(nome):
+    # Em produção, um <link> só para o pacote da página gerado pelo
+    # collectstatic (settings.PACOTES_CSS); em DEBUG, ou se o pacote ainda não
+    # foi gerado, um <link> para cada arquivo, como antes.
+    pacote = nome_pacote_css(nome)
+    if not settings.DEBUG and pacote in getattr(staticfiles_storage, 'hashed_files', {}):
+        arquivos = [pacote]
+    else:
+        arquivos = settings.PACOTES_CSS[nome]
+    return format_html_join('\n', '<link rel="stylesheet" href="{}" />', ((static(a),) for a in arquivos))
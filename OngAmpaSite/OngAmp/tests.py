@@ -1,3 +1,1761 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase as DjangoTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .emails import enfileirar_email, processar_fila
+from .imagens import VERSAO_DERIVADAS, caminho_derivada
+from .recaptcha import ClienteRecaptcha, RecaptchaIndisponivel
+from .configuracao import RegistroConfiguracao
+from .busca import filtrar_por_busca, documentos_por_busca
+from .extracao import processar_pendentes
+from .consultas import meses_com_documentos
+from .downloads import contador
+from .middleware import Comprimir, brotli
+from .views import sobre
+from .medicao import Medicao, medindo, medir
+from . import servicos
+from .servicos import alterar_status_em_lote, alterar_destaque_em_lote, registrar_adocao
+from .estatisticas import dados_do_painel
+from .models import (
+    Pet, FotoPet, Adotante, Adocao, EmailPendente, DocumentoTransparencia, ConfiguracaoGeral,
+    Voluntario, EstatisticaMensal, EstatisticaVoluntario,
+)
+
+
+# O cache dos testes fica numa pasta descartável: os cache.clear() abaixo nunca
+# apagam o cache/ do site (os subprocessos recebem a mesma pasta via CACHE_DIR)
+_cache_temporario = None
+
+
+def setUpModule():
+    global _cache_temporario
+    pasta = tempfile.mkdtemp()
+    _cache_temporario = override_settings(CACHES={'default': {**settings.CACHES['default'], 'LOCATION': pasta}})
+    _cache_temporario.enable()
+
+
+def tearDownModule():
+    pasta = settings.CACHES['default']['LOCATION']
+    _cache_temporario.disable()
+    shutil.rmtree(pasta, ignore_errors=True)
+
+
+class TestCase(DjangoTestCase):
+    # O cache de páginas sobrevive entre testes (o banco não): começa sempre limpo
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+
+def criar_pet(nome='Bolinha', **campos):
+    campos.setdefault('coloracao', 'Caramelo')
+    campos.setdefault('descricao', 'Resgatado na praça.')
+    return Pet.objects.create(nome=nome, **campos)
+
+
+def criar_foto(pet, nome_arquivo='foto.jpg', **campos):
+    return FotoPet.objects.create(pet=pet, imagem=f'img_pets/{nome_arquivo}', **campos)
+
+
+def imagem_enviada(nome='foto.jpg', tamanho=(120, 80), cor=(200, 120, 40)):
+    buffer = BytesIO()
+    Image.new('RGB', tamanho, cor).save(buffer, format='JPEG')
+    return SimpleUploadedFile(nome, buffer.getvalue(), content_type='image/jpeg')
+
+
+class MediaTemporariaMixin:
+    # Uploads de teste vão para uma pasta descartável, nunca para o media/ real
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._media_root = tempfile.mkdtemp()
+        cls._media_override = override_settings(MEDIA_ROOT=cls._media_root)
+        cls._media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._media_override.disable()
+        shutil.rmtree(cls._media_root, ignore_errors=True)
+        super().tearDownClass()
+
+
+# ==============================================================================
+# FOTO DE CAPA
+# ==============================================================================
+class FotoCapaTests(TestCase):
+
+    def test_primeira_foto_vira_capa(self):
+        pet = criar_pet()
+        foto = criar_foto(pet, 'a.jpg')
+        criar_foto(pet, 'b.jpg', ordem=1)
+
+        pet.refresh_from_db()
+        self.assertEqual(pet.foto_capa, foto)
+
+    def test_capa_marcada_tem_prioridade_e_e_unica(self):
+        pet = criar_pet()
+        primeira = criar_foto(pet, 'a.jpg', is_capa=True)
+        segunda = criar_foto(pet, 'b.jpg', ordem=5, is_capa=True)
+
+        pet.refresh_from_db()
+        primeira.refresh_from_db()
+        self.assertEqual(pet.foto_capa, segunda)
+        self.assertFalse(primeira.is_capa)
+
+    def test_excluir_capa_escolhe_a_proxima(self):
+        pet = criar_pet()
+        capa = criar_foto(pet, 'a.jpg')
+        outra = criar_foto(pet, 'b.jpg', ordem=1)
+
+        capa.delete()
+        pet.refresh_from_db()
+        self.assertEqual(pet.foto_capa, outra)
+
+        outra.delete()
+        pet.refresh_from_db()
+        self.assertIsNone(pet.foto_capa)
+
+
+class GaleriaConsultasTests(TestCase):
+
+    def criar_pets_com_fotos(self, quantidade, **campos):
+        for i in range(quantidade):
+            pet = criar_pet(f'Pet {i}', **campos)
+            criar_foto(pet, f'{i}-a.jpg')
+            criar_foto(pet, f'{i}-b.jpg', ordem=1)
+
+    def test_lista_pets_consultas_constantes(self):
+        # ETag + página de pets + contagens dos filtros
+        self.criar_pets_com_fotos(2)
+        with self.assertNumQueries(3):
+            self.client.get(reverse('lista_pets'))
+
+        self.criar_pets_com_fotos(15)
+        with self.assertNumQueries(3):
+            resposta = self.client.get(reverse('lista_pets'))
+        self.assertContains(resposta, 'img_pets/14-a.jpg')
+
+    def test_index_consultas_constantes(self):
+        self.criar_pets_com_fotos(3, is_destaque=True)
+        with self.assertNumQueries(1):
+            resposta = self.client.get(reverse('index'))
+        self.assertContains(resposta, 'img_pets/2-a.jpg')
+
+
+# ==============================================================================
+# DETALHES DO PET
+# ==============================================================================
+class DetalhesPetTests(MediaTemporariaMixin, TestCase):
+
+    def test_upload_grava_dimensoes_e_placeholder(self):
+        pet = criar_pet()
+        foto = FotoPet.objects.create(pet=pet, imagem=imagem_enviada(tamanho=(120, 80)))
+
+        self.assertEqual((foto.largura, foto.altura), (120, 80))
+        self.assertTrue(foto.placeholder.startswith('data:image/jpeg;base64,'))
+
+    def test_galeria_carregada_em_consultas_fixas(self):
+        pet = criar_pet()
+        for i in range(5):
+            FotoPet.objects.create(pet=pet, imagem=imagem_enviada(f'{i}.jpg'), ordem=i)
+
+        # ETag + 1 consulta para o pet + 1 para todas as fotos
+        with self.assertNumQueries(3):
+            resposta = self.client.get(reverse('detalhes_pet', args=[pet.id]))
+        self.assertContains(resposta, 'width="120" height="80"', count=6)
+
+    def test_upload_gera_derivadas(self):
+        pet = criar_pet()
+        foto = FotoPet.objects.create(pet=pet, imagem=imagem_enviada('grande.jpg', tamanho=(800, 600)))
+
+        foto.refresh_from_db()
+        self.assertEqual(foto.larguras_derivadas, [320, 640, 800])
+        storage = foto.imagem.storage
+        for largura in foto.larguras_derivadas:
+            self.assertTrue(storage.exists(caminho_derivada(foto.imagem.name, largura, 'webp')))
+            self.assertTrue(storage.exists(caminho_derivada(foto.imagem.name, largura, 'jpg')))
+
+        resposta = self.client.get(reverse('lista_pets'))
+        self.assertContains(resposta, caminho_derivada(foto.imagem.name, 640, 'webp') + ' 640w')
+
+    def test_derivadas_ja_estao_no_banco_quando_a_pagina_e_invalidada(self):
+        # O post_save avança a geração das páginas: quem visitar a partir daí
+        # precisa achar o srcset gravado (não um segundo UPDATE que vem depois)
+        vistas = []
+
+        def ao_salvar(sender, instance, **kwargs):
+            vistas.append(FotoPet.objects.get(pk=instance.pk).larguras_derivadas)
+
+        post_save.connect(ao_salvar, sender=FotoPet)
+        self.addCleanup(post_save.disconnect, ao_salvar, sender=FotoPet)
+        FotoPet.objects.create(pet=criar_pet(), imagem=imagem_enviada('grande.jpg', tamanho=(800, 600)))
+        self.assertEqual(vistas, [[320, 640, 800]])
+
+    def test_trocar_a_foto_libera_o_arquivo_antigo(self):
+        foto = FotoPet.objects.create(pet=criar_pet(), imagem=imagem_enviada('antiga.jpg', tamanho=(400, 300)))
+        antigo = foto.imagem.name
+        foto.imagem = imagem_enviada('nova.jpg', tamanho=(500, 300))
+        with self.captureOnCommitCallbacks(execute=True):
+            foto.save()
+        self.assertNotEqual(foto.imagem.name, antigo)
+        self.assertFalse(foto.imagem.storage.exists(antigo))
+        self.assertFalse(foto.imagem.storage.exists(caminho_derivada(antigo, 320, 'webp')))
+
+    def test_nome_das_derivadas_leva_a_versao(self):
+        foto = FotoPet.objects.create(pet=criar_pet(), imagem=imagem_enviada('grande.jpg', tamanho=(800, 600)))
+        self.assertEqual(foto.versao_derivadas, VERSAO_DERIVADAS)
+        self.assertTrue(foto.derivada(320, 'webp').endswith(f'-320-{VERSAO_DERIVADAS}.webp'))
+
+        # Fotos antigas (sem versão) continuam apontando para os nomes de antes
+        FotoPet.objects.filter(pk=foto.pk).update(versao_derivadas='')
+        foto.refresh_from_db()
+        self.assertEqual(foto.derivada(320, 'webp'), caminho_derivada(foto.imagem.name, 320, 'webp', ''))
+
+    def test_comando_troca_derivadas_de_outra_versao(self):
+        foto = FotoPet.objects.create(pet=criar_pet(), imagem=imagem_enviada('antiga.jpg', tamanho=(400, 300)))
+        storage = foto.imagem.storage
+        # Simula derivadas geradas com outras opções de compressão
+        for caminho in foto.caminhos_derivadas():
+            storage.save(caminho.replace(VERSAO_DERIVADAS, 'velha000'), ContentFile(b'x'))
+        FotoPet.objects.filter(pk=foto.pk).update(versao_derivadas='velha000')
+        antigas = FotoPet.objects.get(pk=foto.pk).caminhos_derivadas()
+
+        spawn = partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn'))
+        with mock.patch('OngAmp.management.commands.gerar_derivadas.ProcessPoolExecutor', spawn):
+            call_command('gerar_derivadas', '--processos', '1', stdout=StringIO())
+
+        foto.refresh_from_db()
+        self.assertEqual(foto.versao_derivadas, VERSAO_DERIVADAS)
+        self.assertTrue(all(storage.exists(caminho) for caminho in foto.caminhos_derivadas()))
+        self.assertFalse(any(storage.exists(caminho) for caminho in antigas))
+
+    def test_comando_regera_derivadas(self):
+        pet = criar_pet()
+        foto = FotoPet.objects.create(pet=pet, imagem=imagem_enviada('antiga.jpg', tamanho=(400, 300)))
+        FotoPet.objects.filter(pk=foto.pk).update(larguras_derivadas=[])
+        self.client.get(reverse('lista_pets')) # card e página em cache, ainda sem srcset
+
+        # spawn: os filhos não herdam o override_settings(MEDIA_ROOT) do teste
+        spawn = partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn'))
+        with mock.patch('OngAmp.management.commands.gerar_derivadas.ProcessPoolExecutor', spawn):
+            call_command('gerar_derivadas', '--faltando', '--processos', '2', stdout=StringIO())
+
+        foto.refresh_from_db()
+        self.assertEqual(foto.larguras_derivadas, [320, 400])
+        self.assertTrue(foto.imagem.storage.exists(caminho_derivada(foto.imagem.name, 400, 'webp')))
+        resposta = self.client.get(reverse('lista_pets'))
+        self.assertContains(resposta, caminho_derivada(foto.imagem.name, 400, 'webp') + ' 400w')
+
+
+# ==============================================================================
+# GALERIA: FILTROS, FACETAS E PAGINAÇÃO
+# ==============================================================================
+class GaleriaFiltrosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.caes = [criar_pet(f'Cão {i}', porte=Pet.Porte.GRANDE) for i in range(3)]
+        cls.gatos = [
+            criar_pet(f'Gato {i}', categoria_pet=Pet.CategoriaPet.GATO, porte=Pet.Porte.PEQUENO)
+            for i in range(2)
+        ]
+        criar_pet('Adotado', status_adocao=Pet.StatusAdocao.ADOTADO)
+
+    def test_filtra_por_categoria(self):
+        resposta = self.client.get(reverse('lista_pets'), {'categoria': 'G'})
+        self.assertEqual([p.nome for p in resposta.context['pets']], ['Gato 1', 'Gato 0'])
+
+    def test_valor_invalido_e_ignorado(self):
+        resposta = self.client.get(reverse('lista_pets'), {'porte': 'XXL'})
+        self.assertEqual(len(resposta.context['pets']), 5)
+
+    def test_facetas_respeitam_os_outros_filtros(self):
+        resposta = self.client.get(reverse('lista_pets'), {'porte': 'P'})
+        facetas = {g['param']: {o['valor']: o['total'] for o in g['opcoes']} for g in resposta.context['facetas']}
+
+        self.assertEqual(resposta.context['total'], 2)
+        self.assertEqual(facetas['categoria'], {'C': 0, 'G': 2})
+        # A faceta do próprio filtro ignora ele, para mostrar as alternativas
+        self.assertEqual(facetas['porte'], {'P': 2, 'M': 0, 'G': 3})
+
+    def test_paginacao_por_cursor(self):
+        url = reverse('lista_pets')
+        with mock.patch('OngAmp.views.PETS_POR_PAGINA', 2):
+            primeira = self.client.get(url).context['pagina']
+            segunda = self.client.get(url, {'apos': primeira['proximo']}).context['pagina']
+            volta = self.client.get(url, {'antes': segunda['anterior']}).context['pagina']
+
+        self.assertEqual([p.nome for p in primeira['itens']], ['Gato 1', 'Gato 0'])
+        self.assertEqual([p.nome for p in segunda['itens']], ['Cão 2', 'Cão 1'])
+        self.assertEqual(volta['itens'], primeira['itens'])
+        self.assertIsNone(volta['anterior'])
+
+
+# ==============================================================================
+# FILA DE E-MAILS
+# ==============================================================================
+DADOS_ADOTANTE = {
+    'nome': 'Maria Souza',
+    'cpf': '12345678901',
+    'telefone': '(17) 99999-0000',
+    'email': 'maria@exemplo.com',
+    'endereco': 'Rua A, 10',
+}
+
+
+class BackendContado(locmem.EmailBackend):
+    # Imita o SMTP: send_messages() só abre (e depois fecha) uma conexão própria
+    # se não houver uma aberta. Mensagens com assunto em `falhar` dão erro.
+    aberturas = 0
+    falhar = set()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.aberta = False
+
+    def open(self):
+        if self.aberta:
+            return False
+        BackendContado.aberturas += 1
+        self.aberta = True
+        return True
+
+    def close(self):
+        self.aberta = False
+
+    def send_messages(self, mensagens):
+        nova = self.open()
+        try:
+            if any(mensagem.subject in self.falhar for mensagem in mensagens):
+                raise OSError('A conexão caiu')
+            return super().send_messages(mensagens)
+        finally:
+            if nova:
+                self.close()
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class FilaEmailTests(TestCase):
+
+    def enviar_cadastro(self):
+        with mock.patch('OngAmp.views.recaptcha.verificar', return_value=True):
+            return self.client.post(reverse('cadastro_adotante'), DADOS_ADOTANTE)
+
+    def test_cadastro_enfileira_sem_enviar(self):
+        resposta = self.enviar_cadastro()
+
+        self.assertTemplateUsed(resposta, 'cadastro_sucesso.html')
+        self.assertTrue(Adotante.objects.filter(cpf='12345678901').exists())
+        email = EmailPendente.objects.get()
+        self.assertIn('Maria Souza', email.assunto)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_worker_envia_o_lote(self):
+        self.enviar_cadastro()
+        call_command('enviar_emails', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(EmailPendente.objects.get().status, EmailPendente.Status.ENVIADO)
+        # Rodar de novo não reenvia
+        self.assertEqual(processar_fila(), (0, 0))
+
+    @override_settings(EMAIL_FILA_MAX_TENTATIVAS=2)
+    def test_falha_reagenda_e_depois_descarta(self):
+        self.enviar_cadastro()
+        smtp_fora = mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                               side_effect=OSError('SMTP fora do ar'))
+        with smtp_fora, self.assertLogs('OngAmp.emails', level='WARNING'):
+            self.assertEqual(processar_fila(), (0, 1))
+            email = EmailPendente.objects.get()
+            self.assertEqual(email.status, EmailPendente.Status.PENDENTE)
+            self.assertGreater(email.proxima_tentativa, timezone.now())
+
+            # Ainda no backoff: o worker não tenta de novo
+            self.assertEqual(processar_fila(), (0, 0))
+
+            EmailPendente.objects.update(proxima_tentativa=timezone.now())
+            processar_fila()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailPendente.Status.FALHOU)
+        self.assertEqual(email.tentativas, 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(EMAIL_BACKEND='OngAmp.tests.BackendContado')
+    def test_depois_de_uma_falha_o_lote_segue_na_mesma_conexao(self):
+        for assunto in ('primeiro', 'segundo', 'terceiro'):
+            enfileirar_email(assunto, 'Olá', ['ong@exemplo.com'])
+        BackendContado.aberturas = 0
+        with mock.patch.object(BackendContado, 'falhar', {'primeiro'}), self.assertLogs('OngAmp.emails', 'WARNING'):
+            self.assertEqual(processar_fila(), (2, 1))
+        # A conexão do lote e uma reconexão depois da falha, não uma por e-mail
+        self.assertEqual(BackendContado.aberturas, 2)
+        self.assertEqual([mensagem.subject for mensagem in mail.outbox], ['segundo', 'terceiro'])
+
+
+# ==============================================================================
+# RECAPTCHA
+# ==============================================================================
+class GoogleFalso(BaseHTTPRequestHandler):
+    # Servidor local que imita o siteverify; o comportamento é trocado pelo teste
+    resposta = {'success': True}
+    atraso = 0
+    chamadas = 0
+
+    def do_POST(self):
+        GoogleFalso.chamadas += 1
+        self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(GoogleFalso.atraso)
+        corpo = json.dumps(GoogleFalso.resposta).encode()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # O cliente desistiu (timeout)
+
+    def log_message(self, *args):
+        pass
+
+
+class RecaptchaTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), GoogleFalso)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{cls.servidor.server_port}/siteverify'
+        cls._override = override_settings(
+            RECAPTCHA_VERIFY_URL=url,
+            RECAPTCHA_TIMEOUT=(0.5, 0.2),
+            RECAPTCHA_FALHAS_PARA_ABRIR=2,
+            RECAPTCHA_PAUSA_CIRCUITO=60,
+            RECAPTCHA_FALHA_ABERTA=False,
+        )
+        cls._override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._override.disable()
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        GoogleFalso.resposta = {'success': True}
+        GoogleFalso.atraso = 0
+        GoogleFalso.chamadas = 0
+        self.cliente = ClienteRecaptcha()
+
+    def test_resposta_do_google(self):
+        self.assertTrue(self.cliente.verificar('token'))
+        GoogleFalso.resposta = {'success': False}
+        self.assertFalse(self.cliente.verificar('token'))
+        self.assertEqual(self.cliente.resumo()['chamadas'], 2)
+
+    def test_timeout_abre_o_circuito(self):
+        GoogleFalso.atraso = 0.5
+        with self.assertLogs('OngAmp.recaptcha', level='WARNING'):
+            for _ in range(2):
+                with self.assertRaises(RecaptchaIndisponivel):
+                    self.cliente.verificar('token')
+
+            # Circuito aberto: nem chega a chamar o servidor
+            GoogleFalso.atraso = 0
+            with self.assertRaises(RecaptchaIndisponivel):
+                self.cliente.verificar('token')
+
+        self.assertEqual(GoogleFalso.chamadas, 2)
+        resumo = self.cliente.resumo()
+        self.assertTrue(resumo['circuito_aberto'])
+        self.assertEqual(resumo['bloqueadas_pelo_circuito'], 1)
+
+    @override_settings(RECAPTCHA_FALHA_ABERTA=True)
+    def test_falha_aberta_deixa_passar(self):
+        GoogleFalso.atraso = 0.5
+        with self.assertLogs('OngAmp.recaptcha', level='WARNING'):
+            self.assertTrue(self.cliente.verificar('token'))
+
+    def test_formulario_invalido_nao_chama_o_google(self):
+        with mock.patch('OngAmp.views.recaptcha', self.cliente):
+            resposta = self.client.post(reverse('cadastro_adotante'), {'nome': 'Só nome', 'g-recaptcha-response': 'x'})
+        self.assertTemplateUsed(resposta, 'cadastro_adotante.html')
+        self.assertEqual(GoogleFalso.chamadas, 0)
+
+
+# ==============================================================================
+# STORAGE POR CONTEÚDO
+# ==============================================================================
+class ArmazenamentoPorConteudoTests(MediaTemporariaMixin, TestCase):
+
+    def test_upload_repetido_reaproveita_o_arquivo(self):
+        pet, outro_pet = criar_pet('Rex'), criar_pet('Mel')
+        foto = FotoPet.objects.create(pet=pet, imagem=imagem_enviada('rex.jpg'))
+        copia = FotoPet.objects.create(pet=outro_pet, imagem=imagem_enviada('outro nome.jpg'))
+
+        self.assertEqual(foto.imagem.name, copia.imagem.name)
+        self.assertRegex(foto.imagem.name, r'^img_pets/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(copia.larguras_derivadas, foto.larguras_derivadas)
+
+    def test_conteudo_diferente_gera_nome_diferente(self):
+        pet = criar_pet()
+        azul = FotoPet.objects.create(pet=pet, imagem=imagem_enviada('a.jpg', cor=(0, 0, 255)))
+        verde = FotoPet.objects.create(pet=pet, imagem=imagem_enviada('a.jpg', cor=(0, 255, 0)))
+        self.assertNotEqual(azul.imagem.name, verde.imagem.name)
+
+    def test_arquivo_so_e_apagado_sem_referencias(self):
+        pet = criar_pet()
+        foto = FotoPet.objects.create(pet=pet, imagem=imagem_enviada())
+        copia = FotoPet.objects.create(pet=pet, imagem=imagem_enviada())
+        storage, nome = foto.imagem.storage, foto.imagem.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            foto.delete()
+        self.assertTrue(storage.exists(nome))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            copia.delete()
+        self.assertFalse(storage.exists(nome))
+        self.assertFalse(storage.exists(caminho_derivada(nome, 120, 'webp')))
+
+    def test_upload_que_reaproveita_o_arquivo_segura_a_remocao_agendada(self):
+        # Outro processo envia a mesma foto enquanto a remoção espera o commit:
+        # o _save devolve o nome existente, mas o registro ainda não está no banco
+        foto = FotoPet.objects.create(pet=criar_pet(), imagem=imagem_enviada())
+        storage, nome = foto.imagem.storage, foto.imagem.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            foto.delete()
+
+        self.assertEqual(storage.save('img_pets/de novo.jpg', imagem_enviada()), nome)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(storage.exists(nome))
+
+    def test_pdf_repetido(self):
+        pdf = b'%PDF-1.4 balancete'
+        doc = DocumentoTransparencia.objects.create(
+            titulo='Janeiro', arquivo=SimpleUploadedFile('jan.pdf', pdf))
+        copia = DocumentoTransparencia.objects.create(
+            titulo='Janeiro (de novo)', arquivo=SimpleUploadedFile('jan (1).pdf', pdf))
+        self.assertEqual(doc.arquivo.name, copia.arquivo.name)
+
+
+# ==============================================================================
+# CACHE DE PÁGINAS
+# ==============================================================================
+class CachePaginasTests(TestCase):
+
+    def test_segunda_visita_so_calcula_o_etag(self):
+        criar_pet('Rex')
+        self.client.get(reverse('lista_pets'))
+        with self.assertNumQueries(1):
+            resposta = self.client.get(reverse('lista_pets'))
+        self.assertContains(resposta, 'Rex')
+
+    @override_settings(ALLOWED_HOSTS=['localhost'])
+    def test_chave_nao_valida_o_host(self):
+        # A view em si não monta URL absoluta: só a chave do cache chamaria o get_host
+        request = RequestFactory().get(reverse('sobre')) # host 'testserver', fora da lista
+        request.user = AnonymousUser()
+        self.assertEqual(sobre(request).status_code, 200)
+        self.assertEqual(sobre(request).status_code, 200)
+
+    def test_alteracao_invalida_a_pagina(self):
+        pet = criar_pet('Rex')
+        self.assertContains(self.client.get(reverse('detalhes_pet', args=[pet.id])), 'Rex')
+
+        pet.nome = 'Rex Jr'
+        pet.save()
+        self.assertContains(self.client.get(reverse('detalhes_pet', args=[pet.id])), 'Rex Jr')
+
+    def test_foto_nova_invalida_a_galeria(self):
+        pet = criar_pet()
+        self.client.get(reverse('lista_pets'))
+        criar_foto(pet, 'nova.jpg')
+        self.assertContains(self.client.get(reverse('lista_pets')), 'img_pets/nova.jpg')
+
+    def test_parametros_da_url_tem_cache_proprio(self):
+        criar_pet('Rex')
+        criar_pet('Mia', categoria_pet=Pet.CategoriaPet.GATO)
+        self.client.get(reverse('lista_pets'))
+        resposta = self.client.get(reverse('lista_pets'), {'categoria': 'G'})
+        self.assertNotContains(resposta, 'Rex')
+
+    def test_geracao_avancada_por_outro_processo_invalida_a_pagina(self):
+        # Como um comando (extrair_textos, importar_planilha...) rodando fora do site
+        pet = criar_pet('Rex')
+        self.client.get(reverse('lista_pets'))
+        # Sem sinais: só a geração avisa (o versao é a chave do card em cache)
+        Pet.objects.filter(pk=pet.pk).update(nome='Rex Jr', versao=F('versao') + 1)
+
+        subprocess.run(
+            [sys.executable, 'manage.py', 'shell', '-c',
+             'from OngAmp.cache import avancar_geracao; from OngAmp.models import Pet; avancar_geracao(Pet)'],
+            cwd=settings.BASE_DIR, check=True, capture_output=True,
+            env={**os.environ, 'CACHE_DIR': settings.CACHES['default']['LOCATION']},
+        )
+        self.assertContains(self.client.get(reverse('lista_pets')), 'Rex Jr')
+
+    def test_equipe_nao_usa_o_cache(self):
+        self.client.get(reverse('sobre'))
+        User.objects.create_user('voluntario', password='x', is_staff=True)
+        self.client.login(username='voluntario', password='x')
+        self.assertContains(self.client.get(reverse('sobre')), 'Área administrativa')
+
+
+class CardPetCacheTests(TestCase):
+
+    def test_editar_um_pet_so_renderiza_o_card_dele(self):
+        rex, mia = criar_pet('Rex'), criar_pet('Mia')
+        self.client.get(reverse('lista_pets'))
+
+        # Muda a Mia "por baixo" (sem sinais nem versão): o card dela continua do cache
+        Pet.objects.filter(pk=mia.pk).update(nome='Mia Alterada')
+        rex.nome = 'Rex Editado'
+        rex.save()
+
+        resposta = self.client.get(reverse('lista_pets'))
+        self.assertContains(resposta, 'Rex Editado')
+        self.assertContains(resposta, '<h3>Mia</h3>', html=True)
+
+    def test_foto_nova_muda_a_versao_do_pet(self):
+        pet = criar_pet()
+        versao = pet.versao
+        criar_foto(pet)
+        pet.refresh_from_db()
+        self.assertGreater(pet.versao, versao)
+
+
+# ==============================================================================
+# GET CONDICIONAL
+# ==============================================================================
+class GetCondicionalTests(TestCase):
+
+    def test_mesma_versao_responde_304(self):
+        pet = criar_pet()
+        url = reverse('detalhes_pet', args=[pet.id])
+        primeira = self.client.get(url)
+        self.assertIn('ETag', primeira)
+        self.assertIn('Last-Modified', primeira)
+        self.assertIn('no-cache', primeira['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            segunda = self.client.get(url, HTTP_IF_NONE_MATCH=primeira['ETag'])
+        self.assertEqual(segunda.status_code, 304)
+
+    def test_foto_nova_muda_o_etag(self):
+        pet = criar_pet()
+        url = reverse('detalhes_pet', args=[pet.id])
+        etag = self.client.get(url)['ETag']
+        criar_foto(pet)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_exclusao_muda_o_etag_da_galeria(self):
+        criar_pet('Rex')
+        mia = criar_pet('Mia')
+        url = reverse('lista_pets')
+        etag = self.client.get(url)['ETag']
+        mia.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_filtros_tem_etag_proprio(self):
+        criar_pet()
+        url = reverse('lista_pets')
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, {'categoria': 'G'})['ETag'], etag)
+
+    def test_documentos(self):
+        url = reverse('prestacao_contas')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        DocumentoTransparencia.objects.create(titulo='Março', arquivo='transparencia_pdfs/marco.pdf')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# ==============================================================================
+# EXPORTAÇÃO ESTÁTICA
+# ==============================================================================
+class ExportarSiteTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.destino = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.destino, ignore_errors=True)
+
+    def exportar(self):
+        saida = StringIO()
+        call_command('exportar_site', self.destino, stdout=saida)
+        return saida.getvalue()
+
+    def ler(self, arquivo):
+        with open(f'{self.destino}/{arquivo}', encoding='utf-8') as f:
+            return f.read()
+
+    @override_settings(ALLOWED_HOSTS=['localhost'], EXPORTAR_HOST='localhost')
+    def test_host_das_paginas_esta_no_allowed_hosts(self):
+        # O runner de testes libera o 'testserver'; em produção ele não existe
+        criar_pet('Rex')
+        self.exportar()
+        self.assertIn('Rex', self.ler('adote_pet/index.html'))
+
+    def test_exporta_com_o_allowed_hosts_de_producao(self):
+        # Sem o 'testserver' que o runner de testes acrescenta
+        producao = [host for host in settings.ALLOWED_HOSTS if host != 'testserver']
+        criar_pet('Rex')
+        with override_settings(ALLOWED_HOSTS=producao):
+            self.exportar()
+        self.assertIn('Rex', self.ler('index.html'))
+
+    def test_gera_paginas_publicas(self):
+        pet = criar_pet('Rex')
+        DocumentoTransparencia.objects.create(
+            titulo='Março', arquivo='transparencia_pdfs/marco.pdf', data_publicacao='2025-03-10',
+        )
+        self.exportar()
+
+        self.assertIn('Rex', self.ler('index.html'))
+        self.assertIn('Rex', self.ler('adote_pet/index.html'))
+        self.assertIn('Rex', self.ler(f'adote-pet/{pet.id}/index.html'))
+        self.assertIn('Março', self.ler('transparencia/prestacao-de-contas/index_ano-2025_mes-3.html'))
+        self.ler('transparencia/prestacao-de-contas/index_ano-2025_mes-.html')
+        self.ler('sobre/index.html')
+
+    def test_segunda_execucao_so_refaz_o_que_mudou(self):
+        rex = criar_pet('Rex')
+        criar_pet('Mia')
+        self.exportar()
+        self.assertIn('0 página(s) gerada(s)', self.exportar())
+
+        criar_foto(rex)
+        # Galeria, página inicial e o detalhe do Rex; o da Mia fica como está
+        self.assertIn('3 página(s) gerada(s)', self.exportar())
+
+    def test_pet_excluido_some_da_exportacao(self):
+        pet = criar_pet('Rex')
+        self.exportar()
+        pet.delete()
+        self.assertIn('1 removida(s)', self.exportar())
+        with self.assertRaises(FileNotFoundError):
+            self.ler(f'adote-pet/{pet.id}/index.html')
+
+
+# ==============================================================================
+# CONFIGURAÇÕES DO SITE
+# ==============================================================================
+class ConfiguracaoTests(TestCase):
+
+    def test_padrao_sem_linha_no_banco(self):
+        with self.settings(EMAIL_ONG_RECEBIMENTO='env@ong.org'):
+            self.assertEqual(RegistroConfiguracao().atual().email_recebimento, 'env@ong.org')
+
+    def test_leituras_vem_da_memoria(self):
+        registro = RegistroConfiguracao()
+        ConfiguracaoGeral.objects.create(email_recebimento='admin@ong.org')
+        registro.atual()
+        with self.assertNumQueries(0):
+            self.assertEqual(registro.atual().email_recebimento, 'admin@ong.org')
+            self.assertTrue(registro.existe())
+
+    def test_alteracao_chega_nos_outros_workers(self):
+        # Dois registros = dois processos que compartilham o mesmo cache
+        config = ConfiguracaoGeral.objects.create(email_recebimento='antigo@ong.org')
+        outro_worker = RegistroConfiguracao()
+        self.assertEqual(outro_worker.atual().email_recebimento, 'antigo@ong.org')
+
+        config.email_recebimento = 'novo@ong.org'
+        config.save()
+        self.assertEqual(outro_worker.atual().email_recebimento, 'novo@ong.org')
+
+    @override_settings(CONFIGURACAO_MAX_IDADE=60)
+    def test_relida_depois_da_idade_maxima_mesmo_sem_trocar_a_geracao(self):
+        ConfiguracaoGeral.objects.create(email_recebimento='antigo@ong.org')
+        registro = RegistroConfiguracao()
+        agora = time.monotonic()
+        with mock.patch('OngAmp.configuracao.time.monotonic', return_value=agora):
+            registro.atual()
+        # update() não dispara sinais: a geração no cache continua a mesma
+        ConfiguracaoGeral.objects.update(email_recebimento='novo@ong.org')
+        with mock.patch('OngAmp.configuracao.time.monotonic', return_value=agora + 1):
+            self.assertEqual(registro.atual().email_recebimento, 'antigo@ong.org')
+        with mock.patch('OngAmp.configuracao.time.monotonic', return_value=agora + 61):
+            self.assertEqual(registro.atual().email_recebimento, 'novo@ong.org')
+
+    def test_banco_recusa_segunda_configuracao(self):
+        ConfiguracaoGeral.objects.create()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ConfiguracaoGeral.objects.bulk_create([ConfiguracaoGeral()])
+
+    def test_limite_de_destaques_configuravel(self):
+        ConfiguracaoGeral.objects.create(limite_destaques=1)
+        criar_pet('Rex', is_destaque=True)
+        with self.assertRaises(ValidationError):
+            criar_pet('Mia', is_destaque=True)
+
+
+# ==============================================================================
+# AÇÕES EM LOTE NO ADMIN
+# ==============================================================================
+class AcoesEmLoteTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pets = [criar_pet(f'Pet {i}') for i in range(6)]
+
+    def executar(self, acao, pets):
+        admin = User.objects.create_superuser('admin', 'admin@ong.org', 'senha')
+        self.client.force_login(admin)
+        return self.client.post(reverse('admin:OngAmp_pet_changelist'), {
+            'action': acao,
+            '_selected_action': [pet.pk for pet in pets],
+        }, follow=True)
+
+    def test_marcar_adotado_num_update_so(self):
+        versao = self.pets[0].versao
+        qs = Pet.objects.filter(pk__in=[p.pk for p in self.pets])
+        with self.assertNumQueries(1):
+            self.assertEqual(alterar_status_em_lote(qs, Pet.StatusAdocao.ADOTADO), 6)
+        self.pets[0].refresh_from_db()
+        self.assertEqual(self.pets[0].status_adocao, Pet.StatusAdocao.ADOTADO)
+        self.assertEqual(self.pets[0].versao, versao + 1)
+
+    def test_lote_acima_do_limite_nao_grava_nada(self):
+        resposta = self.executar('destacar', self.pets[:5])
+        self.assertContains(resposta, 'O limite é de 4 destaques')
+        self.assertFalse(Pet.objects.filter(is_destaque=True).exists())
+
+    def test_destacar_dentro_do_limite(self):
+        self.executar('destacar', self.pets[:4])
+        self.assertEqual(Pet.objects.filter(is_destaque=True).count(), 4)
+        # Já destacados não contam duas vezes: nada muda e não passa do limite
+        self.assertEqual(alterar_destaque_em_lote(Pet.objects.filter(pk=self.pets[0].pk), True), 0)
+        self.assertEqual(Pet.objects.filter(is_destaque=True).count(), 4)
+
+    def test_destacar_nao_cria_a_configuracao(self):
+        alterar_destaque_em_lote(Pet.objects.filter(pk=self.pets[0].pk), True)
+        criar_pet('Rex', is_destaque=True)
+        self.assertFalse(ConfiguracaoGeral.objects.exists())
+
+    def test_lote_invalida_cache_das_paginas(self):
+        self.client.get(reverse('index'))
+        alterar_destaque_em_lote(Pet.objects.filter(pk=self.pets[0].pk), True)
+        self.assertContains(self.client.get(reverse('index')), 'Pet 0')
+
+
+# ==============================================================================
+# ADOÇÃO
+# ==============================================================================
+def criar_adotante(numero=1):
+    return Adotante.objects.create(
+        nome=f'Adotante {numero}', cpf=f'{numero:011d}', telefone='17999990000',
+        email=f'adotante{numero}@exemplo.com',
+    )
+
+
+class AdocaoTests(TestCase):
+
+    def test_adocao_marca_o_pet(self):
+        pet = criar_pet()
+        registrar_adocao(pet, criar_adotante())
+        pet.refresh_from_db()
+        self.assertEqual(pet.status_adocao, Pet.StatusAdocao.ADOTADO)
+
+    def test_pet_ja_adotado_e_recusado(self):
+        pet = criar_pet()
+        registrar_adocao(pet, criar_adotante(1))
+        with self.assertRaises(ValidationError):
+            # Instância antiga, como a de um segundo voluntário com a tela aberta
+            registrar_adocao(Pet.objects.get(pk=pet.pk), criar_adotante(2))
+        self.assertEqual(Adocao.objects.count(), 1)
+
+    def test_excluir_adocao_devolve_o_pet(self):
+        pet = criar_pet()
+        adocao = registrar_adocao(pet, criar_adotante())
+        adocao.delete()
+        pet.refresh_from_db()
+        self.assertEqual(pet.status_adocao, Pet.StatusAdocao.DISPONIVEL)
+
+
+class AdocaoConcorrenteTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_dois_voluntarios_ao_mesmo_tempo(self):
+        pet = criar_pet()
+        adotantes = [criar_adotante(i) for i in range(1, 7)]
+        largada = threading.Barrier(len(adotantes))
+        sucessos = []
+
+        def voluntario(adotante):
+            try:
+                # Cada thread com o seu próprio objeto Pet, lido antes da largada
+                pet_da_tela = Pet.objects.get(pk=pet.pk)
+                largada.wait()
+                registrar_adocao(pet_da_tela, adotante)
+                sucessos.append(adotante)
+            except (ValidationError, OperationalError):
+                pass # Recusado (ou banco ocupado): o que importa é não adotar duas vezes
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=voluntario, args=(a,)) for a in adotantes]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(sucessos), 1)
+        self.assertEqual(Adocao.objects.filter(pet=pet).count(), 1)
+
+
+class DestaquesConcorrentesTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_dois_lotes_ao_mesmo_tempo_nao_passam_do_limite(self):
+        # Limite 4: cada lote de 3 cabe sozinho, os dois juntos não
+        lotes = [[criar_pet(f'Pet {lote}{i}').pk for i in range(3)] for lote in 'AB']
+        largada = threading.Barrier(len(lotes))
+        gravar = servicos._gravar_em_lote
+        sucessos, recusas = [], []
+
+        def gravar_devagar(*args, **kwargs):
+            # Alarga a janela entre contar os destaques e gravar
+            time.sleep(0.2)
+            return gravar(*args, **kwargs)
+
+        def admin(ids):
+            try:
+                largada.wait()
+                alterar_destaque_em_lote(Pet.objects.filter(pk__in=ids), True)
+                sucessos.append(ids)
+            except (ValidationError, OperationalError) as erro:
+                recusas.append(erro)
+            finally:
+                connection.close()
+
+        with mock.patch('OngAmp.servicos._gravar_em_lote', gravar_devagar):
+            threads = [threading.Thread(target=admin, args=(ids,)) for ids in lotes]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(len(sucessos), 1)
+        # O segundo esperou o primeiro e foi barrado pelo limite (não por "database is locked")
+        self.assertEqual([type(erro) for erro in recusas], [ValidationError])
+        self.assertEqual(Pet.objects.filter(is_destaque=True).count(), 3)
+
+
+# ==============================================================================
+# PERFIL DO BANCO
+# ==============================================================================
+class PerfilBancoTests(TestCase):
+
+    def test_pragmas_aplicados_na_conexao(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Só para SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1) # NORMAL
+
+
+# ==============================================================================
+# PRESTAÇÃO DE CONTAS
+# ==============================================================================
+class PrestacaoContasTests(TestCase):
+
+    def criar_documento(self, titulo, data, categoria='MENSAL'):
+        return DocumentoTransparencia.objects.create(
+            titulo=titulo, arquivo=f'transparencia_pdfs/{titulo}.pdf',
+            data_publicacao=data, categoria=categoria,
+        )
+
+    def test_filtra_por_ano_e_mes(self):
+        self.criar_documento('Marco', '2025-03-31')
+        self.criar_documento('Abril', '2025-04-01')
+        self.criar_documento('Dezembro', '2024-12-15')
+
+        resposta = self.client.get(reverse('prestacao_contas'), {'ano': '2025', 'mes': '3'})
+        self.assertEqual([d.titulo for d in resposta.context['docs_mensais']], ['Marco'])
+
+        resposta = self.client.get(reverse('prestacao_contas'), {'ano': '2024', 'mes': '12'})
+        self.assertEqual([d.titulo for d in resposta.context['docs_mensais']], ['Dezembro'])
+
+    def test_parametros_invalidos_sao_ignorados(self):
+        self.criar_documento('Marco', '2025-03-31')
+        for params in ({'ano': 'abc'}, {'ano': '2025', 'mes': '13'}, {'ano': '99999'}):
+            resposta = self.client.get(reverse('prestacao_contas'), params)
+            self.assertEqual(resposta.status_code, 200)
+            self.assertEqual(len(resposta.context['docs_mensais']), 1)
+
+    def test_mes_invalido_mantem_o_filtro_do_ano(self):
+        self.criar_documento('Marco', '2025-03-31')
+        self.criar_documento('Dezembro', '2024-12-15')
+        resposta = self.client.get(reverse('prestacao_contas'), {'ano': '2025', 'mes': 'abc'})
+        self.assertEqual([d.titulo for d in resposta.context['docs_mensais']], ['Marco'])
+
+    def test_mapa_de_meses_so_com_documentos(self):
+        self.criar_documento('Marco', '2025-03-31')
+        self.criar_documento('Abril', '2025-04-01')
+        self.criar_documento('Balanco', '2023-12-31', categoria='ANUAL')
+        self.assertEqual(meses_com_documentos(), {2025: [3, 4]})
+
+        with self.assertNumQueries(0):
+            meses_com_documentos()
+
+        self.criar_documento('Janeiro', '2026-01-10')
+        self.assertEqual(meses_com_documentos(), {2026: [1], 2025: [3, 4]})
+
+    def test_select_mostra_meses_do_ano(self):
+        self.criar_documento('Marco', '2025-03-31')
+        resposta = self.client.get(reverse('prestacao_contas'), {'ano': '2025'})
+        self.assertContains(resposta, '<option value="3" >Março</option>', html=True)
+        self.assertNotContains(resposta, 'Abril')
+
+
+# ==============================================================================
+# DOWNLOAD DOS DOCUMENTOS
+# ==============================================================================
+@override_settings(DOCUMENTOS_CONTAGEM_INTERVALO=0)
+class DownloadDocumentoTests(MediaTemporariaMixin, TestCase):
+    CONTEUDO = b'%PDF-1.4\n' + bytes(range(256)) * 40 + b'\n%%EOF'
+
+    def setUp(self):
+        super().setUp()
+        self.documento = DocumentoTransparencia.objects.create(
+            titulo='Balancete Março',
+            arquivo=SimpleUploadedFile('marco.pdf', self.CONTEUDO, content_type='application/pdf'),
+        )
+        self.url = reverse('baixar_documento', args=[self.documento.pk])
+
+    def test_arquivo_inteiro_com_validadores(self):
+        resposta = self.client.get(self.url, {'v': self.documento.versao_arquivo})
+        self.assertEqual(b''.join(resposta.streaming_content), self.CONTEUDO)
+        self.assertEqual(resposta['ETag'], f'"{self.documento.versao_arquivo}"')
+        self.assertIn('Last-Modified', resposta)
+        self.assertIn('immutable', resposta['Cache-Control'])
+        self.assertEqual(resposta['Accept-Ranges'], 'bytes')
+        self.assertIn('balancete-marco.pdf', resposta['Content-Disposition'])
+
+        repetida = self.client.get(self.url, HTTP_IF_NONE_MATCH=resposta['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+
+    def test_range(self):
+        resposta = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(resposta.status_code, 206)
+        self.assertEqual(resposta['Content-Range'], f'bytes 100-199/{len(self.CONTEUDO)}')
+        self.assertEqual(b''.join(resposta.streaming_content), self.CONTEUDO[100:200])
+
+        final = self.client.get(self.url, HTTP_RANGE='bytes=-6')
+        self.assertEqual(b''.join(final.streaming_content), b'\n%%EOF')
+
+        fora = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.CONTEUDO)}-')
+        self.assertEqual(fora.status_code, 416)
+
+    def test_if_range_de_outra_versao_manda_tudo(self):
+        resposta = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"antigo"')
+        self.assertEqual(resposta.status_code, 200)
+
+    @override_settings(DOCUMENTOS_ENVIO='x-accel')
+    def test_x_accel_redirect(self):
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta['X-Accel-Redirect'], '/_documentos/' + self.documento.arquivo.name)
+        self.assertIn('balancete-marco.pdf', resposta['Content-Disposition'])
+
+    @override_settings(DOCUMENTOS_ENVIO='x-sendfile')
+    def test_x_sendfile(self):
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta['X-Sendfile'], self.documento.arquivo.path)
+        self.assertIn('balancete-marco.pdf', resposta['Content-Disposition'])
+
+    def test_contagem_em_lote(self):
+        with self.settings(DOCUMENTOS_CONTAGEM_INTERVALO=3600):
+            self.client.get(self.url)
+            self.client.get(self.url)
+            self.client.get(self.url, HTTP_RANGE='bytes=0-') # Arquivo inteiro, mesmo com Range
+            # Trecho seguinte do mesmo leitor de PDF, sondagem de Range e HEAD não contam
+            self.client.get(self.url, HTTP_RANGE='bytes=500-')
+            self.client.get(self.url, HTTP_RANGE='bytes=0-0')
+            self.client.head(self.url)
+            with self.settings(DOCUMENTOS_ENVIO='x-accel'):
+                self.client.head(self.url)
+                self.client.get(self.url, HTTP_RANGE='bytes=0-1023')
+            self.documento.refresh_from_db()
+            self.assertEqual(self.documento.downloads, 0)
+        self.assertEqual(contador.gravar(), 3)
+        self.documento.refresh_from_db()
+        self.assertEqual(self.documento.downloads, 3)
+
+
+# ==============================================================================
+# BUSCA DE PETS
+# ==============================================================================
+class BuscaPetsTests(TestCase):
+
+    def test_ignora_acentos_e_aceita_prefixo(self):
+        criar_pet('João', raca='Labrador', descricao='Resgatado na praça.')
+        criar_pet('Mia', raca='Siamês')
+        self.assertEqual([p.nome for p in filtrar_por_busca(Pet.objects.all(), 'joao')], ['João'])
+        self.assertEqual([p.nome for p in filtrar_por_busca(Pet.objects.all(), 'praca lab')], ['João'])
+        self.assertEqual([p.nome for p in filtrar_por_busca(Pet.objects.all(), 'SIAMES')], ['Mia'])
+
+    def test_nome_vale_mais_que_descricao(self):
+        criar_pet('Bolinha', descricao='Brinca com o Thor o dia todo.')
+        criar_pet('Thor')
+        self.assertEqual([p.nome for p in filtrar_por_busca(Pet.objects.all(), 'thor')], ['Thor', 'Bolinha'])
+
+    def test_indice_acompanha_edicao_e_exclusao(self):
+        pet = criar_pet('Rex')
+        pet.nome = 'Apolo'
+        pet.save()
+        self.assertFalse(filtrar_por_busca(Pet.objects.all(), 'rex').exists())
+        self.assertTrue(filtrar_por_busca(Pet.objects.all(), 'apolo').exists())
+        pet.delete()
+        self.assertFalse(filtrar_por_busca(Pet.objects.all(), 'apolo').exists())
+
+    def test_sintaxe_do_fts_nao_quebra(self):
+        criar_pet('Rex')
+        for termo in ('"', 'rex OR', 'NEAR(', '*', 'rex"'):
+            list(filtrar_por_busca(Pet.objects.all(), termo))
+
+    def test_busca_na_galeria(self):
+        criar_pet('Thor', categoria_pet=Pet.CategoriaPet.CACHORRO)
+        criar_pet('Luna', categoria_pet=Pet.CategoriaPet.GATO)
+        criar_pet('Thor', status_adocao=Pet.StatusAdocao.ADOTADO)
+        resposta = self.client.get(reverse('lista_pets'), {'q': 'thor'})
+        self.assertEqual([p.nome for p in resposta.context['pets']], ['Thor'])
+        self.assertEqual(resposta.context['total'], 1)
+
+    def test_busca_no_admin(self):
+        criar_pet('Thor')
+        criar_pet('Luna')
+        admin = User.objects.create_superuser('admin', 'admin@ong.org', 'senha')
+        self.client.force_login(admin)
+        resposta = self.client.get(reverse('admin:OngAmp_pet_changelist'), {'q': 'thór'})
+        self.assertEqual([p.nome for p in resposta.context['cl'].result_list], ['Thor'])
+
+    def test_admin_lista_por_relevancia(self):
+        no_nome = criar_pet('Thor')
+        so_na_historia = criar_pet('Luna', descricao='Brinca com o Thor')
+        admin = User.objects.create_superuser('admin', 'admin@ong.org', 'senha')
+        self.client.force_login(admin)
+        url = reverse('admin:OngAmp_pet_changelist')
+
+        resposta = self.client.get(url, {'q': 'thor'})
+        # Achar no nome pesa mais, mesmo o outro sendo mais novo
+        self.assertEqual(list(resposta.context['cl'].result_list), [no_nome, so_na_historia])
+
+        # Clicando numa coluna (o=1: nome), a ordem escolhida manda
+        resposta = self.client.get(url, {'q': 'thor', 'o': '1'})
+        self.assertEqual(list(resposta.context['cl'].result_list), [so_na_historia, no_nome])
+
+
+# ==============================================================================
+# BUSCA NOS DOCUMENTOS
+# ==============================================================================
+class BuscaDocumentosTests(MediaTemporariaMixin, TestCase):
+
+    def criar_documento(self, titulo, conteudo=b'%PDF-1.4 teste'):
+        return DocumentoTransparencia.objects.create(
+            titulo=titulo, arquivo=SimpleUploadedFile(f'{titulo}.pdf', conteudo),
+        )
+
+    def ids_da_busca(self, termo):
+        return [documento.pk for documento in documentos_por_busca(termo)]
+
+    def pdf_com_texto(self, texto):
+        # PDF mínimo de uma página, com o texto em Helvetica (WinAnsi, aceita acentos)
+        texto = texto.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        conteudo = b'BT /F1 12 Tf 72 720 Td (' + texto.encode('cp1252') + b') Tj ET'
+        objetos = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+            b'/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>',
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+            b'<< /Length %d >>\nstream\n%s\nendstream' % (len(conteudo), conteudo),
+        ]
+        pdf = BytesIO()
+        pdf.write(b'%PDF-1.4\n')
+        posicoes = []
+        for numero, objeto in enumerate(objetos, start=1):
+            posicoes.append(pdf.tell())
+            pdf.write(b'%d 0 obj\n%s\nendobj\n' % (numero, objeto))
+        inicio_xref = pdf.tell()
+        pdf.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1))
+        for posicao in posicoes:
+            pdf.write(b'%010d 00000 n \n' % posicao)
+        pdf.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, inicio_xref))
+        return pdf.getvalue()
+
+    def test_extrai_o_texto_de_um_pdf_de_verdade(self):
+        documento = self.criar_documento('Balancete', self.pdf_com_texto('Compra de ração (canil) em março'))
+
+        self.assertEqual(processar_pendentes(), (1, 0))
+        documento.refresh_from_db()
+        self.assertEqual(documento.texto, 'Compra de ração (canil) em março')
+        self.assertEqual(self.ids_da_busca('racao canil'), [documento.pk])
+
+    def extrair(self, textos):
+        # textos: {nome do arquivo: texto do PDF}
+        with mock.patch('OngAmp.extracao.extrair_texto_pdf', lambda arquivo: textos[arquivo.name]):
+            return processar_pendentes()
+
+    def test_upload_entra_na_fila_e_e_extraido_depois(self):
+        documento = self.criar_documento('Março')
+        self.assertIsNone(documento.texto_extraido_em)
+
+        self.assertEqual(self.extrair({documento.arquivo.name: 'Compra de ração para os canis'}), (1, 0))
+        documento.refresh_from_db()
+        self.assertEqual(documento.texto, 'Compra de ração para os canis')
+        self.assertIsNotNone(documento.texto_extraido_em)
+        self.assertEqual(self.extrair({}), (0, 0))
+
+    def test_busca_devolve_trecho_destacado_e_escapado(self):
+        marco = self.criar_documento('Março', b'%PDF marco')
+        abril = self.criar_documento('Abril', b'%PDF abril')
+        self.extrair({
+            marco.arquivo.name: 'Gastos com <b>veterinário</b> e vacinas.',
+            abril.arquivo.name: 'Compra de ração.',
+        })
+
+        resposta = self.client.get(reverse('buscar_documentos'), {'q': 'veterinario'})
+        documentos = resposta.context['documentos']
+        self.assertEqual([d.titulo for d in documentos], ['Março'])
+        self.assertIn('<mark>veterinário</mark>', documentos[0].trecho)
+        self.assertIn('&lt;b&gt;', documentos[0].trecho)
+        self.assertContains(resposta, '<mark>veterinário</mark>')
+
+    def test_pdf_trocado_volta_para_a_fila(self):
+        documento = self.criar_documento('Março', b'%PDF antigo')
+        self.extrair({documento.arquivo.name: 'texto antigo'})
+
+        documento.arquivo = SimpleUploadedFile('novo.pdf', b'%PDF novo')
+        documento.save()
+        documento.refresh_from_db()
+        self.assertIsNone(documento.texto_extraido_em)
+        self.assertEqual(self.ids_da_busca('antigo'), [])
+
+    def test_pdf_ilegivel_nao_trava_a_fila(self):
+        self.criar_documento('Março')
+
+        def quebrado(arquivo):
+            raise ValueError('PDF corrompido')
+
+        with mock.patch('OngAmp.extracao.extrair_texto_pdf', quebrado), self.assertLogs('OngAmp.extracao'):
+            self.assertEqual(processar_pendentes(), (0, 1))
+        self.assertIn('PDF corrompido', DocumentoTransparencia.objects.get().texto_erro)
+
+
+# ==============================================================================
+# ARQUIVOS ESTÁTICOS
+# ==============================================================================
+class EstaticosTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._static_root = tempfile.mkdtemp()
+        cls._static_override = override_settings(STATIC_ROOT=cls._static_root)
+        cls._static_override.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._static_override.disable()
+        shutil.rmtree(cls._static_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def url_com_hash(self, nome):
+        return staticfiles_storage.url(nome)
+
+    def test_pagina_carrega_um_css_so(self):
+        resposta = self.client.get(reverse('index'))
+        pacote = self.url_com_hash('css/pacote-index.css')
+        self.assertRegex(pacote, r'pacote-index\.[0-9a-f]{12}\.css$')
+        self.assertContains(resposta, pacote)
+        self.assertNotContains(resposta, 'style-index')
+
+        css = gzip.decompress(b''.join(self.client.get(pacote, HTTP_ACCEPT_ENCODING='gzip').streaming_content))
+        self.assertIn(b'/* css/style-index.css */', css)
+        self.assertTrue(css.startswith(b'/* css/style-base.css */'))
+
+    def test_serve_versao_comprimida_com_cache_eterno(self):
+        url = self.url_com_hash('css/style-base.css')
+
+        resposta = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br;q=0')
+        self.assertEqual(resposta['Content-Encoding'], 'gzip')
+        self.assertEqual(resposta['Content-Type'], 'text/css')
+        self.assertIn('immutable', resposta['Cache-Control'])
+        self.assertIn('Accept-Encoding', resposta['Vary'])
+
+        sem_compressao = self.client.get(url)
+        self.assertFalse(sem_compressao.has_header('Content-Encoding'))
+        self.assertNotEqual(sem_compressao['ETag'], resposta['ETag'])
+
+        revalidacao = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=resposta['ETag'])
+        self.assertEqual(revalidacao.status_code, 304)
+
+    def test_nome_sem_hash_tem_cache_curto(self):
+        resposta = self.client.get('/static/css/style-base.css')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotIn('immutable', resposta['Cache-Control'])
+
+    def test_arquivo_inexistente_segue_para_o_django(self):
+        self.assertEqual(self.client.get('/static/css/nao-existe.css').status_code, 404)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+
+# ==============================================================================
+# COMPRESSÃO DAS PÁGINAS
+# ==============================================================================
+class CompressaoTests(TestCase):
+
+    def test_pagina_vai_em_gzip_para_quem_aceita(self):
+        resposta = self.client.get(reverse('sobre'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(resposta['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', resposta['Vary'])
+        self.assertIn(b'</html>', gzip.decompress(resposta.content))
+
+        sem_compressao = self.client.get(reverse('sobre'))
+        self.assertFalse(sem_compressao.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', sem_compressao['Vary'])
+
+    @mock.patch('OngAmp.middleware.brotli')
+    def test_brotli_tem_preferencia_mas_nao_em_pagina_com_csrf(self, brotli):
+        brotli.compress.return_value = b'br'
+        resposta = self.client.get(reverse('sobre'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(resposta['Content-Encoding'], 'br')
+        self.assertEqual(resposta.content, b'br')
+
+        cadastro = self.client.get(reverse('cadastro_adotante'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(cadastro['Content-Encoding'], 'gzip')
+        self.assertIn(b'csrfmiddlewaretoken', gzip.decompress(cadastro.content))
+
+    def test_pagina_com_csrf_varia_de_tamanho(self):
+        tamanhos = {
+            len(self.client.get(reverse('cadastro_adotante'), HTTP_ACCEPT_ENCODING='gzip').content)
+            for _ in range(10)
+        }
+        self.assertGreater(len(tamanhos), 1)
+
+    def test_resposta_em_fluxo_e_comprimida(self):
+        linhas = [f'linha {i};valor\n'.encode() for i in range(1000)]
+
+        def view(request):
+            return StreamingHttpResponse(iter(linhas), content_type='text/csv')
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        resposta = Comprimir(view)(request)
+        self.assertEqual(resposta['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(resposta.streaming_content)), b''.join(linhas))
+
+    @skipUnless(brotli, "pacote brotli não instalado (dependência opcional)")
+    def test_pagina_em_brotli_de_verdade(self):
+        resposta = self.client.get(reverse('sobre'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(resposta['Content-Encoding'], 'br')
+        self.assertEqual(resposta['Content-Length'], str(len(resposta.content)))
+        self.assertIn(b'</html>', brotli.decompress(resposta.content))
+
+    @skipUnless(brotli, "pacote brotli não instalado (dependência opcional)")
+    def test_resposta_em_fluxo_em_brotli(self):
+        linhas = [f'linha {i};valor\n'.encode() for i in range(1000)]
+
+        def view(request):
+            return StreamingHttpResponse(iter(linhas), content_type='text/csv')
+
+        resposta = Comprimir(view)(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='br'))
+        self.assertEqual(resposta['Content-Encoding'], 'br')
+        self.assertFalse(resposta.has_header('Content-Length'))
+        self.assertEqual(brotli.decompress(b''.join(resposta.streaming_content)), b''.join(linhas))
+
+    def test_pula_corpo_pequeno_e_tipo_ja_comprimido(self):
+        pequeno = Comprimir(lambda r: HttpResponse('ok'))(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertFalse(pequeno.has_header('Content-Encoding'))
+
+        pdf = Comprimir(lambda r: HttpResponse(b'%PDF' * 1000, content_type='application/pdf'))(
+            RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        )
+        self.assertFalse(pdf.has_header('Content-Encoding'))
+
+
+# ==============================================================================
+# API JSON
+# ==============================================================================
+class ApiTests(TestCase):
+
+    def criar_pets_com_fotos(self, quantidade, **campos):
+        pets = []
+        for i in range(quantidade):
+            pet = criar_pet(f'Pet {i}', **campos)
+            criar_foto(pet, f'{i}-a.jpg')
+            criar_foto(pet, f'{i}-b.jpg', ordem=1)
+            pets.append(pet)
+        return pets
+
+    @override_settings(ALLOWED_HOSTS=['a.example', 'b.example'])
+    def test_cache_separa_esquema_e_host_dos_links(self):
+        self.criar_pets_com_fotos(1)
+        url = reverse('api_pets')
+        self.assertIn('http://a.example/', self.client.get(url, HTTP_HOST='a.example').json()['resultados'][0]['url'])
+
+        item = self.client.get(url, HTTP_HOST='b.example', secure=True).json()['resultados'][0]
+        self.assertTrue(item['url'].startswith('https://b.example/'))
+        self.assertTrue(item['capa'].startswith('https://b.example/'))
+        self.assertTrue(all(foto['url'].startswith('https://b.example/') for foto in item['fotos']))
+
+    def test_lista_em_consultas_constantes_com_cursor(self):
+        self.criar_pets_com_fotos(3)
+        with self.assertNumQueries(2): # pets (com a capa no JOIN) + fotos
+            self.client.get(reverse('api_pets'), {'limite': 2})
+        cache.clear()
+
+        self.criar_pets_com_fotos(20)
+        with self.assertNumQueries(2):
+            primeira = self.client.get(reverse('api_pets'), {'limite': 20}).json()
+        self.assertEqual(len(primeira['resultados']), 20)
+        self.assertEqual(len(primeira['resultados'][0]['fotos']), 2)
+        self.assertIsNone(primeira['anterior'])
+
+        segunda = self.client.get(primeira['proximo']).json()
+        self.assertEqual(len(segunda['resultados']), 3)
+        self.assertIsNone(segunda['proximo'])
+        ids = [p['id'] for p in primeira['resultados'] + segunda['resultados']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_campos_escolhidos_e_filtro(self):
+        self.criar_pets_com_fotos(2)
+        gato = criar_pet('Mingau', categoria_pet='G', is_castrado='NC')
+        criar_pet('Adotado', categoria_pet='G', status_adocao='ADOTADO')
+
+        with self.assertNumQueries(1): # sem fotos, sem a segunda consulta
+            dados = self.client.get(reverse('api_pets'), {'categoria': 'G', 'castrado': 'NC', 'campos': 'nome,url'}).json()
+        self.assertEqual(dados['resultados'], [
+            {'nome': 'Mingau', 'url': f'http://testserver/adote-pet/{gato.pk}/'},
+        ])
+
+        resposta = self.client.get(reverse('api_pets'), {'campos': 'nome,senha'})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('senha', resposta.json()['erro'])
+
+    def test_etag_forte_responde_304(self):
+        self.criar_pets_com_fotos(1)
+        resposta = self.client.get(reverse('api_pets'))
+        etag = resposta['ETag']
+        self.assertTrue(etag.startswith('"'))
+
+        with self.assertNumQueries(0): # 304 vem do cache da página
+            repetida = self.client.get(reverse('api_pets'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(repetida.status_code, 304)
+
+        criar_pet('Novo')
+        self.assertEqual(self.client.get(reverse('api_pets'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detalhe_so_de_pet_disponivel(self):
+        pet, = self.criar_pets_com_fotos(1)
+        dados = self.client.get(reverse('api_pet', args=[pet.pk]), {'campos': 'id,fotos'}).json()
+        self.assertEqual(dados['id'], pet.pk)
+        self.assertTrue(dados['fotos'][0]['url'].endswith('/media/img_pets/0-a.jpg'))
+
+        Pet.objects.filter(pk=pet.pk).update(status_adocao='ADOTADO')
+        cache.clear()
+        self.assertEqual(self.client.get(reverse('api_pet', args=[pet.pk])).status_code, 404)
+
+    def test_fotos_na_ordem_da_galeria_com_a_capa_primeiro(self):
+        pet, = self.criar_pets_com_fotos(1)
+        FotoPet.objects.filter(imagem='img_pets/0-b.jpg').update(is_capa=True)
+        dados = self.client.get(reverse('api_pet', args=[pet.pk]), {'campos': 'id,fotos'}).json()
+        self.assertEqual([foto['capa'] for foto in dados['fotos']], [True, False])
+        self.assertEqual(
+            [foto['url'].rsplit('/', 1)[1] for foto in dados['fotos']],
+            [foto.imagem.name.rsplit('/', 1)[1] for foto in pet.fotos.all()],
+        )
+
+    def test_documentos_filtrados_por_periodo(self):
+        for data in ('2025-03-10', '2025-04-10'):
+            DocumentoTransparencia.objects.create(titulo=f'Contas {data}', arquivo=f'transparencia_pdfs/{data}.pdf', data_publicacao=data)
+
+        with self.assertNumQueries(1):
+            dados = self.client.get(reverse('api_documentos'), {'ano': 2025, 'mes': 3}).json()
+        documento, = dados['resultados']
+        self.assertEqual(documento['titulo'], 'Contas 2025-03-10')
+        self.assertTrue(documento['url'].endswith('?v=2025-03-10'))
+
+
+# ==============================================================================
+# ESTATÍSTICAS DE ADOÇÃO
+# ==============================================================================
+class EstatisticasAdocaoTests(TestCase):
+
+    def adotar(self, pet, numero, voluntario=None, data=None):
+        return Adocao.objects.create(
+            pet=pet, adotante=criar_adotante(numero), voluntario=voluntario, data=data or timezone.now(),
+        )
+
+    def test_resumos_acompanham_criacao_edicao_e_exclusao(self):
+        entrada = timezone.make_aware(timezone.datetime(2025, 1, 1, 12))
+        maria = Voluntario.objects.create(nome='Maria')
+        rex = criar_pet('Rex', data_entrada=entrada)
+        mia = criar_pet('Mia', categoria_pet='G', data_entrada=entrada)
+
+        self.adotar(rex, 1, maria, data=entrada + timezone.timedelta(days=10))
+        adocao_mia = self.adotar(mia, 2, data=entrada + timezone.timedelta(days=30))
+
+        janeiro = EstatisticaMensal.objects.get(categoria_pet='G')
+        self.assertEqual((janeiro.mes.month, janeiro.adocoes, janeiro.soma_dias), (1, 1, 30))
+        self.assertEqual(EstatisticaVoluntario.objects.get(voluntario=maria).adocoes, 1)
+
+        # Editada para fevereiro e com voluntário: sai de janeiro, entra em fevereiro
+        adocao_mia.data = entrada + timezone.timedelta(days=40)
+        adocao_mia.voluntario = maria
+        adocao_mia.save()
+        self.assertEqual(
+            list(EstatisticaMensal.objects.filter(categoria_pet='G').values_list('mes__month', 'adocoes', 'soma_dias')),
+            [(1, 0, 0), (2, 1, 40)],
+        )
+        self.assertEqual(EstatisticaVoluntario.objects.get(voluntario=maria).adocoes, 2)
+
+        adocao_mia.delete()
+        self.assertEqual(EstatisticaMensal.objects.get(categoria_pet='G', mes__month=2).adocoes, 0)
+        self.assertEqual(EstatisticaVoluntario.objects.get(voluntario=maria).adocoes, 1)
+
+    def test_recalcular_bate_com_o_incremental(self):
+        maria = Voluntario.objects.create(nome='Maria')
+        for i in range(4):
+            self.adotar(criar_pet(f'Pet {i}', categoria_pet='CG'[i % 2]), i, maria if i % 2 else None)
+        antes = list(EstatisticaMensal.objects.values_list('mes', 'categoria_pet', 'adocoes', 'soma_dias', 'com_data_entrada'))
+
+        EstatisticaMensal.objects.update(adocoes=99)
+        call_command('recalcular_estatisticas', stdout=StringIO())
+        self.assertEqual(
+            list(EstatisticaMensal.objects.values_list('mes', 'categoria_pet', 'adocoes', 'soma_dias', 'com_data_entrada')),
+            antes,
+        )
+        self.assertEqual(EstatisticaVoluntario.objects.get().adocoes, 2)
+
+    def test_painel_le_so_os_resumos(self):
+        self.adotar(criar_pet('Rex'), 1, Voluntario.objects.create(nome='Maria'))
+        self.adotar(criar_pet('Pet sem data', data_entrada=None), 2)
+        admin_user = User.objects.create_superuser('admin', 'admin@exemplo.com', 'senha')
+        self.client.force_login(admin_user)
+
+        dados = dados_do_painel()
+        self.assertEqual(dados['total_adocoes'], 2)
+        self.assertEqual(dados['media_dias'], 0) # só o Rex tem data de entrada
+        self.assertEqual(dados['voluntarios'], [('Maria', 1)])
+
+        resposta = self.client.get(reverse('admin:OngAmp_estatisticamensal_changelist'))
+        self.assertContains(resposta, 'Adoções por voluntário')
+        self.assertContains(resposta, 'Maria')
+
+
+# ==============================================================================
+# EXPORTAÇÃO E IMPORTAÇÃO DE PLANILHAS
+# ==============================================================================
+class PlanilhasTests(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', 'senha'))
+
+    def exportar(self, modelo, acao):
+        url = reverse(f'admin:OngAmp_{modelo._meta.model_name}_changelist')
+        selecionados = list(modelo.objects.values_list('pk', flat=True))
+        return self.client.post(url, {'action': acao, '_selected_action': selecionados})
+
+    def importar_csv(self, tipo, conteudo, *args):
+        caminho = tempfile.mktemp(suffix='.csv')
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(conteudo)
+        saida, erros = StringIO(), StringIO()
+        try:
+            call_command('importar_planilha', tipo, caminho, *args, stdout=saida, stderr=erros)
+        finally:
+            os.remove(caminho)
+        return saida.getvalue(), erros.getvalue()
+
+    def test_exporta_csv_em_fluxo_protegido_contra_formula(self):
+        criar_adotante(1)
+        Adotante.objects.create(nome='=HYPERLINK("x")', cpf='00000000002', telefone='1', email='b@exemplo.com')
+
+        resposta = self.exportar(Adotante, 'exportar_csv')
+        self.assertTrue(resposta.streaming)
+        self.assertIn('attachment', resposta['Content-Disposition'])
+        conteudo = b''.join(resposta.streaming_content).decode('utf-8-sig')
+        linhas = list(csv.reader(StringIO(conteudo)))
+        self.assertEqual(linhas[0][:2], ['nome', 'cpf'])
+        self.assertEqual(linhas[1][:2], ['Adotante 1', '00000000001'])
+        self.assertEqual(linhas[2][0], '\'=HYPERLINK("x")')
+
+    def test_exporta_xlsx_valido(self):
+        pet = criar_pet('Rex & Cia')
+        Adocao.objects.create(pet=pet, adotante=criar_adotante(), voluntario=Voluntario.objects.create(nome='Maria'))
+
+        resposta = self.exportar(Adocao, 'exportar_xlsx')
+        with zipfile.ZipFile(BytesIO(b''.join(resposta.streaming_content))) as pacote:
+            self.assertIn('xl/workbook.xml', pacote.namelist())
+            planilha = pacote.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<t xml:space="preserve">Rex &amp; Cia</t>', planilha)
+        self.assertIn('<t xml:space="preserve">Maria</t>', planilha)
+
+    def test_importa_adotantes_e_relata_linhas_com_erro(self):
+        criar_adotante(1)
+        saida, erros = self.importar_csv('adotantes', (
+            'nome,cpf,telefone,email\n'
+            'Ana,11111111111,17,ana@exemplo.com\n'
+            'Repetido,00000000001,17,outro@exemplo.com\n'
+            'CPF ruim,123,17,cpf@exemplo.com\n'
+            'Duplicada,22222222222,17,ana@exemplo.com\n'
+        ))
+        self.assertIn('1 linha(s) válida(s), 3 com erro', saida)
+        self.assertIn('linha 3: cpf já cadastrado', erros)
+        self.assertIn('linha 4: cpf:', erros)
+        self.assertIn('linha 5: email já cadastrado', erros)
+        self.assertTrue(Adotante.objects.filter(nome='Ana').exists())
+
+    def test_importa_pets_em_lote_com_busca_e_cache(self):
+        antes = self.client.get(reverse('lista_pets'))
+        # savepoint + INSERT dos válidos + índice da busca + release (o 2º lote só tem a linha com erro)
+        with self.assertNumQueries(4):
+            self.importar_csv('pets', (
+                'nome;coloracao;descricao;categoria_pet;porte;data_entrada\n'
+                'Mingau;Branco;Achado na feira;Gato;P;2025-02-01 10:00\n'
+                'Thor;Preto;Resgatado na chuva;C;grande;\n'
+                'Sem cor;;Sem coloração;C;M;\n'
+            ), '--lote', '2')
+        mingau = Pet.objects.get(nome='Mingau')
+        self.assertEqual((mingau.categoria_pet, mingau.porte), ('G', 'P'))
+        self.assertEqual(Pet.objects.get(nome='Thor').porte, 'G')
+        self.assertEqual(list(filtrar_por_busca(Pet.objects.all(), 'feira')), [mingau])
+        self.assertNotEqual(self.client.get(reverse('lista_pets')).content, antes.content)
+
+    def test_importa_adocoes_marca_pets_e_estatisticas(self):
+        rex, mia = criar_pet('Rex'), criar_pet('Mia', categoria_pet='G')
+        criar_adotante(1)
+        Voluntario.objects.create(nome='Maria')
+        _saida, erros = self.importar_csv('adocoes', (
+            'pet,adotante_cpf,voluntario,data\n'
+            f'{rex.pk},00000000001,Maria,2025-03-10 10:00\n'
+            f'{rex.pk},00000000001,,\n'
+            f'{mia.pk},99999999999,,\n'
+        ))
+        self.assertIn(f'linha 3: pet {rex.pk} já consta como adotado', erros)
+        self.assertIn('linha 4: nenhum adotante com CPF 99999999999', erros)
+        rex.refresh_from_db()
+        self.assertEqual(rex.status_adocao, Pet.StatusAdocao.ADOTADO)
+        self.assertEqual(EstatisticaMensal.objects.get().adocoes, 1)
+        self.assertEqual(EstatisticaVoluntario.objects.get().adocoes, 1)
+
+    def test_tudo_ou_nada_e_simular_nao_gravam(self):
+        conteudo = 'nome,cpf,telefone,email\nAna,11111111111,17,ana@exemplo.com\nRuim,1,17,x\n'
+        saida, _erros = self.importar_csv('adotantes', conteudo, '--tudo-ou-nada')
+        self.assertIn('Nada foi gravado', saida)
+        self.importar_csv('adotantes', conteudo, '--simular')
+        self.assertFalse(Adotante.objects.exists())
+
+
+# ==============================================================================
+# MEDIÇÃO DE DESEMPENHO
+# ==============================================================================
+@override_settings(MEDICAO_AMOSTRAGEM=1.0, MEDICAO_SERVER_TIMING=False, MEDICAO_LENTA_MS=10_000)
+class MedicaoTests(TestCase):
+
+    def metricas(self, resposta):
+        return {item.split(';')[0]: item for item in resposta['Server-Timing'].split(', ')}
+
+    @override_settings(MEDICAO_SERVER_TIMING=True)
+    def test_server_timing_com_sql_template_e_total(self):
+        criar_pet(nome='Rex')
+        metricas = self.metricas(self.client.get(reverse('lista_pets')))
+        self.assertRegex(metricas['sql'], r'^sql;dur=[\d.]+;desc="[1-9]\d* consultas"$')
+        self.assertIn('template', metricas)
+        self.assertIn('total', metricas)
+        self.assertNotIn('http', metricas)
+
+    def test_cabecalho_so_para_a_equipe(self):
+        self.assertFalse(self.client.get(reverse('sobre')).has_header('Server-Timing'))
+        self.client.force_login(User.objects.create_user('voluntario', password='x', is_staff=True))
+        self.assertTrue(self.client.get(reverse('sobre')).has_header('Server-Timing'))
+
+    @override_settings(MEDICAO_AMOSTRAGEM=0, MEDICAO_SERVER_TIMING=True, MEDICAO_LENTA_MS=0)
+    def test_fora_da_amostra_nada_e_medido(self):
+        with self.assertNoLogs('OngAmp.medicao'):
+            resposta = self.client.get(reverse('sobre'))
+        self.assertFalse(resposta.has_header('Server-Timing'))
+
+    @override_settings(MEDICAO_MAX_CONSULTAS=2, MEDICAO_PIORES_CONSULTAS=2)
+    def test_log_de_requisicao_com_consultas_demais(self):
+        for numero in range(3):
+            criar_pet(nome=f'Pet {numero}')
+        with self.assertLogs('OngAmp.medicao', 'WARNING') as logs:
+            self.client.get(reverse('lista_pets'))
+        registro = logs.records[0].medicao
+        self.assertEqual(registro['caminho'], reverse('lista_pets'))
+        self.assertEqual(registro['status'], 200)
+        self.assertGreater(registro['consultas'], 2)
+        self.assertEqual(len(registro['piores_consultas']), 2)
+        self.assertGreaterEqual(registro['piores_consultas'][0]['ms'], registro['piores_consultas'][1]['ms'])
+        self.assertEqual(json.loads(logs.records[0].getMessage().split(': ', 1)[1]), registro)
+
+    def test_medir_soma_por_categoria_sem_contar_duas_vezes(self):
+        with medir('http'):
+            pass # fora de uma medição: nada acontece
+        # Relógio falso: só anda quando o teste manda
+        relogio = [100.0]
+        with mock.patch('OngAmp.medicao.time.perf_counter', lambda: relogio[0]):
+            with medindo(Medicao()) as medicao:
+                with medir('smtp'):
+                    with medir('smtp'):
+                        relogio[0] += 0.02
+                Pet.objects.count()
+                Pet.objects.count()
+        resumo = medicao.resumo()
+        # 20 ms uma vez só: o bloco de dentro não soma de novo
+        self.assertAlmostEqual(medicao.tempos['smtp'], 0.02)
+        self.assertEqual(resumo['smtp_ms'], 20.0)
+        self.assertEqual(resumo['consultas'], 2)
+        self.assertEqual(resumo['repetidas'][0]['vezes'], 2)
+        # Depois do bloco as consultas deixam de ser contadas
+        Pet.objects.count()
+        self.assertEqual(medicao.consultas, 2)
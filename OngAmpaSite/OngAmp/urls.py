@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.urls import path
-from . import views
+from . import api, views
 
 # === PERSONALIZAÇÃO DO PAINEL ===
 admin.site.site_header = "Painel Administrativo - ONG AMPA"
@@ -14,9 +14,16 @@ urlpatterns = [
     path('contato/', views.contato, name='contato'),
     path('transparencia/', views.transp, name='transparencia'),
     path('transparencia/prestacao-de-contas/', views.prestacao_contas, name='prestacao_contas'),    
+    path('transparencia/documentos/<int:documento_id>/', views.baixar_documento, name='baixar_documento'),
+    path('transparencia/busca/', views.buscar_documentos, name='buscar_documentos'),
     path('adote_pet/', views.lista_pets, name='lista_pets'),
     path('adote-pet/<int:pet_id>/', views.detalhes_pet, name='detalhes_pet'),
     path('adote-pet/cadastro/', views.cadastro_adotante, name='cadastro_adotante'),
     path('adote-pet/cadastro/<int:pet_id>/', views.cadastro_adotante, name='cadastro_adotante_pet'),
+
+    # API JSON somente leitura (OngAmp/api.py)
+    path('api/pets/', api.api_pets, name='api_pets'),
+    path('api/pets/<int:pet_id>/', api.api_pet, name='api_pet'),
+    path('api/documentos/', api.api_documentos, name='api_documentos'),
     
 ]
\ No newline at end of file
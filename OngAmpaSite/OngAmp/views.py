@@ -1,44 +1,83 @@
 from django.shortcuts import render, get_object_or_404
+from django.db.models import Prefetch, Max, Count
 from .models import DocumentoTransparencia
-from .models import Pet
+from .models import Pet, FotoPet, Adocao
 from .forms import CadastroAdotanteForm
-from django.core.mail import send_mail
-import requests # Comunicação com o Google
+from django.db import transaction
 from django.contrib import messages # Manda mensagem de erro na tela
 from django.conf import settings  # Acesso as chaves
-from .models import ConfiguracaoGeral
+from django.utils.dates import MONTHS as NOMES_MESES
+from .configuracao import configuracao
+from .consultas import ler_filtros, contar_facetas, paginar_por_cursor, ler_periodo, meses_com_documentos
+from .emails import enfileirar_email
+from .recaptcha import cliente as recaptcha, RecaptchaIndisponivel
+from .cache import cache_por_geracao, resposta_condicional
+from .downloads import responder_documento
+from .busca import filtrar_por_busca, documentos_por_busca
 
 
+PETS_POR_PAGINA = 12
+BUSCA_LIMITE = 48
+
+
+# === VALIDADORES HTTP (ETag / Last-Modified) ===
+# Uma consulta agregada: a data da última alteração + a quantidade de registros
+# (a quantidade pega exclusões, que não mexem no "máximo" das datas).
+def _ultima_alteracao(queryset):
+    dados = queryset.aggregate(ultima=Max('atualizado_em'), total=Count('pk'))
+    return dados['ultima'], f"{dados['ultima']}|{dados['total']}"
+
+
+def validadores_galeria(request):
+    # Os filtros só recortam o conjunto, mas as contagens dos filtros usam
+    # todos os disponíveis: por isso a assinatura cobre todos eles
+    return _ultima_alteracao(Pet.objects.filter(status_adocao='DISPONIVEL'))
+
+
+def validadores_pet(request, pet_id):
+    dados = Pet.objects.filter(pk=pet_id).aggregate(
+        ultima=Max('atualizado_em'),
+        ultima_foto=Max('fotos__atualizado_em'),
+        fotos=Count('fotos'),
+    )
+    ultima = max(filter(None, [dados['ultima'], dados['ultima_foto']]), default=None)
+    return ultima, f"{ultima}|{dados['fotos']}"
+
+
+def validadores_documentos(request):
+    return _ultima_alteracao(DocumentoTransparencia.objects.all())
+
+
+@cache_por_geracao()
 def sobre(request):
     return render(request, 'sobre.html')
 
 
+@cache_por_geracao()
 def contato(request):
     return render(request, 'contato.html')
 
 
 # 1. Página "Capa" (Só visual + Botão)
+@cache_por_geracao()
 def transp(request):
     return render(request, 'transparencia.html')
 
 
 # 2. Página "Arquivo" (Com filtros)
+@resposta_condicional(validadores_documentos)
+@cache_por_geracao(DocumentoTransparencia)
 def prestacao_contas(request):
     # --- LÓGICA DE FILTRO ---
-    # Pegamos o que veio na URL (ex: ?ano=2025&mes=3)
-    ano_filtro = request.GET.get('ano')
-    mes_filtro = request.GET.get('mes')
+    # Pegamos o que veio na URL (ex: ?ano=2025&mes=3) e viramos uma faixa de datas
+    ano, mes, inicio, fim = ler_periodo(request.GET)
 
     # Base dos documentos mensais
     docs_mensais = DocumentoTransparencia.objects.filter(categoria='MENSAL')
 
-    # Se escolheu ano, filtra
-    if ano_filtro:
-        docs_mensais = docs_mensais.filter(data_publicacao__year=ano_filtro)
-    
-    # Se escolheu mês, filtra
-    if mes_filtro:
-        docs_mensais = docs_mensais.filter(data_publicacao__month=mes_filtro)
+    # Se escolheu ano (e talvez mês), filtra pela faixa [inicio, fim)
+    if inicio:
+        docs_mensais = docs_mensais.filter(data_publicacao__gte=inicio, data_publicacao__lt=fim)
 
     # Ordena do mais recente para o mais antigo
     docs_mensais = docs_mensais.order_by('-data_publicacao')
@@ -46,34 +85,97 @@ def prestacao_contas(request):
     # Documentos anuais (geralmente não precisam de filtro de mês)
     docs_anuais = DocumentoTransparencia.objects.filter(categoria='ANUAL').order_by('-data_publicacao')
 
-    # --- PARA POPULAR O SELECT DO HTML ---
-    # Pega todos os anos disponíveis no banco para montar o <select>
-    anos_disponiveis = DocumentoTransparencia.objects.dates('data_publicacao', 'year', order='DESC')
+    # --- PARA POPULAR OS SELECTS DO HTML ---
+    # Anos e meses que têm documento (mapa pronto no cache, sem varrer a tabela)
+    meses_por_ano = meses_com_documentos()
 
     return render(request, 'prestacao_contas.html', {
         'docs_mensais': docs_mensais,
         'docs_anuais': docs_anuais,
-        'anos_disponiveis': anos_disponiveis,
-        'ano_selecionado': ano_filtro, # Para manter o select marcado
-        'mes_selecionado': mes_filtro,
+        'meses_por_ano': meses_por_ano,
+        'meses_do_ano': [(numero, NOMES_MESES[numero]) for numero in meses_por_ano.get(ano, [])],
+        'ano_selecionado': ano, # Para manter o select marcado
+        'mes_selecionado': mes,
+    })
+
+
+@cache_por_geracao(DocumentoTransparencia)
+def buscar_documentos(request):
+    # Busca no texto dos PDFs já extraído e indexado: nenhum PDF é aberto aqui
+    busca = request.GET.get('q', '').strip()
+    return render(request, 'busca_documentos.html', {
+        'busca': busca,
+        'documentos': documentos_por_busca(busca) if busca else [],
     })
 
 
+def baixar_documento(request, documento_id):
+    # Manda o PDF em pedaços (com Range, para o leitor abrir página por página)
+    documento = get_object_or_404(DocumentoTransparencia, pk=documento_id)
+    return responder_documento(request, documento)
+
+
+@resposta_condicional(validadores_galeria)
+@cache_por_geracao(Pet, FotoPet, Adocao)
 def lista_pets(request):
-    # ANTES: .filter(status='DISPONIVEL')
-    # AGORA: .filter(status_adocao='DISPONIVEL')
-    
-    pets = Pet.objects.filter(status_adocao='DISPONIVEL').prefetch_related('fotos')
-    return render(request, 'adote.html', {'pets': pets})
+    disponiveis = Pet.objects.filter(status_adocao='DISPONIVEL')
+
+    # Filtros da URL (ex: ?categoria=G&porte=P) já validados contra as choices
+    filtros = ler_filtros(request.GET)
+    busca = request.GET.get('q', '').strip()
+
+    if busca:
+        # Busca por texto: os mais relevantes primeiro (até BUSCA_LIMITE), sem paginação.
+        # As contagens dos filtros passam a valer só para o que a busca achou.
+        disponiveis = filtrar_por_busca(disponiveis, busca)
+        pets = list(disponiveis.filter(**filtros).select_related('foto_capa')[:BUSCA_LIMITE])
+        pagina = {'itens': pets, 'proximo': None, 'anterior': None}
+    else:
+        # foto_capa vem no mesmo SELECT (JOIN), então a página faz 1 consulta só
+        pagina = paginar_por_cursor(
+            disponiveis.filter(**filtros).select_related('foto_capa'),
+            request.GET,
+            PETS_POR_PAGINA
+        )
+
+    # Contagens por espécie/porte/idade/sexo numa única consulta agregada
+    total, facetas = contar_facetas(disponiveis, filtros)
+
+    return render(request, 'adote.html', {
+        'pets': pagina['itens'],
+        'pagina': pagina,
+        'facetas': facetas,
+        'total': total,
+        'busca': busca,
+        'filtrando': bool(filtros) or bool(busca),
+    })
 
 
+@resposta_condicional(validadores_pet)
+@cache_por_geracao(Pet, FotoPet, Adocao)
 def detalhes_pet(request, pet_id):
     # Busca o pet pelo ID. Se não existir (ex: ID 999), dá erro 404 automaticamente.
-    pet = get_object_or_404(Pet, pk=pet_id)
+    # As fotos vêm juntas numa lista (pet.galeria); o template não faz mais consultas.
+    pet = get_object_or_404(
+        Pet.objects.prefetch_related(Prefetch('fotos', to_attr='galeria')),
+        pk=pet_id
+    )
     
     return render(request, 'detalhes_pet.html', {'pet': pet})
 
 
+def validar_recaptcha(request):
+    # Envia o token para o Google (com timeout e circuit breaker, ver recaptcha.py)
+    token = request.POST.get('g-recaptcha-response')
+    try:
+        if recaptcha.verificar(token, ip=request.META.get('REMOTE_ADDR')):
+            return True
+        messages.error(request, 'Erro no reCAPTCHA. Por favor, confirme que você não é um robô.')
+    except RecaptchaIndisponivel:
+        messages.error(request, 'Não conseguimos verificar o reCAPTCHA agora. Tente novamente em alguns instantes.')
+    return False
+
+
 def cadastro_adotante(request, pet_id=None):
     pet_interesse = None
     
@@ -84,66 +186,39 @@ def cadastro_adotante(request, pet_id=None):
         form = CadastroAdotanteForm(request.POST)
         
         # === VALIDAÇÃO RECAPTCHA ===
-        recaptcha_response = request.POST.get('g-recaptcha-response')
-        
-        data = {
-            'secret': settings.RECAPTCHA_PRIVATE_KEY,
-            'response': recaptcha_response
-        }
-        
-        # Envia verificação para o servidor do Google
-        r = requests.post('https://www.google.com/recaptcha/api/siteverify', data=data)
-        result = r.json()
-    
-        if form.is_valid() and result['success']:
-            
-            # 1. Salva no Banco de Dados
-            adotante = form.save()
+        # Só pergunta ao Google se o formulário estiver certo (evita chamada à toa)
+        if form.is_valid() and validar_recaptcha(request):
             
-          # 2. Monta o E-mail de Alerta
-            assunto = f'Novo Interessado: {adotante.nome}'
+            # 1. Monta o E-mail de Alerta
+            dados = form.cleaned_data
+            assunto = f'Novo Interessado: {dados["nome"]}'
             mensagem = f"""
             Olá equipe AMPA,
             
             Uma nova pessoa preencheu a ficha de interesse no site!
             
             --- DADOS DO ADOTANTE ---
-            Nome: {adotante.nome}
-            Telefone: {adotante.telefone}
-            E-mail: {adotante.email}
-            Endereço: {adotante.endereco}
-            CPF: {adotante.cpf}
+            Nome: {dados["nome"]}
+            Telefone: {dados["telefone"]}
+            E-mail: {dados["email"]}
+            Endereço: {dados["endereco"]}
+            CPF: {dados["cpf"]}
             """
             
             if pet_interesse:
                 mensagem += f"\n\n--- INTERESSE NO PET ---\nNome: {pet_interesse.nome} (ID: {pet_interesse.id})"
             
-            # === [INÍCIO DA ALTERAÇÃO] ===
-            # Tenta buscar a configuração personalizada no banco de dados
-            config = ConfiguracaoGeral.objects.first()
-            
-            if config:
-                # Se a ONG configurou no admin, usa o e-mail dela
-                email_destino = config.email_recebimento
-            else:
-                # Se não configurou, usa o padrão do arquivo .env (segurança)
-                email_destino = settings.EMAIL_ONG_RECEBIMENTO
-            # === [FIM DA ALTERAÇÃO] ===
-
-            send_mail(
-                subject=assunto,
-                message=mensagem,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email_destino], # <--- AQUI MUDOU para usar a variável
-                fail_silently=False,
-            )
+            # E-mail configurado no admin (ou o padrão do .env, se ninguém configurou),
+            # lido da memória do processo: nenhuma consulta aqui
+            email_destino = configuracao.atual().email_recebimento
+
+            # 2. Salva o adotante e coloca o e-mail na fila na MESMA transação.
+            # Quem conversa com o SMTP é o comando "enviar_emails", fora da requisição.
+            with transaction.atomic():
+                form.save()
+                enfileirar_email(assunto, mensagem, [email_destino])
 
             return render(request, 'cadastro_sucesso.html')
-        
-        else:
-            # Se cair aqui, ou o form está errado ou é bot
-            if not result['success']:
-                messages.error(request, 'Erro no reCAPTCHA. Por favor, confirme que você não é um robô.')
     else:
         form = CadastroAdotanteForm()
 
@@ -154,15 +229,16 @@ def cadastro_adotante(request, pet_id=None):
     })
 
 
+@cache_por_geracao(Pet, FotoPet, Adocao)
 def index(request):
     # Busca pets destaque e disponíveis
     pets_destaque = Pet.objects.filter(
         is_destaque=True, 
         status_adocao='DISPONIVEL'
-    ).order_by('-id')[:3] #Limite máximo visual
+    ).select_related('foto_capa').order_by('-id')[:3] #Limite máximo visual
     
     # Fallback (Se não tiver destaque, pega os 4 últimos)
     if not pets_destaque:
-        pets_destaque = Pet.objects.filter(status_adocao='DISPONIVEL').order_by('-id')[:3]
+        pets_destaque = Pet.objects.filter(status_adocao='DISPONIVEL').select_related('foto_capa').order_by('-id')[:3]
 
     return render(request, 'index.html', {'pets_destaque': pets_destaque})
\ No newline at end of file
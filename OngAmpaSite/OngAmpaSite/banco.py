@@ -0,0 +1,81 @@
+"""
+Perfil do banco de dados.
+
+Por padrão o site usa SQLite ajustado para um servidor com vários workers:
+  - WAL: quem lê não espera quem escreve (o admin salvando não trava o site);
+  - synchronous=NORMAL: seguro com WAL, bem menos fsync;
+  - busy_timeout: um escritor espera o outro em vez de dar "database is locked";
+  - mmap e cache maiores: as páginas mais lidas ficam na memória;
+  - conexões persistentes (CONN_MAX_AGE), sem abrir o arquivo a cada requisição.
+
+Com BANCO=postgres no .env usa PostgreSQL com pool de conexões, lendo
+POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST e POSTGRES_PORT.
+O driver é dependência opcional, fora do requirements.txt (ver README):
+    pip install "psycopg[binary,pool]"
+
+Para comparar os dois: python manage.py benchmark_banco
+"""
+import os
+
+# Aplicados em toda conexão nova (ver aplicar_pragmas). Cada entrada de
+# DATABASES pode trocar a lista pela chave 'PRAGMAS'.
+PRAGMAS_SQLITE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,       # ms
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,       # negativo = KiB (~20 MB)
+    'temp_store': 'MEMORY',
+}
+
+
+def configuracao_banco(base_dir):
+    """Monta o DATABASES['default'] conforme a variável BANCO."""
+    if os.getenv('BANCO', 'sqlite') == 'postgres':
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'ongampa'),
+            'USER': os.getenv('POSTGRES_USER', 'ongampa'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            # Com o pool do psycopg, cada worker reaproveita as conexões abertas;
+            # o Django exige CONN_MAX_AGE = 0 nesse caso (o pool cuida disso)
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.getenv('POSTGRES_POOL_MIN', 2)),
+                    'max_size': int(os.getenv('POSTGRES_POOL_MAX', 10)),
+                    'timeout': 10,
+                },
+            },
+        }
+
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': base_dir / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Transações já começam com a trava de escrita: com WAL, é o que faz
+            # o busy_timeout funcionar (sem isso, dois escritores podem dar
+            # "database is locked" na hora de promover a leitura para escrita)
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': PRAGMAS_SQLITE['busy_timeout'] / 1000,
+        },
+        'PRAGMAS': PRAGMAS_SQLITE,
+        # Testes num arquivo (e não no SQLite em memória compartilhada, que
+        # recusa na hora em vez de esperar a trava): os testes de concorrência
+        # veem o mesmo WAL/busy_timeout da produção
+        'TEST': {'NAME': base_dir / 'test_db.sqlite3'},
+    }
+
+
+def aplicar_pragmas(sender, connection, **kwargs):
+    # Receptor de connection_created (ligado em OngAmp/apps.py)
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS') or {}
+    with connection.cursor() as cursor:
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome} = {valor}')
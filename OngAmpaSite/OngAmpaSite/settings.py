@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from .banco import configuracao_banco
 
 load_dotenv()
 
@@ -44,6 +45,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'OngAmp.middleware.MedirRequisicao',
+    'OngAmp.middleware.ServirEstaticos',
+    'OngAmp.middleware.Comprimir',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -61,10 +65,18 @@ ROOT_URLCONF = 'OngAmpaSite.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que mede o tempo de render (OngAmp/medicao.py)
+        'BACKEND': 'OngAmp.medicao.TemplatesMedidos',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Templates compilados uma vez por processo e reaproveitados
+            # (em DEBUG o Django ainda recarrega quando o arquivo muda)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -80,13 +92,34 @@ WSGI_APPLICATION = 'OngAmpaSite.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite ajustado (WAL, pragmas, conexões persistentes) ou PostgreSQL com pool
+# de conexões se BANCO=postgres no .env. Detalhes em OngAmpaSite/banco.py.
 DATABASES = {
+    'default': configuracao_banco(BASE_DIR),
+}
+
+
+# Cache
+# Guarda as páginas públicas já renderizadas e as gerações dos dados
+# (OngAmp/cache.py). Precisa ser compartilhado por todos os processos: os
+# workers do site e os comandos (extrair_textos, importar_planilha,
+# gerar_derivadas) avançam as gerações uns dos outros. Um cache
+# em memória deixaria cada processo com as suas e as páginas velhas no ar.
+# A pasta pode ser trocada com CACHE_DIR no .env.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
     }
 }
 
+# As páginas saem do cache quando os dados mudam; o tempo é só para faxina
+CACHE_PAGINAS_TIMEOUT = 60 * 60 * 24
+
+# Host das requisições montadas pelo exportar_site (precisa estar no ALLOWED_HOSTS)
+EXPORTAR_HOST = os.getenv('EXPORTAR_HOST', ALLOWED_HOSTS[0])
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -117,10 +150,55 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic junta os CSS de cada página, põe o hash do conteúdo no nome e
+# grava versões .gz/.br (OngAmp/storage.py). Com DEBUG=False quem serve a pasta
+# é o ServirEstaticos (OngAmp/middleware.py), com cache eterno nos nomes com hash.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'OngAmp.storage.ArmazenamentoEstatico'},
+}
+ESTATICOS_MAX_AGE = 60 * 60  # segundos, para arquivos pedidos pelo nome sem hash
+
+# Compressão das páginas (OngAmp/middleware.py, Comprimir). Brotli só com o
+# pacote brotli instalado; qualidade 4-5 é o ponto bom para conteúdo dinâmico.
+# Para medir: python manage.py benchmark_compressao
+COMPRESSAO_TAMANHO_MINIMO = 500  # bytes
+COMPRESSAO_BROTLI_QUALIDADE = 5
+
+# Medição por requisição (OngAmp/middleware.py, MedirRequisicao): SQL, templates,
+# reCAPTCHA e SMTP no cabeçalho Server-Timing e no log "OngAmp.medicao".
+MEDICAO_AMOSTRAGEM = float(os.getenv('MEDICAO_AMOSTRAGEM', '1.0'))  # fração medida (0 desliga)
+MEDICAO_SERVER_TIMING = DEBUG     # Server-Timing para todos; a equipe logada sempre recebe
+MEDICAO_LENTA_MS = 500            # a partir daqui a requisição vai para o log
+MEDICAO_MAX_CONSULTAS = 50        # idem, com mais consultas que isso (cheiro de N+1)
+MEDICAO_PIORES_CONSULTAS = 5      # quantas das consultas mais lentas vão no log
+
+# Um CSS por página em produção: {% css_pagina 'nome' %} (templatetags/pets.py)
+PACOTES_CSS = {
+    'base': ['css/style-base.css'],
+    'index': ['css/style-base.css', 'css/style-index.css', 'css/style-adote.css'],
+    'adote': ['css/style-base.css', 'css/style-adote.css'],
+    'sobre': ['css/style-base.css', 'css/style-sobre.css'],
+    'contato': ['css/style-base.css', 'css/style-contato.css'],
+    'transparencia': ['css/style-base.css', 'css/style-transp.css'],
+    'prestacao_contas': ['css/style-base.css', 'css/style-prest-contas.css'],
+}
+
 # Media files (Uploads)
+# Fotos e PDFs são gravados com o hash do conteúdo no nome (OngAmp/storage.py),
+# então a URL nunca muda de conteúdo. No servidor web pode usar cache eterno, ex. nginx:
+#   location /media/ { expires max; add_header Cache-Control "public, immutable"; }
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Download dos PDFs da transparência (OngAmp/downloads.py).
+# DOCUMENTOS_ENVIO: '' (o Django manda o arquivo), 'x-accel' (nginx) ou 'x-sendfile' (Apache).
+# Com x-accel, o nginx precisa de um location interno apontando para o MEDIA_ROOT:
+#   location /_documentos/ { internal; alias /caminho/para/media/; }
+DOCUMENTOS_ENVIO = os.getenv('DOCUMENTOS_ENVIO', '')
+DOCUMENTOS_X_ACCEL_LOCAL = '/_documentos/'
+DOCUMENTOS_CONTAGEM_INTERVALO = 60  # segundos entre gravações do contador de downloads
+
 
 # ==========================================
 # CONFIGURAÇÃO DE ENVIO DE E-MAIL (SMTP)
@@ -141,6 +219,15 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 # Define quem recebe 
 EMAIL_ONG_RECEBIMENTO = os.getenv('EMAIL_ONG_RECEBIMENTO', 'ampa.mirassol@hotmail.com')
 
+# Configuração do admin (ConfiguracaoGeral) guardada em memória por cada processo:
+# relida quando muda (geração no cache) ou, no máximo, depois deste tempo
+CONFIGURACAO_MAX_IDADE = 60  # segundos
+
+# Fila de e-mails: o site só grava na tabela, quem envia é o worker
+#   python manage.py enviar_emails --continuo
+EMAIL_FILA_MAX_TENTATIVAS = 5       # Depois disso o e-mail fica como FALHOU no admin
+EMAIL_FILA_BACKOFF_SEGUNDOS = 60    # Espera dobra a cada falha (1min, 2min, 4min...)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -150,6 +237,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Configurações do reCAPTCHA
 RECAPTCHA_PUBLIC_KEY = os.getenv('RECAPTCHA_PUBLIC_KEY')
 RECAPTCHA_PRIVATE_KEY = os.getenv('RECAPTCHA_PRIVATE_KEY')
+RECAPTCHA_VERIFY_URL = 'https://www.google.com/recaptcha/api/siteverify'
+RECAPTCHA_TIMEOUT = (2, 3)            # Segundos: (conectar, ler a resposta)
+RECAPTCHA_FALHAS_PARA_ABRIR = 5       # Falhas seguidas até parar de chamar o Google
+RECAPTCHA_PAUSA_CIRCUITO = 30         # Segundos sem chamar o Google depois disso
+# Se o Google estiver fora: True aceita o cadastro, False pede para tentar de novo
+RECAPTCHA_FALHA_ABERTA = os.getenv('RECAPTCHA_FALHA_ABERTA', 'False') == 'True'
 
 # ==================================
 # CONFIGURAÇÕES DO JAZZMIN (ADMIN)
@@ -183,6 +276,8 @@ JAZZMIN_SETTINGS = {
         "OngAmp.Voluntario": "fas fa-hands-helping",
         "OngAmp.DocumentoTransparencia": "fas fa-file-invoice-dollar",
         "OngAmp.FotoPet": "fas fa-camera",
+        "OngAmp.EmailPendente": "fas fa-envelope",
+        "OngAmp.EstatisticaMensal": "fas fa-chart-bar",
     },
     
     "order_with_respect_to": ["OngAmp", "auth"],